@@ -1,23 +1,118 @@
 # aegis-node/control-plane/app/auth.py
+# Dashboard token check. The token file may hold several tokens (one per
+# line), all valid at once. It is parsed into memory and re-read only when
+# its inode/size/mtime changes; the stat itself runs at most every
+# AEGIS_AUTH_RELOAD_SECONDS, so a request normally costs no I/O. Tokens that
+# disappear from the file (rotation) stay valid for AEGIS_AUTH_GRACE_SECONDS
+# so open dashboards are not cut off mid-poll; 0 revokes them immediately.
 
+import hmac
 import os
+import threading
+import time
+
 from fastapi import Header, HTTPException, Depends
 
 DASHBOARD_AUTH_ENABLED = os.getenv("AEGIS_AUTH_ENABLED", "true").lower() == "true"
 DASHBOARD_AUTH_TOKEN = os.getenv("AEGIS_AUTH_TOKEN", "")
 DASHBOARD_AUTH_TOKEN_FILE = os.getenv("AEGIS_AUTH_TOKEN_FILE", "")
+TOKEN_RELOAD_SECONDS = float(os.getenv("AEGIS_AUTH_RELOAD_SECONDS", "2"))
+TOKEN_GRACE_SECONDS = float(os.getenv("AEGIS_AUTH_GRACE_SECONDS", "300"))
 
+_lock = threading.Lock()
+_cache = {
+    "tokens":     (),      # current tokens, primary first (bytes)
+    "retired":    {},      # token (bytes) -> monotonic expiry
+    "file_id":    False,   # False = never loaded
+    "checked_at": 0.0,
+}
 
-def current_auth_token() -> str:
+
+def _file_id():
+    try:
+        st = os.stat(DASHBOARD_AUTH_TOKEN_FILE)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _read_tokens() -> tuple:
+    tokens = []
     if DASHBOARD_AUTH_TOKEN_FILE:
         try:
             with open(DASHBOARD_AUTH_TOKEN_FILE) as f:
-                token = f.read().strip()
-                if token:
-                    return token
+                for line in f:
+                    token = line.strip()
+                    if token and not token.startswith("#") and token.encode() not in tokens:
+                        tokens.append(token.encode())
         except OSError:
             pass
-    return DASHBOARD_AUTH_TOKEN
+    if not tokens and DASHBOARD_AUTH_TOKEN:
+        tokens.append(DASHBOARD_AUTH_TOKEN.encode())
+    return tuple(tokens)
+
+
+def _refresh(force: bool = False) -> None:
+    """Re-reads the token file if it changed. Caller holds _lock."""
+    now = time.monotonic()
+    if not force and _cache["file_id"] is not False and now - _cache["checked_at"] < TOKEN_RELOAD_SECONDS:
+        return
+    _cache["checked_at"] = now
+    file_id = _file_id() if DASHBOARD_AUTH_TOKEN_FILE else None
+    if file_id == _cache["file_id"] and not force:
+        return
+    tokens = _read_tokens()
+    if _cache["file_id"] is not False and TOKEN_GRACE_SECONDS > 0:
+        for token in _cache["tokens"]:
+            if token not in tokens:
+                _cache["retired"][token] = now + TOKEN_GRACE_SECONDS
+    for token in tokens:
+        _cache["retired"].pop(token, None)
+    _cache["tokens"] = tokens
+    _cache["file_id"] = file_id
+
+
+def _valid_tokens() -> tuple:
+    with _lock:
+        _refresh()
+        retired = _cache["retired"]
+        if retired:
+            now = time.monotonic()
+            for token in [t for t, expiry in retired.items() if expiry <= now]:
+                del retired[token]
+        return _cache["tokens"] + tuple(retired)
+
+
+def invalidate_token_cache() -> None:
+    """Reloads the token file now (after rotation); dropped tokens enter the grace period."""
+    with _lock:
+        _refresh(force=True)
+
+
+def current_auth_token() -> str:
+    with _lock:
+        _refresh()
+        return _cache["tokens"][0].decode() if _cache["tokens"] else ""
+
+
+def token_status() -> dict:
+    with _lock:
+        _refresh()
+        now = time.monotonic()
+        return {
+            "token_count":   len(_cache["tokens"]),
+            "grace_tokens":  sum(1 for expiry in _cache["retired"].values() if expiry > now),
+            "grace_seconds": TOKEN_GRACE_SECONDS,
+        }
+
+
+def _matches(candidate: str) -> bool:
+    """Constant-time against every valid token; all are compared, no early exit."""
+    candidate = candidate.encode()
+    matched = False
+    for token in _valid_tokens():
+        matched |= hmac.compare_digest(candidate, token)
+    return matched
 
 
 def verify_token(x_aegis_token: str = Header(default=None)):
@@ -27,5 +122,15 @@ def verify_token(x_aegis_token: str = Header(default=None)):
     if not x_aegis_token:
         raise HTTPException(status_code=401, detail="Missing auth token")
 
-    if x_aegis_token != current_auth_token():
+    if not _matches(x_aegis_token):
         raise HTTPException(status_code=403, detail="Invalid auth token")
+
+
+def verify_scrape_token(
+    x_aegis_token: str = Header(default=None),
+    authorization: str = Header(default=None),
+):
+    """verify_token that also accepts `Authorization: Bearer <token>` (Prometheus)."""
+    if not x_aegis_token and authorization and authorization[:7].lower() == "bearer ":
+        x_aegis_token = authorization[7:].strip()
+    verify_token(x_aegis_token)
@@ -1,15 +1,28 @@
 # aegis-node/control-plane/app/main.py
 
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from app.auth import verify_token
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from app.auth import verify_token, verify_scrape_token
 from app.services.health import get_health
-from app.services.wg import get_peers, add_peer, remove_peer, provision_peer, ADMIN_PEER_IP
+from app.services.wg import (
+    get_peers, get_peer_table, add_peer, remove_peer, remove_peers, provision_peer, provision_peers,
+    get_allocation_stats, start_keypool, ADMIN_PEER_IP, PEER_BULK_MAX, PROVISION_BATCH_MAX,
+)
+from app.services.collector import collector
+from app.services.fail2ban import client as fail2ban_client
+from app.services.geoip import geo
+from app.services.ip_alloc import AllocatorUnavailable
+from app.services.latency import prober
+from app.services import metrics
+from app.services.profiler import profiler, ProfilerBusy, PROFILER_ENABLED, PROFILE_MAX_SECONDS
+from app.services.timings import timings, timed
 from app.services.monitor import (
-    get_system_stats, get_services, get_wg_traffic, get_ssh_events, get_ssh_timeline,
-    get_performance_metrics, get_fail2ban_status
+    get_ssh_events, get_ssh_timeline, TIMELINE_DAYS
 )
+from app.services.runner import runner
+from app.services.stream import performance_stream
+from app.services.traffic_history import get_history, HISTORY_SECONDS, RESOLUTION
 from app.services.dns_privacy import (
     get_dns_privacy_status, set_dns_privacy_enabled, flush_dns_cache
 )
@@ -19,17 +32,60 @@ from app.services.node_ops import (
     get_operations_status, run_operations_action, set_logging_profile,
     fail2ban_unban, fail2ban_restart, fail2ban_policy_set
 )
-from app.services.labels import get_labels, set_label, set_peer_metadata
+from app.services.labels import get_labels, get_labels_version, set_label, set_labels, set_peer_metadata, set_peers_metadata
 from app.services.settings import get_provisioning_defaults, set_provisioning_defaults
+from app.services.peer_sync import peer_sync
 from pydantic import BaseModel, validator
+import asyncio
 import os
 import subprocess
 import time
 import re
 import ipaddress
-from typing import List
+from typing import Dict, List
+
+import anyio.to_thread
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose serialisation shows up in /api/debug/timings."""
+
+    def render(self, content) -> bytes:
+        with timed("response.json_render"):
+            return super().render(content)
+
+
+app = FastAPI(title="Aegis Control Plane", default_response_class=TimedJSONResponse)
+
+
+@app.on_event("startup")
+def start_collector():
+    collector.start()
+    prober.start()
+    start_keypool()
+
+
+@app.on_event("shutdown")
+def stop_collector():
+    collector.stop()
+    prober.stop()
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    timings.enter("http")
+    try:
+        response = await call_next(request)
+    finally:
+        timings.leave("http")
+    elapsed = time.perf_counter() - started
+    # Route template, not the raw path, keeps label cardinality bounded.
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.observe_request(request.method, route, response.status_code, elapsed)
+    timings.record(f"route:{request.method} {route}", elapsed, response.status_code >= 500)
+    return response
 
-app = FastAPI(title="Aegis Control Plane")
 
 # --- Static frontend ---
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
@@ -79,6 +135,18 @@ class SetLabelRequest(BaseModel):
     def validate_pk(cls, v): return _validate_pubkey(v)
 
 
+class SetLabelsRequest(BaseModel):
+    labels: Dict[str, str]
+
+    @validator("labels")
+    def validate_labels(cls, v):
+        if len(v) > PEER_BULK_MAX:
+            raise ValueError("Too many labels")
+        for key in v:
+            _validate_pubkey(key)
+        return v
+
+
 class DnsPrivacyRequest(BaseModel):
     enabled: bool
 
@@ -187,13 +255,31 @@ class ProvisioningDefaultsRequest(BaseModel):
         return v
 
 
+class ProvisionBatchRequest(BaseModel):
+    count: int
+    labels: List[str] = []
+    qr: bool = False
+
+    @validator("count")
+    def validate_count(cls, v):
+        if v < 1 or v > PROVISION_BATCH_MAX:
+            raise ValueError(f"Count must be between 1 and {PROVISION_BATCH_MAX}")
+        return v
+
+    @validator("labels")
+    def validate_labels(cls, v, values):
+        if len(v) > values.get("count", 0):
+            raise ValueError("More labels than peers")
+        return [label.strip() for label in v]
+
+
 class PeerCleanupRequest(BaseModel):
     public_keys: List[str]
     days: int = 90
 
     @validator("public_keys")
     def validate_keys(cls, values):
-        if len(values) > 50:
+        if len(values) > PEER_BULK_MAX:
             raise ValueError("Too many peers selected")
         for v in values:
             _validate_pubkey(v)
@@ -228,6 +314,39 @@ def _enrich_peers(peers: list) -> list:
     return peers
 
 
+# --- Helper: conditional GET ---
+
+# Generations restart with the process; the boot stamp keeps an ETag from a
+# previous run from matching a new, unrelated generation.
+_ETAG_EPOCH = f"{int(time.time()):x}"
+
+
+def _etag(*parts) -> str:
+    # Weak: ages in the body (snapshot_age_seconds, handshake ages) may differ.
+    return 'W/"' + "-".join(str(p) for p in (_ETAG_EPOCH, *parts)) + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {t.strip().removeprefix("W/") for t in header.split(",")}
+
+
+def _conditional(request: Request, etag: str, build):
+    """304 when the client already holds `etag`; build() runs only otherwise."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return TimedJSONResponse(build(), headers=headers)
+
+
+def _snapshot_response(request: Request, name: str, snap, build):
+    return _conditional(request, _etag(name, snap.version), build)
+
+
 # --- API routes ---
 
 @app.get("/api/health", dependencies=[Depends(verify_token)])
@@ -236,10 +355,34 @@ def health():
 
 
 @app.get("/api/peers", dependencies=[Depends(verify_token)])
-def peers():
-    data = get_peers()
-    data["peers"] = _enrich_peers(data.get("peers", []))
-    return data
+def peers(request: Request, since: str | None = Query(None, max_length=64)):
+    """
+    Full list, or with `since` (the `cursor` of an earlier response) only the
+    peers added/changed and the keys removed since then. `full: true` means
+    the cursor could not be served and `peers` is the complete list.
+    """
+    table = get_peer_table()
+    if table is None:
+        return {"peers": [], "cursor": None, "full": True}
+    sync = peer_sync.sync(table, since)
+
+    def build():
+        data = get_peers(table, None if sync["full"] else sync["changed"])
+        data["peers"] = _enrich_peers(data.get("peers", []))
+        data["cursor"] = sync["cursor"]
+        data["now"] = int(time.time())
+        if since is not None:
+            data["full"] = sync["full"]
+            data["removed"] = sorted(sync["removed"])
+        return data
+
+    if since is not None:
+        return build()
+    # is_active flips with wall-clock time, so the next threshold crossing is
+    # part of the version even when the dump and labels are unchanged.
+    etag = _etag("peers", table.generation, get_labels_version(),
+                 table.next_active_change(int(time.time())) or 0)
+    return _conditional(request, etag, build)
 
 
 @app.post("/api/wg/add", dependencies=[Depends(verify_token)])
@@ -264,24 +407,60 @@ def remove_peer_endpoint(data: RemovePeerRequest):
 @app.post("/api/wg/provision", dependencies=[Depends(verify_token)])
 @app.post("/api/vpn/provision", dependencies=[Depends(verify_token)])
 def provision():
-    data = provision_peer()
+    try:
+        data = provision_peer()
+    except AllocatorUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     if "public_key" in data:
         defaults = data.get("provisioning_defaults") or get_provisioning_defaults()
-        label = ""
-        prefix = (defaults.get("label_prefix") or "").strip()
-        if prefix:
-            peer_ip = data.get("allowed_ip", "").split("/")[0]
-            suffix = peer_ip.rsplit(".", 1)[-1] if peer_ip else "peer"
-            label = f"{prefix}-{suffix}"
+        label = _default_label(defaults, data.get("allowed_ip", ""))
         set_peer_metadata(data["public_key"], label=label, created_at=int(time.time()))
     return data
 
 
+@app.post("/api/vpn/provision/batch", dependencies=[Depends(verify_token)])
+def provision_batch(data: ProvisionBatchRequest):
+    try:
+        result = provision_peers(data.count, with_qr=data.qr)
+    except AllocatorUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (RuntimeError, subprocess.CalledProcessError, OSError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result.get("status") == "error":
+        raise HTTPException(status_code=400, detail=result.get("message", "Error provisioning peers"))
+
+    defaults = result["provisioning_defaults"]
+    entries = {}
+    for i, peer in enumerate(result["peers"]):
+        label = data.labels[i] if i < len(data.labels) and data.labels[i] else ""
+        peer["label"] = label or _default_label(defaults, peer["allowed_ip"])
+        entries[peer["public_key"]] = peer["label"]
+    set_peers_metadata(entries, created_at=int(time.time()))
+    return result
+
+
+def _default_label(defaults: dict, allowed_ip: str) -> str:
+    prefix = (defaults.get("label_prefix") or "").strip()
+    if not prefix:
+        return ""
+    peer_ip = allowed_ip.split("/")[0]
+    suffix = peer_ip.rsplit(".", 1)[-1] if peer_ip else "peer"
+    return f"{prefix}-{suffix}"
+
+
+@app.get("/api/vpn/allocation", dependencies=[Depends(verify_token)])
+def allocation_status():
+    try:
+        return {"status": "ok", **get_allocation_stats()}
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # --- Label routes ---
 
 @app.get("/api/peers/labels", dependencies=[Depends(verify_token)])
-def peer_labels():
-    return get_labels()
+def peer_labels(request: Request):
+    return _conditional(request, _etag("labels", get_labels_version()), get_labels)
 
 
 @app.post("/api/peers/label", dependencies=[Depends(verify_token)])
@@ -290,22 +469,55 @@ def peer_label(data: SetLabelRequest):
     return {"status": "ok"}
 
 
+@app.post("/api/peers/labels", dependencies=[Depends(verify_token)])
+def peer_labels_set(data: SetLabelsRequest):
+    set_labels(data.labels)
+    return {"status": "ok", "updated": len(data.labels)}
+
+
 # --- Monitor routes ---
 
 @app.get("/api/monitor/system", dependencies=[Depends(verify_token)])
-def monitor_system():
-    return get_system_stats()
+async def monitor_system(request: Request):
+    snap = await collector.aget("system")
+    return _snapshot_response(request, "system", snap,
+                              lambda: {**(snap.value or {}), "snapshot_age_seconds": snap.age()})
 
 
 @app.get("/api/monitor/services", dependencies=[Depends(verify_token)])
-def monitor_services():
-    return {"services": get_services()}
+async def monitor_services(request: Request):
+    snap = await collector.aget("services")
+    return _snapshot_response(request, "services", snap,
+                              lambda: {"services": snap.value, "snapshot_age_seconds": snap.age()})
 
 
 @app.get("/api/monitor/traffic", dependencies=[Depends(verify_token)])
-def monitor_traffic():
-    peers  = _enrich_peers(get_wg_traffic())
-    return {"peers": peers}
+async def monitor_traffic(request: Request):
+    snap = await collector.aget("traffic")
+
+    def build():
+        # _enrich_peers mutates in place; the snapshot is shared between requests.
+        peers = _enrich_peers([dict(p) for p in snap.value or []])
+        return {"peers": peers, "snapshot_age_seconds": snap.age()}
+
+    return _conditional(request, _etag("traffic", snap.version, get_labels_version()), build)
+
+
+@app.get("/api/monitor/traffic/history", dependencies=[Depends(verify_token)])
+def monitor_traffic_history(
+    public_key: str,
+    window: int = Query(HISTORY_SECONDS, ge=RESOLUTION, le=HISTORY_SECONDS),
+):
+    try:
+        _validate_pubkey(public_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Make sure sampling has started even before the first collector tick.
+    collector.get("traffic_history")
+    history = get_history(public_key, window)
+    if history is None:
+        raise HTTPException(status_code=404, detail="No traffic history for this peer")
+    return history
 
 
 @app.get("/api/monitor/ssh", dependencies=[Depends(verify_token)])
@@ -314,66 +526,142 @@ def monitor_ssh():
 
 
 @app.get("/api/monitor/ssh/timeline", dependencies=[Depends(verify_token)])
-def monitor_ssh_timeline(tz_offset: int = Query(0, ge=-720, le=840)):
+def monitor_ssh_timeline(
+    tz_offset: int = Query(0, ge=-720, le=840),
+    days: int = Query(7),
+):
     """
     tz_offset: comes from client (-new Date().getTimezoneOffset()).
     Default is 0 (UTC).
+    days: 7, 30 or 90.
     """
-    return {"timeline": get_ssh_timeline(tz_offset)}
+    if days not in TIMELINE_DAYS:
+        raise HTTPException(status_code=400, detail="days must be one of 7, 30, 90")
+    return {"timeline": get_ssh_timeline(tz_offset, days), "days": days}
 
 
 @app.get("/api/monitor/fail2ban", dependencies=[Depends(verify_token)])
-def monitor_fail2ban():
-    return get_fail2ban_status()
+async def monitor_fail2ban(request: Request):
+    snap = await collector.aget("fail2ban")
+    return _snapshot_response(request, "fail2ban", snap,
+                              lambda: {**(snap.value or {}), "snapshot_age_seconds": snap.age()})
 
 
 @app.get("/api/monitor/performance", dependencies=[Depends(verify_token)])
-def api_monitor_performance():
-    metrics = get_performance_metrics()
-    
-    # Calculate active vs total users
-    peers_data = get_peers()
-    active_count = sum(1 for p in peers_data.get("peers", []) if p.get("is_active"))
-    total_count = len(peers_data.get("peers", []))
-    
-    metrics["active_peers"] = active_count
-    metrics["total_peers"] = total_count
-    
-    return metrics
+async def api_monitor_performance():
+    snap = await collector.aget("performance")
+    return {**(snap.value or {}), "snapshot_age_seconds": snap.age()}
+
+
+@app.get("/api/monitor/latency", dependencies=[Depends(verify_token)])
+def api_monitor_latency():
+    """p50/p95/p99/loss per probe target over each rolling window."""
+    return prober.stats()
+
+
+@app.get("/metrics", dependencies=[Depends(verify_scrape_token)], response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition, rendered from cached collector state."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/debug/timings", dependencies=[Depends(verify_token)])
+async def debug_timings():
+    """
+    Per-operation timings (routes, subprocesses, file/socket reads, JSON
+    rendering), the top-N slowest recent operations, in-flight counts and
+    threadpool saturation.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        **timings.snapshot(),
+        "threadpool": {
+            "size": limiter.total_tokens,
+            "busy": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        },
+        "runner": runner.stats(),
+        "collector": collector.status()["sources"],
+        "profiler_enabled": PROFILER_ENABLED,
+    }
+
+
+@app.post("/api/debug/profile", dependencies=[Depends(verify_token)], response_class=PlainTextResponse)
+async def debug_profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: int = Query(10, ge=1, le=1000),
+):
+    """
+    Samples all threads for `seconds` and returns collapsed stacks (flamegraph
+    input); the sample count and interval are in X-Profile-* headers.
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled (set AEGIS_PROFILER_ENABLED=true)")
+    try:
+        # Own thread, not the request threadpool, so a capture never takes a worker.
+        text, samples = await asyncio.to_thread(profiler.collect, seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(text, headers={
+        "X-Profile-Samples":     str(samples),
+        "X-Profile-Interval-Ms": str(interval_ms),
+    })
+
+
+@app.get("/api/monitor/stream", dependencies=[Depends(verify_token)])
+async def api_monitor_stream(request: Request):
+    """Pushes one performance frame per interval (SSE) from a shared producer."""
+    return StreamingResponse(
+        performance_stream.events(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/monitor/collector", dependencies=[Depends(verify_token)])
+async def monitor_collector():
+    return {
+        **collector.status(),
+        "stream_subscribers": performance_stream.subscribers,
+        "runner": runner.stats(),
+        "fail2ban_client": fail2ban_client.stats(),
+        "peer_sync": peer_sync.stats(),
+        "geo_cache": geo.stats(),
+    }
 
 
 @app.get("/api/system/dns-privacy", dependencies=[Depends(verify_token)])
-def dns_privacy_status():
-    return get_dns_privacy_status()
+async def dns_privacy_status():
+    return await get_dns_privacy_status()
 
 
 @app.post("/api/system/dns-privacy", dependencies=[Depends(verify_token)])
-def dns_privacy_set(data: DnsPrivacyRequest):
-    result = set_dns_privacy_enabled(data.enabled)
+async def dns_privacy_set(data: DnsPrivacyRequest):
+    result = await set_dns_privacy_enabled(data.enabled)
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "dns privacy update failed"))
     return result
 
 
 @app.post("/api/system/dns-privacy/flush", dependencies=[Depends(verify_token)])
-def dns_privacy_flush():
-    result = flush_dns_cache()
+async def dns_privacy_flush():
+    result = await flush_dns_cache()
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "dns cache flush failed"))
     return result
 
 
 @app.get("/api/system/dns-mode", dependencies=[Depends(verify_token)])
-def dns_mode_status():
-    result = get_dns_mode_status()
+async def dns_mode_status():
+    result = await get_dns_mode_status()
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "dns mode status failed"))
     return result
 
 
 @app.post("/api/system/dns-mode", dependencies=[Depends(verify_token)])
-def dns_mode_set(data: DnsModeRequest):
-    result = set_dns_mode(data.preset, data.dot_enabled)
+async def dns_mode_set(data: DnsModeRequest):
+    result = await set_dns_mode(data.preset, data.dot_enabled)
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "dns mode update failed"))
     return result
@@ -427,31 +715,30 @@ def stale_peers(days: int = Query(90, ge=1, le=365)):
 
 @app.post("/api/peers/stale/remove", dependencies=[Depends(verify_token)])
 def stale_peers_remove(data: PeerCleanupRequest):
-    stale_by_key = {p["public_key"]: p for p in _stale_peers(data.days)}
-    removed, skipped = [], []
-    for key in data.public_keys:
-        if key not in stale_by_key:
-            skipped.append(key)
-            continue
-        result = remove_peer(key)
-        if result.get("status") == "ok":
-            removed.append(key)
-        else:
-            skipped.append(key)
-    return {"status": "ok", "removed": removed, "skipped": skipped}
+    stale_keys = {p["public_key"] for p in _stale_peers(data.days)}
+    selected = [key for key in data.public_keys if key in stale_keys]
+    result = remove_peers(selected)
+
+    outcomes = {key: "not_stale" for key in data.public_keys if key not in stale_keys}
+    outcomes.update(result.get("results", {}))
+    removed = [key for key, outcome in outcomes.items() if outcome == "removed"]
+    skipped = [key for key, outcome in outcomes.items() if outcome != "removed"]
+    if result.get("status") == "error":
+        raise HTTPException(status_code=500, detail=result.get("message", "Error removing peers"))
+    return {"status": "ok", "removed": removed, "skipped": skipped, "results": outcomes}
 
 
 @app.get("/api/system/operations", dependencies=[Depends(verify_token)])
-def operations_status():
-    result = get_operations_status()
+async def operations_status():
+    result = await get_operations_status()
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "operations status failed"))
     return result
 
 
 @app.post("/api/system/operations/action", dependencies=[Depends(verify_token)])
-def operations_action(data: OperationsActionRequest):
-    result = run_operations_action(data.action)
+async def operations_action(data: OperationsActionRequest):
+    result = await run_operations_action(data.action)
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "operations action failed"))
     return result
@@ -471,32 +758,32 @@ def access_control_rotate_token():
 
 
 @app.post("/api/system/logging-profile", dependencies=[Depends(verify_token)])
-def logging_profile_set(data: LoggingProfileRequest):
-    result = set_logging_profile(data.profile)
+async def logging_profile_set(data: LoggingProfileRequest):
+    result = await set_logging_profile(data.profile)
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "logging profile update failed"))
     return result
 
 
 @app.post("/api/system/fail2ban/unban", dependencies=[Depends(verify_token)])
-def fail2ban_unban_endpoint(data: Fail2banUnbanRequest):
-    result = fail2ban_unban(data.ip)
+async def fail2ban_unban_endpoint(data: Fail2banUnbanRequest):
+    result = await fail2ban_unban(data.ip)
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "fail2ban unban failed"))
     return result
 
 
 @app.post("/api/system/fail2ban/restart", dependencies=[Depends(verify_token)])
-def fail2ban_restart_endpoint():
-    result = fail2ban_restart()
+async def fail2ban_restart_endpoint():
+    result = await fail2ban_restart()
     if result.get("status") == "error":
         raise HTTPException(status_code=500, detail=result.get("message", "fail2ban restart failed"))
     return result
 
 
 @app.post("/api/system/fail2ban/policy", dependencies=[Depends(verify_token)])
-def fail2ban_policy_endpoint(data: Fail2banPolicyRequest):
-    result = fail2ban_policy_set(
+async def fail2ban_policy_endpoint(data: Fail2banPolicyRequest):
+    result = await fail2ban_policy_set(
         data.sshd_maxretry,
         data.sshd_findtime,
         data.sshd_bantime,
@@ -511,23 +798,23 @@ def fail2ban_policy_endpoint(data: Fail2banPolicyRequest):
 # --- System actions ---
 
 @app.post("/api/system/reboot", dependencies=[Depends(verify_token)])
-def system_reboot():
+async def system_reboot():
     """
     Restarts the server in 5 minutes.
     Triggered from the dashboard banner when reboot is required.
     """
     try:
-        subprocess.run(["sudo", "shutdown", "-r", "+5"], check=True)
+        await runner.run(["sudo", "shutdown", "-r", "+5"], cls="system", timeout=15, check=True)
         return {"status": "ok", "message": "Server will reboot in 5 minutes."}
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
         raise HTTPException(status_code=500, detail=f"shutdown failed: {e}")
 
 
 @app.delete("/api/system/reboot", dependencies=[Depends(verify_token)])
-def system_reboot_cancel():
+async def system_reboot_cancel():
     """Cancels a scheduled reboot."""
     try:
-        subprocess.run(["sudo", "shutdown", "-c"], check=True)
+        await runner.run(["sudo", "shutdown", "-c"], cls="system", timeout=15, check=True)
         return {"status": "ok", "message": "Scheduled reboot cancelled."}
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
         raise HTTPException(status_code=500, detail=f"shutdown -c failed: {e}")
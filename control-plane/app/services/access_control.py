@@ -1,10 +1,14 @@
 import ipaddress
 import os
 import secrets
+import tempfile
 import time
 from pathlib import Path
 
-from app.auth import DASHBOARD_AUTH_ENABLED, DASHBOARD_AUTH_TOKEN_FILE, current_auth_token
+from app.auth import (
+    DASHBOARD_AUTH_ENABLED, DASHBOARD_AUTH_TOKEN_FILE,
+    current_auth_token, invalidate_token_cache, token_status,
+)
 
 
 DASHBOARD_BIND_HOST = os.getenv("DASHBOARD_BIND_HOST", "")
@@ -39,6 +43,7 @@ def get_access_control_status() -> dict:
         "token_configured": bool(current_auth_token()),
         "token_file_exists": token_file_exists,
         "token_age_seconds": token_age,
+        **token_status(),
         "bind_host": DASHBOARD_BIND_HOST,
         "bind_port": DASHBOARD_BIND_PORT,
         "bind_warning": _bind_warning(DASHBOARD_BIND_HOST),
@@ -52,8 +57,31 @@ def rotate_access_token() -> dict:
     token_path = Path(DASHBOARD_AUTH_TOKEN_FILE)
     token_path.parent.mkdir(parents=True, exist_ok=True)
     new_token = secrets.token_urlsafe(32)
-    token_path.write_text(new_token + "\n")
-    token_path.chmod(0o600)
+    # Only the primary (first) token is replaced; extra lines, e.g. a
+    # separate scrape token, are kept.
+    try:
+        lines = token_path.read_text().splitlines()
+    except OSError:
+        lines = []
+    primary = current_auth_token()
+    kept = [line for line in lines if line.strip() and line.strip() != primary]
+    # mkstemp creates the file 0600, so the live tokens are never readable
+    # by others, not even before the rename.
+    fd, tmp = tempfile.mkstemp(dir=token_path.parent, prefix=f".{token_path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join([new_token, *kept]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, token_path)
+    except OSError as e:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return {"status": "error", "message": f"could not write token file: {e}"}
+    # The previous token stays valid for the grace period.
+    invalidate_token_cache()
 
     status = get_access_control_status()
     status["new_token"] = new_token
@@ -0,0 +1,169 @@
+# control-plane/app/services/collector.py
+# Background snapshot collector for the monitor endpoints.
+# A scheduler thread hands each due source to a worker pool with one slot per
+# source, so a slow source (fail2ban CLI fallback, probes, log reads) never
+# delays the others. A source still running when it is due again is skipped
+# and counted as an overrun. Requests only read the latest snapshot, so
+# per-request cost does not grow with viewers.
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple
+
+
+COLLECTOR_ENABLED = os.getenv("AEGIS_COLLECTOR_ENABLED", "true").lower() == "true"
+
+_TICK_SECONDS = 0.5
+
+
+class Snapshot(NamedTuple):
+    """Latest result of a source. Treat `value` as read-only; copy before mutating."""
+    value: object
+    timestamp: float
+    duration: float
+    error: str | None
+    version: int = 0   # bumped only when the value differs from the previous one
+
+    def age(self) -> float:
+        return max(0.0, round(time.time() - self.timestamp, 2))
+
+
+class _Source:
+    def __init__(self, name: str, fn: Callable[[], object], interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.next_run = 0.0
+        self.running_since: float | None = None   # set while a worker refreshes it
+        self.overruns = 0                         # times it was due while still running
+
+
+class Collector:
+    def __init__(self):
+        self._sources: dict[str, _Source] = {}
+        self._snapshots: dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._listeners: list[Callable[[str, float, str | None], None]] = []
+
+    def register(self, name: str, fn: Callable[[], object], interval: float) -> None:
+        self._sources[name] = _Source(name, fn, interval)
+
+    def add_listener(self, fn: Callable[[str, float, str | None], None]) -> None:
+        """fn(source, duration, error) is called after every refresh."""
+        self._listeners.append(fn)
+
+    def _refresh(self, source: _Source) -> Snapshot:
+        started = time.time()
+        previous = self._snapshots.get(source.name)
+        version = previous.version if previous else 0
+        try:
+            value = source.fn()
+            if previous is None or value != previous.value:
+                version += 1
+            snap = Snapshot(value, started, round(time.time() - started, 4), None, version)
+        except Exception as e:
+            # Keep serving the last good value (and its age); surface the failure.
+            value = previous.value if previous else None
+            stamp = previous.timestamp if previous else started
+            snap = Snapshot(value, stamp, round(time.time() - started, 4), str(e), version)
+        with self._lock:
+            # Copy-on-write: readers holding the old dict are never affected.
+            snapshots = dict(self._snapshots)
+            snapshots[source.name] = snap
+            self._snapshots = snapshots
+        source.next_run = started + source.interval
+        for fn in self._listeners:
+            fn(source.name, snap.duration, snap.error)
+        return snap
+
+    def get(self, name: str) -> Snapshot:
+        """
+        Returns the latest snapshot for a source. If the thread is not running
+        (disabled or not yet started) or the source was never collected, the
+        source is refreshed inline, at most once per interval.
+        """
+        source = self._sources[name]
+        snap = self._snapshots.get(name)
+        running = self._thread is not None and self._thread.is_alive()
+        if snap is None or (not running and time.time() >= source.next_run):
+            snap = self._refresh(source)
+        return snap
+
+    async def aget(self, name: str) -> Snapshot:
+        """get() for async handlers: never refreshes on the event loop."""
+        snap = self._snapshots.get(name)
+        if snap is not None and self._thread is not None and self._thread.is_alive():
+            return snap
+        return await asyncio.to_thread(self.get, name)
+
+    def status(self) -> dict:
+        snapshots = self._snapshots
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "sources": {
+                name: {
+                    "interval": source.interval,
+                    "age_seconds": snapshots[name].age() if name in snapshots else None,
+                    "duration_seconds": snapshots[name].duration if name in snapshots else None,
+                    "error": snapshots[name].error if name in snapshots else None,
+                    "version": snapshots[name].version if name in snapshots else None,
+                    "running_seconds": (
+                        round(time.time() - source.running_since, 2)
+                        if source.running_since is not None else None
+                    ),
+                    "overruns": source.overruns,
+                }
+                for name, source in self._sources.items()
+            },
+        }
+
+    def _work(self, source: _Source) -> None:
+        try:
+            self._refresh(source)
+        finally:
+            source.running_since = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            now = time.time()
+            for source in list(self._sources.values()):
+                if self._stop.is_set():
+                    break
+                if now < source.next_run:
+                    continue
+                if source.running_since is not None:
+                    # Still on the previous refresh: count it, try next interval.
+                    source.overruns += 1
+                    source.next_run = now + source.interval
+                    continue
+                source.running_since = now
+                self._pool.submit(self._work, source)
+            self._stop.wait(_TICK_SECONDS)
+
+    def start(self) -> None:
+        if not COLLECTOR_ENABLED or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self._sources)),
+                                        thread_name_prefix="aegis-collector")
+        self._thread = threading.Thread(target=self._run, name="aegis-collector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool:
+            # Running refreshes finish on their own; do not wait for a slow one.
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+collector = Collector()
@@ -1,16 +1,17 @@
 import json
 import subprocess
 
+from app.services.runner import runner
+
 
 HELPER = "/usr/local/sbin/aegis-dns-mode"
 
 
-def _run_helper(action: str) -> dict:
+async def _run_helper(action: str) -> dict:
     try:
-        result = subprocess.run(
+        result = await runner.run(
             ["sudo", HELPER, action],
-            capture_output=True,
-            text=True,
+            cls="helper_status" if action == "status" else "helper",
             timeout=20,
             check=True,
         )
@@ -26,10 +27,10 @@ def _run_helper(action: str) -> dict:
         return {"status": "ok", "message": result.stdout.strip()}
 
 
-def get_dns_mode_status() -> dict:
-    return _run_helper("status")
+async def get_dns_mode_status() -> dict:
+    return await _run_helper("status")
 
 
-def set_dns_mode(preset: str, dot_enabled: bool) -> dict:
+async def set_dns_mode(preset: str, dot_enabled: bool) -> dict:
     mode = "dot" if dot_enabled else "plain"
-    return _run_helper(f"set-{preset}-{mode}")
+    return await _run_helper(f"set-{preset}-{mode}")
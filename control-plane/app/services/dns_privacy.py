@@ -1,16 +1,17 @@
 import json
 import subprocess
 
+from app.services.runner import runner
+
 
 HELPER = "/usr/local/sbin/aegis-dns-privacy"
 
 
-def _run_helper(action: str) -> dict:
+async def _run_helper(action: str) -> dict:
     try:
-        result = subprocess.run(
+        result = await runner.run(
             ["sudo", HELPER, action],
-            capture_output=True,
-            text=True,
+            cls="helper_status" if action == "status" else "helper",
             timeout=20,
             check=True,
         )
@@ -30,13 +31,13 @@ def _run_helper(action: str) -> dict:
         return {"status": "ok", "message": output}
 
 
-def get_dns_privacy_status() -> dict:
-    return _run_helper("status")
+async def get_dns_privacy_status() -> dict:
+    return await _run_helper("status")
 
 
-def set_dns_privacy_enabled(enabled: bool) -> dict:
-    return _run_helper("enable" if enabled else "disable")
+async def set_dns_privacy_enabled(enabled: bool) -> dict:
+    return await _run_helper("enable" if enabled else "disable")
 
 
-def flush_dns_cache() -> dict:
-    return _run_helper("flush")
+async def flush_dns_cache() -> dict:
+    return await _run_helper("flush")
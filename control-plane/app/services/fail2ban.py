@@ -0,0 +1,185 @@
+# control-plane/app/services/fail2ban.py
+# In-process client for the fail2ban server socket.
+# Speaks the same protocol as fail2ban-client (a pickled command list
+# terminated by <F2B_END_COMMAND>, answered by a pickled (code, result)) over
+# one long-lived connection, so a jail status is a socket round trip instead
+# of a `sudo fail2ban-client` process. Replies are decoded with a restricted
+# unpickler that never resolves classes outside a small builtins allowlist.
+# When the socket is not reachable by the API user, jail stats fall back to
+# the CLI through sudo.
+
+import io
+import os
+import pickle
+import socket
+import subprocess
+import threading
+
+from app.services.timings import timed
+
+F2B_SOCKET = os.getenv("FAIL2BAN_SOCKET", "/var/run/fail2ban/fail2ban.sock")
+F2B_TIMEOUT = float(os.getenv("FAIL2BAN_SOCKET_TIMEOUT", "3"))
+
+_END = b"<F2B_END_COMMAND>"
+_CLOSE = b"<F2B_CLOSE_COMMAND>"
+_MAX_REPLY = 4 * 1024 * 1024
+
+_SAFE_BUILTINS = {"list", "tuple", "dict", "set", "frozenset", "str", "bytes", "int", "float", "bool"}
+
+
+class Fail2banError(Exception):
+    """The server answered with an error (e.g. unknown jail)."""
+
+
+class _Opaque:
+    """Stand-in for server-side classes (IPAddr, exceptions) in a reply."""
+
+    def __init__(self, *args):
+        self.args = args
+
+    def __setstate__(self, state):
+        self.state = state
+
+    def __str__(self):
+        return str(self.args[0]) if self.args else ""
+
+
+class _ReplyUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        # Protocol 2 pickles name the module "__builtin__" (Python 2 spelling).
+        if module in ("builtins", "__builtin__") and name in _SAFE_BUILTINS:
+            return super().find_class(module, name)
+        return _Opaque
+
+
+class Fail2banClient:
+    def __init__(self, path: str = F2B_SOCKET, timeout: float = F2B_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connects = 0
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.connects += 1
+        return sock
+
+    def _close(self) -> None:
+        if self._sock is not None:
+            try:
+                # Like fail2ban's CSocket.close(): the server splits on END.
+                self._sock.sendall(_CLOSE + _END)
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+
+    def _roundtrip(self, payload: bytes):
+        self._sock.sendall(payload + _END)
+        reply = b""
+        while not reply.endswith(_END):
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("fail2ban server closed the connection")
+            reply += chunk
+            if len(reply) > _MAX_REPLY:
+                raise ConnectionError("fail2ban reply too large")
+        return _ReplyUnpickler(io.BytesIO(reply[:-len(_END)])).load()
+
+    def command(self, *args):
+        """
+        Sends one command (e.g. "status", "sshd") and returns its result.
+        Raises OSError when the server is unreachable and Fail2banError when
+        it rejects the command. A dropped connection is re-opened once.
+        """
+        payload = pickle.dumps([str(a) for a in args], protocol=2)
+        with timed("fail2ban.socket", detail=" ".join(map(str, args))), self._lock:
+            for attempt in (0, 1):
+                fresh = self._sock is None
+                if fresh:
+                    self._sock = self._connect()
+                try:
+                    code, result = self._roundtrip(payload)
+                    break
+                except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                    self._close()
+                    if fresh or attempt:
+                        raise
+            self.requests += 1
+        if code != 0:
+            raise Fail2banError(str(result))
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def stats(self) -> dict:
+        return {
+            "socket":    self.path,
+            "connected": self._sock is not None,
+            "requests":  self.requests,
+            "connects":  self.connects,
+        }
+
+
+client = Fail2banClient()
+
+
+def _status_counts(result) -> dict:
+    """Flattens [("Filter", [(k, v), ...]), ("Actions", [...])] into {k: v}."""
+    counts = {}
+    for _, section in result or ():
+        for item in section or ():
+            if isinstance(item, (list, tuple)) and len(item) == 2 and isinstance(item[1], int):
+                counts[item[0]] = item[1]
+    return counts
+
+
+def _cli_counts(jail: str) -> dict:
+    with timed("fail2ban.cli", detail=jail):
+        out = subprocess.check_output(
+            ["sudo", "fail2ban-client", "status", jail],
+            text=True, stderr=subprocess.DEVNULL, timeout=5,
+        )
+    counts = {}
+    for line in out.splitlines():
+        key, sep, value = line.strip(" |`-\t").partition(":")
+        if sep and value.strip().isdigit():
+            counts[key.strip()] = int(value)
+    return counts
+
+
+def jail_stats(jail: str) -> dict:
+    """
+    {available, currently_banned, total_banned, total_failed, transport}.
+    Tries the socket first; falls back to the CLI only when the socket itself
+    is unusable (missing, no permission, garbled reply), not when the jail
+    does not exist.
+    """
+    stats = {"available": False, "currently_banned": 0, "total_banned": 0,
+             "total_failed": 0, "transport": "socket"}
+    try:
+        counts = _status_counts(client.command("status", jail))
+    except Fail2banError:
+        return stats
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        # Unreachable socket, or a garbled/dropped reply on the retry.
+        stats["transport"] = "cli"
+        try:
+            counts = _cli_counts(jail)
+        except (OSError, subprocess.SubprocessError):
+            return stats
+    stats["available"] = True
+    stats["currently_banned"] = counts.get("Currently banned", 0)
+    stats["total_banned"] = counts.get("Total banned", 0)
+    stats["total_failed"] = counts.get("Total failed", 0)
+    return stats
@@ -0,0 +1,146 @@
+# control-plane/app/services/geoip.py
+# Geo-IP lookups with a bounded LRU cache.
+# Misses (private IPs, unknown addresses, missing DB) are cached too, the
+# MaxMind reader is opened in mmap mode, and the .mmdb file is re-stat'ed at
+# most every RELOAD_CHECK_SECONDS to pick up a replaced database.
+
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+GEO_DB_PATH = os.getenv("GEO_DB_PATH", "/opt/aegis/GeoLite2-City.mmdb")
+GEO_CACHE_SIZE = int(os.getenv("GEO_CACHE_SIZE", "4096"))
+
+RELOAD_CHECK_SECONDS = 30
+
+
+class GeoLookup:
+    def __init__(self, path: str, maxsize: int):
+        self.path = path
+        self.maxsize = maxsize
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._reader = None
+        self._db_id = None          # (st_ino, st_mtime_ns) of the open database
+        self._next_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.negative = 0           # lookups that produced "" (cached as well)
+        self.reloads = 0
+
+    def _refresh_reader(self) -> None:
+        """Opens or re-opens the database if it appeared or changed on disk. Caller holds the lock."""
+        now = time.time()
+        if now < self._next_check:
+            return
+        self._next_check = now + RELOAD_CHECK_SECONDS
+
+        try:
+            st = os.stat(self.path)
+            db_id = (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            db_id = None
+
+        if db_id == self._db_id:
+            return
+
+        if self._reader is not None:
+            try:
+                self._reader.close()
+            except Exception:
+                pass
+        self._reader = None
+        self._db_id = db_id
+        # Cached answers came from the old database (or from having none).
+        self._cache.clear()
+
+        if db_id is None or maxminddb is None:
+            return
+        try:
+            self._reader = maxminddb.open_database(self.path, maxminddb.MODE_MMAP)
+            self.reloads += 1
+        except Exception:
+            self._reader = None
+
+    def _resolve(self, ip: str) -> str:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return ""
+        if not addr.is_global or self._reader is None:
+            return ""
+        try:
+            match = self._reader.get(ip)
+        except Exception:
+            return ""
+        if not match:
+            return ""
+
+        iso = match.get("country", {}).get("iso_code")
+        city = match.get("city", {}).get("names", {}).get("en")
+        if not iso:
+            return ""
+        flag = chr(ord(iso[0]) + 127397) + chr(ord(iso[1]) + 127397)
+        if city:
+            return f"{flag} {iso} · {city}"
+        return f"{flag} {iso}"
+
+    def _lookup_locked(self, ip: str) -> str:
+        cached = self._cache.get(ip)
+        if cached is not None:
+            self._cache.move_to_end(ip)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        value = self._resolve(ip)
+        if not value:
+            self.negative += 1
+        self._cache[ip] = value
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return value
+
+    def lookup(self, ip: str) -> str:
+        with self._lock:
+            self._refresh_reader()
+            return self._lookup_locked(ip)
+
+    def lookup_many(self, ips) -> dict:
+        """Resolves each distinct IP once; returns {ip: geo}."""
+        unique = dict.fromkeys(ips)
+        with self._lock:
+            self._refresh_reader()
+            return {ip: self._lookup_locked(ip) for ip in unique}
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "db_loaded": self._reader is not None,
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative": self.negative,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                "reloads": self.reloads,
+            }
+
+
+geo = GeoLookup(GEO_DB_PATH, GEO_CACHE_SIZE)
+
+
+def get_geo_info(ip: str) -> str:
+    return geo.lookup(ip)
+
+
+def lookup_many(ips) -> dict:
+    return geo.lookup_many(ips)
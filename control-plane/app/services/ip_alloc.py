@@ -0,0 +1,348 @@
+# control-plane/app/services/ip_alloc.py
+# Bitmap address allocator for peer IPs.
+# One bit per host offset inside a pool; a moving cursor makes next-free
+# lookups O(1) amortised. Addresses are reserved under a lock (so concurrent
+# provisioning never shares an address), committed once the peer exists, and
+# released again on failure or peer removal. A reservation never expires:
+# a slow provision keeps its addresses until it commits or releases them
+# (pending addresses are not persisted, so a crash leaks nothing). Nothing is
+# handed out until the live peers have been read once; the used bits are then
+# rebuilt from the live peers plus pending reservations (not merged with the
+# file), and again every `resync_interval` and when a pool runs out, so peers
+# removed outside the API are reclaimed. Committed state is persisted with a
+# temp-file + rename write.
+
+import base64
+import ipaddress
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class PoolExhausted(RuntimeError):
+    pass
+
+
+class AllocatorUnavailable(RuntimeError):
+    """The live peers could not be read yet, so no address is known to be free."""
+
+
+class AddressPool:
+    def __init__(self, cidr: str, start: int, end: int = None, max_size: int = 1 << 20,
+                 exclude=()):
+        """
+        cidr:    e.g. "10.66.0.0/16" or "fd66:66::/64"
+        start:   first allocatable host offset (lower offsets stay static/reserved)
+        end:     last allocatable offset (default: last usable host)
+        max_size caps the bitmap so IPv6 /64s stay small (pool = first max_size hosts)
+        exclude: addresses that must never be handed out (server, admin peer, ...)
+        """
+        self.network = ipaddress.ip_network(cidr, strict=False)
+        last = self.network.num_addresses - (2 if self.network.version == 4 else 1)
+        end = min(last if end is None else end, last, start + max_size - 1)
+        if end < start:
+            raise ValueError(f"empty address pool for {cidr}")
+        self.start = start
+        self.size = end - start + 1
+        self.bits = bytearray((self.size + 7) // 8)
+        self._exclude = set()
+        for ip in exclude:
+            idx = self._index(ip)
+            if idx is not None:
+                self._exclude.add(idx)
+        self.reset()
+
+    def reset(self) -> None:
+        """Frees every address except the excluded ones."""
+        self.bits[:] = bytes(len(self.bits))
+        self.cursor = 0
+        self.used = 0
+        for idx in self._exclude:
+            self._set(idx)
+        # Bits past the pool end in the last byte are never free.
+        for idx in range(self.size, len(self.bits) * 8):
+            self.bits[idx >> 3] |= 1 << (idx & 7)
+
+    # ── bit helpers ──
+
+    def _index(self, ip) -> int | None:
+        try:
+            addr = ipaddress.ip_address(str(ip).split("/")[0])
+        except ValueError:
+            return None
+        if addr.version != self.network.version or addr not in self.network:
+            return None
+        idx = int(addr) - int(self.network.network_address) - self.start
+        return idx if 0 <= idx < self.size else None
+
+    def _test(self, idx: int) -> bool:
+        return bool(self.bits[idx >> 3] & (1 << (idx & 7)))
+
+    def _set(self, idx: int) -> None:
+        if not self._test(idx):
+            self.bits[idx >> 3] |= 1 << (idx & 7)
+            self.used += 1
+
+    def _clear(self, idx: int) -> None:
+        if self._test(idx) and idx not in self._exclude:
+            self.bits[idx >> 3] &= ~(1 << (idx & 7))
+            self.used -= 1
+            self.cursor = min(self.cursor, idx >> 3)
+
+    def address(self, idx: int):
+        return self.network.network_address + self.start + idx
+
+    # ── public ──
+
+    def mark(self, ip) -> bool:
+        idx = self._index(ip)
+        if idx is None:
+            return False
+        self._set(idx)
+        return True
+
+    def free(self, ip) -> bool:
+        idx = self._index(ip)
+        if idx is None:
+            return False
+        self._clear(idx)
+        return True
+
+    def next_free(self) -> int:
+        """Returns and marks the lowest free offset at or after the cursor."""
+        n = len(self.bits)
+        for step in range(n):
+            byte_idx = (self.cursor + step) % n
+            byte = self.bits[byte_idx]
+            if byte == 0xFF:
+                continue
+            bit = (~byte & (byte + 1)).bit_length() - 1   # lowest zero bit
+            idx = (byte_idx << 3) + bit
+            self.cursor = byte_idx
+            self._set(idx)
+            return idx
+        raise PoolExhausted(f"No available IP in {self.network}")
+
+    def dump(self, pending=()) -> dict:
+        """Serialises the bitmap; `pending` addresses (uncommitted) are left out."""
+        bits = bytearray(self.bits)
+        for ip in pending:
+            idx = self._index(ip)
+            if idx is not None and idx not in self._exclude:
+                bits[idx >> 3] &= ~(1 << (idx & 7))
+        return {
+            "cidr":   str(self.network),
+            "start":  self.start,
+            "size":   self.size,
+            "bitmap": base64.b64encode(bytes(bits)).decode(),
+        }
+
+    def load(self, data: dict) -> bool:
+        """Merges a persisted bitmap (a seeded Allocator replaces it on its first sync)."""
+        if (data.get("cidr"), data.get("start"), data.get("size")) != (str(self.network), self.start, self.size):
+            return False
+        try:
+            bits = base64.b64decode(data["bitmap"])
+        except (KeyError, ValueError):
+            return False
+        if len(bits) != len(self.bits):
+            return False
+        for i, b in enumerate(bits):
+            self.bits[i] |= b
+        self.used = sum(bin(b).count("1") for b in self.bits) - (len(self.bits) * 8 - self.size)
+        self.cursor = 0
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "cidr": str(self.network),
+            "first": str(self.address(0)),
+            "last": str(self.address(self.size - 1)),
+            "size": self.size,
+            "used": self.used,
+            "free": self.size - self.used,
+        }
+
+
+_reservation_ids = itertools.count(1)
+
+
+class Reservation:
+    __slots__ = ("id", "addresses")
+
+    def __init__(self, addresses: list):
+        self.id = next(_reservation_ids)    # never reused, unlike id()
+        self.addresses = addresses          # [(pool_index, ip_interface_str)]
+
+    @property
+    def allowed_ips(self) -> str:
+        return ",".join(addr for _, addr in self.addresses)
+
+
+class Allocator:
+    """Allocates one address per pool (IPv4, plus IPv6 for dual-stack) per peer."""
+
+    def __init__(self, pools: list, state_path: str = None, seed=None, resync_interval: float = 300):
+        """
+        seed: callable returning the addresses currently in use (live peers),
+        or None when they cannot be read. It is called under the allocator
+        lock and must read the backend fresh (every committed peer is live by
+        then). Without a seed the persisted bitmap is authoritative.
+        """
+        self.pools = pools
+        self.state_path = state_path
+        self.seed = seed
+        self.resync_interval = resync_interval
+        self._pending: dict[int, Reservation] = {}
+        self._lock = threading.Lock()
+        self._file_loaded = False
+        self._seeded = seed is None
+        self._synced_at = 0.0
+
+    def _ensure_loaded(self) -> None:
+        if not self._file_loaded:
+            self._file_loaded = True
+            if self.state_path:
+                try:
+                    with open(self.state_path) as f:
+                        state = json.load(f)
+                    for pool, data in zip(self.pools, state.get("pools", [])):
+                        pool.load(data)
+                except (OSError, ValueError):
+                    pass
+        if not self._seeded:
+            self._sync()
+
+    def _sync(self) -> bool:
+        """
+        Rebuilds the used bits from the live peers plus pending reservations.
+        Returns False (state untouched) if the backend could not be read.
+        Caller holds _lock.
+        """
+        if self.seed is None:
+            return False
+        used = self.seed()
+        if used is None:
+            return False
+        for pool in self.pools:
+            pool.reset()
+        for ip in used:
+            for pool in self.pools:
+                pool.mark(ip)
+        for res in self._pending.values():
+            for pool_idx, addr in res.addresses:
+                self.pools[pool_idx].mark(addr)
+        self._seeded = True
+        self._synced_at = time.monotonic()
+        self._persist()
+        return True
+
+    def _take(self, count: int) -> list:
+        """Marks addresses for `count` peers; all or nothing. Caller holds _lock."""
+        taken = []
+        try:
+            for _ in range(count):
+                addresses = []
+                taken.append(addresses)
+                for pool_idx, pool in enumerate(self.pools):
+                    idx = pool.next_free()
+                    prefix = 32 if pool.network.version == 4 else 128
+                    addresses.append((pool_idx, f"{pool.address(idx)}/{prefix}"))
+        except PoolExhausted:
+            for addresses in taken:
+                for pool_idx, addr in addresses:
+                    self.pools[pool_idx].free(addr)
+            raise
+        return taken
+
+    def _release_locked(self, res: Reservation) -> None:
+        for pool_idx, addr in res.addresses:
+            self.pools[pool_idx].free(addr)
+
+    def _persist(self) -> None:
+        if not self.state_path:
+            return
+        pending = [[] for _ in self.pools]
+        for res in self._pending.values():
+            for pool_idx, addr in res.addresses:
+                pending[pool_idx].append(addr)
+        data = json.dumps({"pools": [p.dump(pending[i]) for i, p in enumerate(self.pools)]})
+        directory = os.path.dirname(self.state_path) or "."
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".ip_alloc.")
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass
+
+    def reserve(self) -> Reservation:
+        """Reserves the next free address in every pool until commit/release."""
+        return self.reserve_many(1)[0]
+
+    def reserve_many(self, count: int) -> list:
+        """
+        Reserves addresses for `count` peers at once; all or nothing. Raises
+        AllocatorUnavailable until the live peers have been read once.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if not self._seeded:
+                raise AllocatorUnavailable("live peers could not be read; address pool not initialised")
+            if self.seed is not None and time.monotonic() - self._synced_at >= self.resync_interval:
+                self._sync()
+            try:
+                taken = self._take(count)
+            except PoolExhausted:
+                # Peers removed outside the API still hold bits until a resync.
+                if not self._sync():
+                    raise
+                taken = self._take(count)
+            reservations = [Reservation(addresses) for addresses in taken]
+            for res in reservations:
+                self._pending[res.id] = res
+            return reservations
+
+    def commit(self, res: Reservation) -> None:
+        self.commit_many([res])
+
+    def commit_many(self, reservations: list) -> None:
+        """Marks reservations as used and persists the bitmap once."""
+        with self._lock:
+            for res in reservations:
+                self._pending.pop(res.id, None)
+            self._persist()
+
+    def release(self, *reservations: Reservation) -> None:
+        with self._lock:
+            for res in reservations:
+                if self._pending.pop(res.id, None) is not None:
+                    self._release_locked(res)
+
+    def claim(self, allowed_ips: str) -> None:
+        """Marks externally chosen addresses (manual /api/vpn/add) as used."""
+        with self._lock:
+            self._ensure_loaded()
+            changed = [pool.mark(ip) for ip in allowed_ips.split(",") for pool in self.pools]
+            if any(changed):
+                self._persist()
+
+    def reclaim(self, allowed_ips: str) -> None:
+        """Frees the addresses of a removed peer."""
+        with self._lock:
+            self._ensure_loaded()
+            changed = [pool.free(ip) for ip in allowed_ips.split(",") for pool in self.pools]
+            if any(changed):
+                self._persist()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                "pools": [p.stats() for p in self.pools],
+                "pending_reservations": len(self._pending),
+                "seeded": self._seeded,
+            }
@@ -2,20 +2,35 @@
 # Peer label + metadata store.
 # Format: { pubkey: {"label": str, "created_at": int|None} }
 # Legacy format (str value) is auto-migrated.
+# The parsed file is cached and only re-read when its inode/size/mtime
+# changes; writes go through a temp file + rename and refresh the cache.
 
 import json
 import os
+import tempfile
 import threading
-import time
 
 LABELS_PATH = os.getenv("PEER_LABELS_PATH", "/opt/aegis/peer_labels.json")
+# Compact JSON is ~2x smaller and faster to parse at large peer counts.
+LABELS_COMPACT = os.getenv("PEER_LABELS_COMPACT", "false").lower() == "true"
+
 _lock = threading.Lock()
+_cache = {"data": {}, "file_id": False}   # False = never loaded
+
+
+def _file_id():
+    try:
+        st = os.stat(LABELS_PATH)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
 
 
 def _read_raw() -> dict:
     try:
         with open(LABELS_PATH) as f:
-            return json.load(f)
+            data = json.load(f)
+            return data if isinstance(data, dict) else {}
     except (FileNotFoundError, json.JSONDecodeError):
         return {}
 
@@ -31,9 +46,30 @@ def _migrate(raw: dict) -> dict:
     return result
 
 
+def _load() -> dict:
+    """Returns the cached mapping, re-reading only if the file changed. Caller holds _lock."""
+    file_id = _file_id()
+    if file_id != _cache["file_id"]:
+        _cache["data"] = _migrate(_read_raw())
+        _cache["file_id"] = file_id
+    return _cache["data"]
+
+
 def get_labels() -> dict:
-    """Returns all metadata: {pubkey: {"label": str, "created_at": int|None}}"""
-    return _migrate(_read_raw())
+    """
+    Returns all metadata: {pubkey: {"label": str, "created_at": int|None}}.
+    The mapping is shared between callers; treat it as read-only.
+    """
+    with _lock:
+        return _load()
+
+
+def get_labels_version() -> str:
+    """Short token that changes whenever the labels file does (for ETags)."""
+    with _lock:
+        _load()
+        file_id = _cache["file_id"]
+    return "0" if file_id is None else "{:x}.{:x}.{:x}".format(*file_id)
 
 
 def get_label_names() -> dict:
@@ -41,37 +77,71 @@ def get_label_names() -> dict:
     return {k: v["label"] for k, v in get_labels().items()}
 
 
+def _apply_label(data: dict, public_key: str, label: str) -> None:
+    label = label.strip()
+    existing = data.get(public_key, {})
+    if label:
+        data[public_key] = {
+            "label": label,
+            "created_at": existing.get("created_at"),
+        }
+    else:
+        # keep metadata if label is cleared, but empty the label field
+        if existing.get("created_at"):
+            data[public_key] = {"label": "", "created_at": existing["created_at"]}
+        else:
+            data.pop(public_key, None)
+
+
 def set_label(public_key: str, label: str) -> None:
+    set_labels({public_key: label})
+
+
+def set_labels(entries: dict) -> None:
+    """Bulk set_label: {pubkey: label}; an empty label clears it. One file write."""
     with _lock:
-        data = _migrate(_read_raw())
-        label = label.strip()
-        existing = data.get(public_key, {})
-        if label:
-            data[public_key] = {
-                "label": label,
-                "created_at": existing.get("created_at"),
-            }
-        else:
-            # keep metadata if label is cleared, but empty the label field
-            if existing.get("created_at"):
-                data[public_key] = {"label": "", "created_at": existing["created_at"]}
-            else:
-                data.pop(public_key, None)
+        data = dict(_load())
+        for public_key, label in entries.items():
+            _apply_label(data, public_key, label)
         _write(data)
 
 
 def set_peer_metadata(public_key: str, label: str = None, created_at: int = None) -> None:
     """Create metadata for a new peer (called during provision)."""
+    set_peers_metadata({public_key: label}, created_at=created_at)
+
+
+def set_peers_metadata(entries: dict, created_at: int = None) -> None:
+    """Bulk variant of set_peer_metadata: {pubkey: label}, one file write."""
     with _lock:
-        data = _migrate(_read_raw())
-        existing = data.get(public_key, {})
-        data[public_key] = {
-            "label":      label if label is not None else existing.get("label", ""),
-            "created_at": created_at if created_at is not None else existing.get("created_at"),
-        }
+        data = dict(_load())
+        for public_key, label in entries.items():
+            existing = data.get(public_key, {})
+            data[public_key] = {
+                "label":      label if label is not None else existing.get("label", ""),
+                "created_at": created_at if created_at is not None else existing.get("created_at"),
+            }
         _write(data)
 
 
 def _write(data: dict) -> None:
-    with open(LABELS_PATH, "w") as f:
-        json.dump(data, f, indent=2)
+    """Atomically replaces the file and the cache. Caller holds _lock."""
+    directory = os.path.dirname(LABELS_PATH) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".peer_labels.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            if LABELS_COMPACT:
+                json.dump(data, f, separators=(",", ":"))
+            else:
+                json.dump(data, f, indent=2)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, LABELS_PATH)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    # Readers holding the previous dict keep a consistent view.
+    _cache["data"] = data
+    _cache["file_id"] = _file_id()
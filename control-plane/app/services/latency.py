@@ -0,0 +1,258 @@
+# control-plane/app/services/latency.py
+# Background latency prober.
+# One daemon thread probes every configured target on a fixed interval and
+# keeps the samples in a bounded ring per target; requests only read the
+# p50/p95/p99/loss aggregates over rolling windows. Probes need no
+# privileges: unprivileged ICMP (ping socket) when the kernel allows it,
+# otherwise TCP connect timing; resolvers are probed with a UDP DNS query.
+#
+# LATENCY_TARGETS="name=kind:host[:port],..."  kind: icmp | tcp | dns
+# host "gateway" resolves to the current IPv4 default gateway.
+
+import math
+import os
+import random
+import socket
+import struct
+import threading
+import time
+
+LATENCY_INTERVAL = float(os.getenv("LATENCY_INTERVAL", "5"))
+LATENCY_TIMEOUT  = float(os.getenv("LATENCY_TIMEOUT", "1"))
+LATENCY_TARGETS  = os.getenv("LATENCY_TARGETS", "upstream=dns:1.1.1.1:53,gateway=icmp:gateway")
+LATENCY_WINDOWS  = os.getenv("LATENCY_WINDOWS", "60,300,900")
+
+_DEFAULT_PORTS = {"icmp": 0, "tcp": 443, "dns": 53}
+_ICMP_FALLBACK_PORT = 443   # a refused connect still yields a round trip
+
+
+def _default_gateway() -> str | None:
+    try:
+        with open("/proc/net/route") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[1] == "00000000":
+                    return socket.inet_ntoa(struct.pack("<L", int(fields[2], 16)))
+    except (OSError, ValueError, StopIteration):
+        pass
+    return None
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _probe_icmp(host: str, timeout: float) -> float:
+    """Echo over a SOCK_DGRAM ping socket (net.ipv4.ping_group_range)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP) as sock:
+        sock.settimeout(timeout)
+        seq = random.randrange(1 << 16)
+        payload = b"aegis-probe"
+        header = struct.pack("!BBHHH", 8, 0, 0, 0, seq)
+        packet = struct.pack("!BBHHH", 8, 0, _checksum(header + payload), 0, seq) + payload
+        started = time.perf_counter()
+        sock.sendto(packet, (host, 0))
+        deadline = started + timeout
+        while True:
+            sock.settimeout(max(0.001, deadline - time.perf_counter()))
+            data = sock.recv(1024)
+            # The kernel owns the identifier; match on type (echo reply) + sequence.
+            if len(data) >= 8 and data[0] == 0 and struct.unpack("!H", data[6:8])[0] == seq:
+                return time.perf_counter() - started
+
+
+def _probe_tcp(host: str, port: int, timeout: float) -> float:
+    started = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+    except ConnectionRefusedError:
+        pass   # RST came back: the host answered
+    return time.perf_counter() - started
+
+
+def _probe_dns(host: str, port: int, timeout: float) -> float:
+    """Times one `. IN NS` query; any response with our id counts."""
+    qid = random.randrange(1 << 16)
+    query = struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0) + b"\x00" + struct.pack("!HH", 2, 1)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.connect((host, port))
+        started = time.perf_counter()
+        sock.send(query)
+        deadline = started + timeout
+        while True:
+            sock.settimeout(max(0.001, deadline - time.perf_counter()))
+            data = sock.recv(512)
+            if len(data) >= 2 and struct.unpack("!H", data[:2])[0] == qid:
+                return time.perf_counter() - started
+
+
+class Target:
+    def __init__(self, name: str, kind: str, host: str, port: int, maxlen: int):
+        self.name = name
+        self.kind = kind
+        self.host = host
+        self.port = port
+        self.method = kind          # icmp may degrade to tcp
+        self.samples: list = []     # [(timestamp, rtt seconds | None)], oldest first
+        self.maxlen = maxlen
+        self.last_error: str | None = None
+
+    def resolve(self) -> str | None:
+        return _default_gateway() if self.host == "gateway" else self.host
+
+    def probe(self, timeout: float) -> float | None:
+        host = self.resolve()
+        if host is None:
+            self.last_error = "no default gateway"
+            return None
+        try:
+            if self.method == "icmp":
+                try:
+                    rtt = _probe_icmp(host, timeout)
+                except PermissionError:
+                    # ping_group_range excludes us; keep measuring via TCP.
+                    self.method = "tcp"
+                    self.port = self.port or _ICMP_FALLBACK_PORT
+            if self.method == "dns":
+                rtt = _probe_dns(host, self.port, timeout)
+            elif self.method == "tcp":
+                rtt = _probe_tcp(host, self.port, timeout)
+        except OSError as e:
+            self.last_error = str(e) or e.__class__.__name__
+            return None
+        self.last_error = None
+        return rtt
+
+    def record(self, timestamp: float, rtt: float | None) -> None:
+        # Copy-on-write so readers iterate a stable list without the lock.
+        samples = self.samples[-(self.maxlen - 1):] + [(timestamp, rtt)]
+        self.samples = samples
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _aggregate(samples: list, since: float) -> dict:
+    window = [rtt for ts, rtt in samples if ts >= since]
+    ok = sorted(rtt * 1000 for rtt in window if rtt is not None)
+    result = {
+        "samples":  len(window),
+        "loss_pct": round((len(window) - len(ok)) / len(window) * 100, 1) if window else None,
+        "p50_ms":   None,
+        "p95_ms":   None,
+        "p99_ms":   None,
+    }
+    if ok:
+        result["p50_ms"] = round(_percentile(ok, 50), 2)
+        result["p95_ms"] = round(_percentile(ok, 95), 2)
+        result["p99_ms"] = round(_percentile(ok, 99), 2)
+    return result
+
+
+def _parse_targets(raw: str, maxlen: int) -> list:
+    targets = []
+    for item in raw.split(","):
+        name, sep, spec = item.strip().partition("=")
+        if not sep:
+            continue
+        kind, _, rest = spec.partition(":")
+        kind = kind.strip().lower()
+        if kind not in _DEFAULT_PORTS or not rest:
+            continue
+        host, _, port = rest.rpartition(":") if rest.count(":") == 1 else (rest, "", "")
+        try:
+            port = int(port) if port else _DEFAULT_PORTS[kind]
+        except ValueError:
+            continue
+        targets.append(Target(name.strip(), kind, host.strip(), port, maxlen))
+    return targets
+
+
+def _parse_windows(raw: str) -> list:
+    windows = sorted({int(w) for w in raw.split(",") if w.strip().isdigit() and int(w) > 0})
+    return windows or [60, 300, 900]
+
+
+class LatencyProber:
+    def __init__(self, targets: list, interval: float, timeout: float, windows: list):
+        self.targets = targets
+        self.interval = interval
+        self.timeout = min(timeout, interval)
+        self.windows = windows
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def probe_once(self) -> None:
+        for target in self.targets:
+            now = time.time()
+            target.record(now, target.probe(self.timeout))
+
+    def _run(self) -> None:
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            self.probe_once()
+            next_run += self.interval
+            # Fixed cadence; if a round overran, skip ahead instead of bursting.
+            if next_run < time.monotonic():
+                next_run = time.monotonic() + self.interval
+            self._stop.wait(max(0.0, next_run - time.monotonic()))
+
+    def start(self) -> None:
+        if not self.targets or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="aegis-latency", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        now = time.time()
+        targets = []
+        for target in self.targets:
+            samples = target.samples
+            last = samples[-1] if samples else None
+            targets.append({
+                "name":       target.name,
+                "kind":       target.kind,
+                "method":     target.method,
+                "host":       target.host,
+                "port":       target.port or None,
+                "last_ms":    round(last[1] * 1000, 2) if last and last[1] is not None else None,
+                "last_at":    int(last[0]) if last else None,
+                "last_error": target.last_error,
+                "windows":    {str(w): _aggregate(samples, now - w) for w in self.windows},
+            })
+        return {
+            "running":  self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "targets":  targets,
+        }
+
+    def primary(self) -> dict | None:
+        """Shortest-window aggregate of the first target (the dashboard's ping tile)."""
+        if not self.targets:
+            return None
+        target = self.targets[0]
+        return {"name": target.name, **_aggregate(target.samples, time.time() - self.windows[0])}
+
+
+_windows = _parse_windows(LATENCY_WINDOWS)
+prober = LatencyProber(
+    _parse_targets(LATENCY_TARGETS, maxlen=int(_windows[-1] / max(LATENCY_INTERVAL, 0.1)) + 1),
+    LATENCY_INTERVAL, LATENCY_TIMEOUT, _windows,
+)
@@ -0,0 +1,125 @@
+# control-plane/app/services/log_tailer.py
+# Incremental log reader that remembers inode + byte offset between polls.
+# Only newly appended bytes are read and parsed; logrotate (inode change)
+# and copytruncate (size shrinks) are detected from os.stat, which needs no
+# privileges. Files the API user cannot open are read via `sudo tail -c +N`.
+
+import os
+import subprocess
+import threading
+from collections import deque
+from typing import Callable
+
+from app.services.timings import timed
+
+BACKFILL_BYTES = 2 * 1024 * 1024   # history loaded per file on first poll
+MAX_READ_BYTES = 8 * 1024 * 1024   # larger jumps skip ahead to the last BACKFILL_BYTES
+
+
+def _read_from(path: str, start: int) -> bytes:
+    try:
+        with timed("log.read", detail=path), open(path, "rb") as f:
+            f.seek(start)
+            return f.read()
+    except PermissionError:
+        with timed("log.read_sudo", detail=path):
+            return subprocess.check_output(
+                ["sudo", "tail", "-c", f"+{start + 1}", path],
+                stderr=subprocess.DEVNULL, timeout=5,
+            )
+
+
+def _stat(path: str):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+class LogTailer:
+    def __init__(self, path: str, parse_line: Callable[[str], object],
+                 rotated_path: str = None, maxlen: int = 20000,
+                 on_events: Callable[[list], None] = None):
+        self.path = path
+        self.rotated_path = rotated_path if rotated_path is not None else f"{path}.1"
+        self.parse_line = parse_line
+        self.on_events = on_events   # receives each batch of newly parsed events
+        self.events = deque(maxlen=maxlen)
+        self.inode = None
+        self.offset = 0
+        self._fragment = b""
+        self._lock = threading.Lock()
+
+    def _feed(self, data: bytes, skip_partial_first: bool = False) -> None:
+        if not data:
+            return
+        data = self._fragment + data
+        lines = data.split(b"\n")
+        self._fragment = lines.pop()   # incomplete trailing line, kept for next poll
+        if skip_partial_first and lines:
+            lines = lines[1:]
+        parsed = []
+        for raw in lines:
+            event = self.parse_line(raw.decode("utf-8", "replace"))
+            if event is not None:
+                parsed.append(event)
+        self.events.extend(parsed)
+        if parsed and self.on_events:
+            self.on_events(parsed)
+
+    def _read_tail(self, path: str, start: int, size: int) -> int:
+        """Reads path from `start` (or only its last BACKFILL_BYTES) and returns the new offset."""
+        skip_partial = False
+        if size - start > MAX_READ_BYTES or (start == 0 and size > BACKFILL_BYTES):
+            start = max(0, size - BACKFILL_BYTES)
+            self._fragment = b""
+            skip_partial = start > 0
+        try:
+            data = _read_from(path, start)
+        except Exception:
+            return start
+        self._feed(data, skip_partial)
+        return start + len(data)
+
+    def _bootstrap(self, st) -> None:
+        rotated = _stat(self.rotated_path)
+        if rotated is not None:
+            self._read_tail(self.rotated_path, 0, rotated.st_size)
+            if self._fragment:
+                self._feed(b"\n")
+        self.inode = st.st_ino
+        self.offset = self._read_tail(self.path, 0, st.st_size)
+
+    def poll(self) -> None:
+        """Reads whatever was appended since the previous poll."""
+        with self._lock:
+            st = _stat(self.path)
+            if st is None:
+                return
+
+            if self.inode is None:
+                self._bootstrap(st)
+                return
+
+            if st.st_ino != self.inode:
+                # Rotated: finish the old file (now rotated_path) before switching.
+                rotated = _stat(self.rotated_path)
+                if rotated is not None and rotated.st_ino == self.inode and rotated.st_size > self.offset:
+                    self._read_tail(self.rotated_path, self.offset, rotated.st_size)
+                if self._fragment:
+                    self._feed(b"\n")
+                self.inode = st.st_ino
+                self.offset = 0
+            elif st.st_size < self.offset:
+                # Truncated in place (copytruncate).
+                self._fragment = b""
+                self.offset = 0
+
+            if st.st_size > self.offset:
+                self.offset = self._read_tail(self.path, self.offset, st.st_size)
+
+    def snapshot(self) -> list:
+        """Polls, then returns all buffered events, oldest first."""
+        self.poll()
+        with self._lock:
+            return list(self.events)
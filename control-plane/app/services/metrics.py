@@ -0,0 +1,220 @@
+# control-plane/app/services/metrics.py
+# Prometheus text exposition (format 0.0.4) for /metrics.
+# Everything is rendered from state the background workers already keep
+# (collector snapshots, the shared peer table, the latency prober), so a
+# scrape never spawns a process. The per-peer block only changes when the
+# peer table generation does and is cached as one pre-rendered string.
+
+import bisect
+import threading
+import time
+
+from app.services.collector import collector
+from app.services.latency import prober
+from app.services.wg import get_peer_table
+
+# The collector refreshes the table every couple of seconds; a scrape only
+# re-reads the backend if the collector has stalled for this long.
+PEER_TABLE_MAX_AGE = 30
+
+REQUEST_BUCKETS   = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COLLECTOR_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _num(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self, out: list) -> None:
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            base = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                out.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            out.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            suffix = "{" + base + "}" if base else ""
+            out.append(f"{self.name}_sum{suffix} {series[-2]!r}")
+            out.append(f"{self.name}_count{suffix} {series[-1]}")
+
+
+request_duration = Histogram(
+    "aegis_http_request_duration_seconds", "Control plane request latency.",
+    ("method", "route", "status"), REQUEST_BUCKETS,
+)
+collector_duration = Histogram(
+    "aegis_collector_refresh_duration_seconds", "Background collector refresh time per source.",
+    ("source",), COLLECTOR_BUCKETS,
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    request_duration.observe((method, route, f"{status // 100}xx"), seconds)
+
+
+def _observe_collector(name: str, duration: float, error: str | None) -> None:
+    collector_duration.observe((name,), duration)
+
+
+collector.add_listener(_observe_collector)
+
+
+def _gauge(out: list, name: str, help: str, samples, kind: str = "gauge", labelnames: tuple = ()) -> None:
+    """samples: iterable of (label values tuple, value)."""
+    out.append(f"# HELP {name} {help}")
+    out.append(f"# TYPE {name} {kind}")
+    for values, value in samples:
+        out.append(f"{name}{_labels(labelnames, values)} {_num(value)}")
+
+
+_peer_block = {"generation": None, "text": ""}
+_peer_lock = threading.Lock()
+
+_PEER_METRICS = (
+    ("aegis_vpn_peer_receive_bytes_total",  "Bytes received from the peer.",  "counter", "rx_bytes"),
+    ("aegis_vpn_peer_transmit_bytes_total", "Bytes sent to the peer.",        "counter", "tx_bytes"),
+    ("aegis_vpn_peer_latest_handshake_seconds",
+     "Unix time of the latest handshake (0 = never); age is time() - value.", "gauge", "latest_handshake"),
+)
+
+
+def _render_peers(table) -> str:
+    """Per-peer series, rebuilt only when the table generation changes."""
+    with _peer_lock:
+        if _peer_block["generation"] == table.generation:
+            return _peer_block["text"]
+        # Public keys are base64 and interface names are [a-z0-9]: no escaping needed.
+        labels = [f'{{interface="{p.interface}",public_key="{p.public_key}"}}' for p in table.peers]
+        out = []
+        for name, help, kind, attr in _PEER_METRICS:
+            out.append(f"# HELP {name} {help}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(f"{name}{label} {getattr(p, attr)}" for label, p in zip(labels, table.peers))
+        text = "\n".join(out)
+        _peer_block.update({"generation": table.generation, "text": text})
+        return text
+
+
+def render() -> str:
+    out = []
+    now = int(time.time())
+
+    table = get_peer_table(ttl=PEER_TABLE_MAX_AGE)
+    total, active = table.counts(now) if table else (0, 0)
+    _gauge(out, "aegis_vpn_up", "VPN backend readable.", [((), table is not None)])
+    _gauge(out, "aegis_vpn_peers", "Configured peers.", [((), total)])
+    _gauge(out, "aegis_vpn_peers_active", "Peers with a recent handshake.", [((), active)])
+    if table is not None and table.peers:
+        out.append(_render_peers(table))
+
+    perf = collector.get("performance").value or {}
+    if perf:
+        _gauge(out, "aegis_vpn_interface_receive_bytes_total", "VPN interface bytes received.",
+               [((), perf.get("wg_rx_bytes"))], kind="counter")
+        _gauge(out, "aegis_vpn_interface_transmit_bytes_total", "VPN interface bytes sent.",
+               [((), perf.get("wg_tx_bytes"))], kind="counter")
+        _gauge(out, "aegis_vpn_interface_dropped_packets_total", "VPN interface dropped packets.",
+               [(("rx",), perf.get("wg_rx_dropped")), (("tx",), perf.get("wg_tx_dropped"))],
+               kind="counter", labelnames=("direction",))
+        _gauge(out, "aegis_load_average", "System load average.",
+               [(("1m",), perf.get("load_1m")), (("5m",), perf.get("load_5m")), (("15m",), perf.get("load_15m"))],
+               labelnames=("window",))
+        _gauge(out, "aegis_cpu_cores", "Online CPUs.", [((), perf.get("cpu_cores"))])
+
+    system = collector.get("system").value or {}
+    if system:
+        memory, disk = system.get("memory") or {}, system.get("disk") or {}
+        _gauge(out, "aegis_cpu_usage_percent", "CPU busy percentage.", [((), system.get("cpu_percent"))])
+        _gauge(out, "aegis_memory_used_bytes", "Memory in use.",
+               [((), int(memory.get("used_mb", 0) * 1048576))])
+        _gauge(out, "aegis_memory_total_bytes", "Total memory.",
+               [((), int(memory.get("total_mb", 0) * 1048576))])
+        _gauge(out, "aegis_disk_usage_percent", "Root filesystem usage percentage.", [((), disk.get("percent"))])
+        _gauge(out, "aegis_reboot_required", "A package update requires a reboot.",
+               [((), bool(system.get("reboot_required")))])
+
+    services = collector.get("services").value or []
+    if services:
+        _gauge(out, "aegis_service_up", "systemd unit is active (1), inactive (0) or unknown (NaN).",
+               [((s["name"],), None if s["status"] == "unknown" else s["status"] == "active") for s in services],
+               labelnames=("service",))
+        _gauge(out, "aegis_service_restarts_total", "systemd NRestarts of the unit.",
+               [((s["name"],), s.get("restarts")) for s in services if s.get("restarts") is not None],
+               kind="counter", labelnames=("service",))
+
+    f2b = collector.get("fail2ban").value or {}
+    if f2b:
+        _gauge(out, "aegis_fail2ban_up", "fail2ban answered.", [((), bool(f2b.get("available")))])
+        _gauge(out, "aegis_fail2ban_banned", "Currently banned addresses (sshd + recidive).",
+               [((), f2b.get("currently_banned", 0))])
+        _gauge(out, "aegis_fail2ban_banned_total", "Bans since fail2ban start.",
+               [((), f2b.get("total_banned", 0))], kind="counter")
+        _gauge(out, "aegis_fail2ban_failed_total", "Failed sshd attempts since fail2ban start.",
+               [((), f2b.get("total_failed", 0))], kind="counter")
+
+    latency = prober.stats()
+    window = str(prober.windows[0])
+    rtt, loss = [], []
+    for target in latency["targets"]:
+        agg = target["windows"][window]
+        for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            if agg[key] is not None:
+                rtt.append(((target["name"], q), agg[key] / 1000))
+        if agg["loss_pct"] is not None:
+            loss.append(((target["name"],), agg["loss_pct"] / 100))
+    _gauge(out, "aegis_probe_rtt_seconds", f"Probe round trip over the last {window}s.", rtt,
+           labelnames=("target", "quantile"))
+    _gauge(out, "aegis_probe_loss_ratio", f"Probe loss over the last {window}s.", loss,
+           labelnames=("target",))
+
+    status = collector.status()["sources"]
+    _gauge(out, "aegis_collector_snapshot_age_seconds", "Age of each collector snapshot.",
+           [((name,), s["age_seconds"]) for name, s in status.items() if s["age_seconds"] is not None],
+           labelnames=("source",))
+    _gauge(out, "aegis_collector_source_failing", "Last refresh of the source raised.",
+           [((name,), s["error"] is not None) for name, s in status.items()],
+           labelnames=("source",))
+    collector_duration.render(out)
+    request_duration.render(out)
+
+    out.append("")
+    return "\n".join(out)
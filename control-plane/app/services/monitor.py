@@ -4,52 +4,25 @@ import subprocess
 import os
 import re
 import time
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from app.services.wg import VPN_CLI, VPN_INTERFACE, VPN_SERVICE_NAME, VPN_TRANSPORT_LABEL
-
-try:
-    import maxminddb
-except ImportError:
-    maxminddb = None
-
-_GEO_DB_PATH = os.getenv("GEO_DB_PATH", "/opt/aegis/GeoLite2-City.mmdb")
-_geo_reader = None
-
-def get_geo_info(ip: str) -> str:
-    global _geo_reader
-    if maxminddb is None or not Path(_GEO_DB_PATH).exists():
-        return ""
-    
-    if _geo_reader is None:
-        try:
-            _geo_reader = maxminddb.open_database(_GEO_DB_PATH)
-        except Exception:
-            return ""
-
-    try:
-        match = _geo_reader.get(ip)
-        if not match:
-            return ""
-        
-        iso = match.get("country", {}).get("iso_code")
-        city = match.get("city", {}).get("names", {}).get("en")
-        
-        if iso:
-            flag = chr(ord(iso[0]) + 127397) + chr(ord(iso[1]) + 127397)
-            if city:
-                return f"{flag} {iso} · {city}"
-            return f"{flag} {iso}"
-    except Exception:
-        pass
-    return ""
+from app.services.collector import collector
+from app.services.geoip import lookup_many
+from app.services.latency import prober
+from app.services import fail2ban, ssh_index, traffic_history
+from app.services.log_tailer import LogTailer
+from app.services.systemd import unit_states
+from app.services.timings import timed
+from app.services.wg import (
+    VPN_INTERFACE, VPN_SERVICE_NAME, VPN_TRANSPORT_LABEL, get_peer_records_cached, get_peer_table
+)
 
 # ── CPU: delta between two readings (simple cache) ──────────────
 _cpu_last = {"total": 0, "idle": 0, "ts": 0}
 
 def _read_cpu_stat():
-    with open("/proc/stat") as f:
+    with timed("monitor.proc_stat"), open("/proc/stat") as f:
         parts = f.readline().split()
     user, nice, system, idle = int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4])
     iowait = int(parts[5]) if len(parts) > 5 else 0
@@ -79,7 +52,7 @@ def _get_cpu_percent() -> float:
 def _get_memory():
     info = {}
     try:
-        with open("/proc/meminfo") as f:
+        with timed("monitor.meminfo"), open("/proc/meminfo") as f:
             for line in f:
                 key, val = line.split(":")
                 info[key.strip()] = int(val.split()[0])  # kB
@@ -106,10 +79,11 @@ def _get_memory():
 
 def _get_disk():
     try:
-        result = subprocess.check_output(
-            ["df", "-B1", "--output=size,used,avail", "/"],
-            text=True
-        ).strip().split("\n")
+        with timed("monitor.df"):
+            result = subprocess.check_output(
+                ["df", "-B1", "--output=size,used,avail", "/"],
+                text=True
+            ).strip().split("\n")
         # --output=size,used,avail → header + 1 data line (3 columns, no Filesystem col)
         size, used, avail = result[1].split()
         total = int(size)
@@ -126,7 +100,7 @@ def _get_disk():
 
 def _get_uptime():
     try:
-        with open("/proc/uptime") as f:
+        with timed("monitor.uptime"), open("/proc/uptime") as f:
             seconds = float(f.read().split()[0])
         return _format_uptime(int(seconds))
     except Exception:
@@ -153,47 +127,40 @@ _SERVICES = [
     {"name": "netfilter-persistent", "label": "iptables persist"},
 ]
 
-def _service_status(name: str) -> str:
-    try:
-        rc = subprocess.run(
-            ["systemctl", "is-active", name],
-            capture_output=True, text=True
-        ).returncode
-        return "active" if rc == 0 else "inactive"
-    except Exception:
-        return "unknown"
-
 def get_services():
-    return [
-        {
-            "name":   s["name"],
-            "label":  s["label"],
-            "status": _service_status(s["name"]),
-        }
-        for s in _SERVICES
-    ]
+    """One `systemctl show` for all units; status keeps the active/inactive/unknown contract."""
+    states = unit_states([s["name"] for s in _SERVICES])
+    services = []
+    for s in _SERVICES:
+        state = states[s["name"]]
+        active = state["active"]
+        services.append({
+            "name":      s["name"],
+            "label":     s["label"],
+            "status":    "active" if active == "active" else ("unknown" if active == "unknown" else "inactive"),
+            "sub_state": state["sub_state"],
+            "since":     state["since"],
+            "restarts":  state["restarts"],
+        })
+    return services
 
 # ── VPN Traffic ──────────────────────────────────────────────
 
 def get_wg_traffic():
     """
-    Output format of `sudo wg/awg show all transfer`:
-    <interface> <pubkey> <rx_bytes> <tx_bytes>
+    Per-peer rx/tx counters, taken from the shared peer records
+    (netlink or `wg/awg show all dump`) instead of a separate
+    `show all transfer` call.
     """
-    try:
-        output = subprocess.check_output(
-            ["sudo", VPN_CLI, "show", "all", "transfer"],
-            text=True
-        ).strip()
-    except Exception:
+    records = get_peer_records_cached()
+    if not records:
         return []
 
     peers = []
-    for line in output.splitlines():
-        parts = line.split()
-        if len(parts) < 4:
-            continue
-        _, pubkey, rx_bytes, tx_bytes = parts[0], parts[1], int(parts[2]), int(parts[3])
+    for record in records:
+        pubkey   = record.public_key
+        rx_bytes = record.rx_bytes
+        tx_bytes = record.tx_bytes
         peers.append({
             "public_key":    pubkey,
             "public_key_short": pubkey[:16] + "…",
@@ -204,6 +171,15 @@ def get_wg_traffic():
         })
     return peers
 
+def sample_traffic_history():
+    records = get_peer_records_cached()
+    if records is None:
+        return None
+    traffic_history.record_samples(
+        (r.public_key, r.rx_bytes, r.tx_bytes) for r in records
+    )
+    return traffic_history.get_history_stats()
+
 def _bytes_human(b: int) -> str:
     for unit in ["B", "KB", "MB", "GB"]:
         if b < 1024:
@@ -229,45 +205,46 @@ _SSH_PATTERNS = [
 # syslog timestamp: e.g. "Feb 21 20:01:49"
 _TS_PATTERN = re.compile(r"^(\w{3}\s+\d+\s+\d+:\d+:\d+)")
 
-def get_ssh_events(limit: int = 60):
-    log_files = ["/var/log/auth.log", "/var/log/auth.log.1"]
-    events = []
+AUTH_LOG_PATH = os.getenv("AUTH_LOG_PATH", "/var/log/auth.log")
+AUTH_LOG_MAX_EVENTS = int(os.getenv("AUTH_LOG_MAX_EVENTS", "20000"))
 
-    for path in log_files:
-        if not Path(path).exists():
-            continue
-        try:
-            # tail -n 2000 — for performance on large files
-            lines = subprocess.check_output(
-                ["sudo", "tail", "-n", "2000", path],
-                text=True, stderr=subprocess.DEVNULL
-            ).splitlines()
-        except Exception:
-            continue
 
-        for line in lines:
-            if "sshd" not in line:
-                continue
-            for pattern, level, label in _SSH_PATTERNS:
-                m = pattern.search(line)
-                if m:
-                    ts_m = _TS_PATTERN.match(line)
-                    ip = m.group(2)
-                    events.append({
-                        "timestamp": ts_m.group(1) if ts_m else "",
-                        "level":     level,
-                        "label":     label,
-                        "user":      m.group(1),
-                        "ip":        ip,
-                        "port":      m.group(3),
-                        "geo":       get_geo_info(ip),
-                        "raw":       line.strip(),
-                    })
-                    break
+def _parse_ssh_line(line: str):
+    if "sshd" not in line:
+        return None
+    for pattern, level, label in _SSH_PATTERNS:
+        m = pattern.search(line)
+        if m:
+            ts_m = _TS_PATTERN.match(line)
+            return {
+                "timestamp": ts_m.group(1) if ts_m else "",
+                "level":     level,
+                "label":     label,
+                "user":      m.group(1),
+                "ip":        m.group(2),
+                "port":      m.group(3),
+                "raw":       line.strip(),
+            }
+    return None
+
+
+# Shared by get_ssh_events and get_ssh_timeline; each request only parses
+# lines appended since the previous poll.
+# New events are also written to the persistent SSH index (timeline history).
+_auth_tailer = LogTailer(
+    AUTH_LOG_PATH, _parse_ssh_line,
+    maxlen=AUTH_LOG_MAX_EVENTS, on_events=ssh_index.record_events,
+)
+
+
+def get_ssh_events(limit: int = 60):
+    events = _auth_tailer.snapshot()
 
     # Newest events first; get the last N
-    events.reverse()
-    return events[:limit]
+    recent = events[-limit:] if limit > 0 else []
+    with timed("geoip.lookup", detail="ssh_events"):
+        geo = lookup_many(e["ip"] for e in recent)
+    return [{**e, "geo": geo[e["ip"]]} for e in reversed(recent)]
 
 # ── Reboot required ──────────────────────────────────────────
 
@@ -294,25 +271,18 @@ def get_performance_metrics():
     except Exception:
         load = (0.0, 0.0, 0.0)
 
-    # Ping latency to 1.1.1.1
-    ping_ms = None
-    try:
-        # ping -c 1 -W 1 1.1.1.1
-        res = subprocess.check_output(["ping", "-c", "1", "-W", "1", "1.1.1.1"], text=True, stderr=subprocess.DEVNULL)
-        m = re.search(r"time=([\d.]+)\s*ms", res)
-        if m:
-            ping_ms = float(m.group(1))
-    except Exception:
-        pass
+    # Latency comes from the background prober's rolling window.
+    latency = prober.primary() or {}
 
     # VPN interface network stats (Bytes & Drops)
     wg_rx, wg_tx = 0, 0
     wg_drop_rx, wg_drop_tx = 0, 0
     try:
-        with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/rx_bytes") as f: wg_rx = int(f.read())
-        with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/tx_bytes") as f: wg_tx = int(f.read())
-        with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/rx_dropped") as f: wg_drop_rx = int(f.read())
-        with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/tx_dropped") as f: wg_drop_tx = int(f.read())
+        with timed("monitor.netdev_stats"):
+            with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/rx_bytes") as f: wg_rx = int(f.read())
+            with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/tx_bytes") as f: wg_tx = int(f.read())
+            with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/rx_dropped") as f: wg_drop_rx = int(f.read())
+            with open(f"/sys/class/net/{VPN_INTERFACE}/statistics/tx_dropped") as f: wg_drop_tx = int(f.read())
     except Exception:
         pass
 
@@ -321,7 +291,10 @@ def get_performance_metrics():
         "load_5m": round(load[1], 2),
         "load_15m": round(load[2], 2),
         "cpu_cores": os.cpu_count() or 1,
-        "ping_ms": ping_ms,
+        "ping_ms": latency.get("p50_ms"),
+        "ping_p95_ms": latency.get("p95_ms"),
+        "ping_loss_pct": latency.get("loss_pct"),
+        "ping_target": latency.get("name"),
         "wg_rx_bytes": wg_rx,
         "wg_tx_bytes": wg_tx,
         "wg_rx_dropped": wg_drop_rx,
@@ -330,113 +303,126 @@ def get_performance_metrics():
     }
 
 
-# ── SSH Login Timeline ────────────────────────────────────────
+def get_performance_snapshot():
+    metrics = get_performance_metrics()
+    table = get_peer_table()
+    total, active = table.counts(int(time.time())) if table else (0, 0)
+    metrics["active_peers"] = active
+    metrics["total_peers"] = total
+    return metrics
 
-_MONTH_MAP = {
-    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4,
-    "May": 5, "Jun": 6, "Jul": 7, "Aug": 8,
-    "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
-}
-_ACCEPT_RE = re.compile(r"Accepted (?:publickey|password) for (\S+) from ([\d.]+)")
-_TS_SHORT  = re.compile(r"^(\w{3})\s+(\d+)\s+(\d+:\d+:\d+)")
 
-def get_ssh_timeline(tz_offset_minutes: int = 0):
-    """
-    Returns successful SSH logins from the last 7 days in {date, count, logins[]} format.
+# ── Snapshot sources (refreshed by the background collector) ──
 
-    tz_offset_minutes: client's UTC offset in minutes.
-    Resolves auth.log UTC timestamps to local time to correctly calculate day boundaries and dot positions.
-    """
-    from datetime import timezone as _tz
+collector.register("system",      get_system_stats,         interval=5)
+collector.register("services",    get_services,             interval=10)
+collector.register("traffic",     get_wg_traffic,           interval=2)
+collector.register("performance", get_performance_snapshot, interval=2)
+collector.register("traffic_history", sample_traffic_history,
+                   interval=traffic_history.RESOLUTION)
+collector.register("auth_log", _auth_tailer.poll, interval=5)
+collector.register("ssh_index_compact", ssh_index.compact, interval=ssh_index.COMPACT_INTERVAL)
 
-    tz_delta  = timedelta(minutes=tz_offset_minutes)
 
-    # Server runs in UTC; set "today" and 7-day window relative to local time
-    now_local   = datetime.now(_tz.utc) + tz_delta
-    today_local = now_local.date()
+# ── SSH Login Timeline ────────────────────────────────────────
 
-    days      = [(today_local - timedelta(days=i)) for i in range(6, -1, -1)]
-    day_index = {d: {"date": d.strftime("%b %d"), "count": 0, "logins": []} for d in days}
+_FAILED_LABELS = {"failed auth", "invalid user"}
+TIMELINE_DAYS = (7, 30, 90)
 
-    log_files = ["/var/log/auth.log", "/var/log/auth.log.1"]
-    year_utc  = datetime.now(_tz.utc).year  # log year is still UTC-referenced
 
-    for path in log_files:
-        if not Path(path).exists():
+def get_ssh_timeline(tz_offset_minutes: int = 0, days: int = 7):
+    """
+    Returns SSH activity for the last `days` days (7/30/90) in
+    {date, count, failed, logins[]} format.
+
+    tz_offset_minutes: client's UTC offset in minutes.
+    Day boundaries and dot positions are computed in the client's local time.
+    Counts come from the persistent index's hourly buckets; with offsets that
+    are not whole hours a bucket is attributed to the day its start falls in.
+    """
+    days = days if days in TIMELINE_DAYS else 7
+    offset = tz_offset_minutes * 60
+
+    # Server runs in UTC; set "today" and the window relative to local time
+    now         = int(time.time())
+    today_local = datetime.fromtimestamp(now + offset, timezone.utc).date()
+    first_local = today_local - timedelta(days=days - 1)
+
+    day_list  = [first_local + timedelta(days=i) for i in range(days)]
+    day_index = {d: {"date": d.strftime("%b %d"), "count": 0, "failed": 0, "logins": []} for d in day_list}
+
+    # Local midnight of the first day, expressed in UTC epoch seconds.
+    since = int(datetime(first_local.year, first_local.month, first_local.day,
+                         tzinfo=timezone.utc).timestamp()) - offset
+    until = now + 3600
+
+    # Index whatever was appended since the last poll before querying.
+    events = _auth_tailer.snapshot()
+    logins = ssh_index.logins_between(since, until)
+    hourly = ssh_index.hourly_counts(since - since % 3600, until)
+
+    if not hourly:
+        # Index unavailable (e.g. not writable): fall back to the in-memory buffer.
+        logins = []
+        for e in events:
+            ts = ssh_index.syslog_epoch(e["timestamp"], now)
+            if ts is not None and ts >= since:
+                if e["label"] == "login":
+                    logins.append((ts, e["user"], e["ip"]))
+                elif e["label"] in _FAILED_LABELS:
+                    hourly.append((ts, e["label"], 1))
+
+    for hour, label, count in hourly:
+        day = datetime.fromtimestamp(hour + offset, timezone.utc).date()
+        if day not in day_index or label not in _FAILED_LABELS:
             continue
-        try:
-            lines = subprocess.check_output(
-                ["sudo", "tail", "-n", "5000", path],
-                text=True, stderr=subprocess.DEVNULL
-            ).splitlines()
-        except Exception:
+        day_index[day]["failed"] += count
+
+    with timed("geoip.lookup", detail="ssh_timeline"):
+        geo = lookup_many(ip for _, _, ip in logins)
+    for ts, user, ip in logins:
+        log_dt_local = datetime.fromtimestamp(ts + offset, timezone.utc)
+        log_date     = log_dt_local.date()
+        if log_date not in day_index:
             continue
-
-        for line in lines:
-            if "sshd" not in line or "Accepted" not in line:
-                continue
-            ts_m = _TS_SHORT.match(line)
-            if not ts_m:
-                continue
-            month_str, day_str, time_str = ts_m.group(1), ts_m.group(2), ts_m.group(3)
-            month = _MONTH_MAP.get(month_str)
-            if not month:
-                continue
-            try:
-                h, mi, s = [int(x) for x in time_str.split(":")]
-                # UTC datetime -> local datetime (add tz_offset)
-                log_dt_utc   = datetime(year_utc, month, int(day_str), h, mi, s)
-                log_dt_local = log_dt_utc + tz_delta
-                log_date     = log_dt_local.date()
-                local_time   = log_dt_local.strftime("%H:%M:%S")
-            except (ValueError, OverflowError):
-                continue
-
-            if log_date not in day_index:
-                continue
-
-            m = _ACCEPT_RE.search(line)
-            if m:
-                ip = m.group(2)
-                day_index[log_date]["count"] += 1
-                day_index[log_date]["logins"].append({
-                    "user": m.group(1),
-                    "ip":   ip,
-                    "geo":  get_geo_info(ip),
-                    "time": local_time,   # local time -> correct position on axis
-                })
+        day_index[log_date]["count"] += 1
+        day_index[log_date]["logins"].append({
+            "user": user,
+            "ip":   ip,
+            "geo":  geo[ip],
+            "time": log_dt_local.strftime("%H:%M:%S"),   # local time -> correct position on axis
+        })
 
     return list(day_index.values())
 
 
 # ── fail2ban ──────────────────────────────────────────────────
 
+F2B_LOG_PATH = os.getenv("FAIL2BAN_LOG_PATH", "/var/log/fail2ban.log")
+F2B_JAILS = ("sshd", "recidive")
+F2B_REFRESH_SECONDS = int(os.getenv("FAIL2BAN_REFRESH_SECONDS", "5"))
+
 _F2B_BAN_RE   = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ .*\[(\w+)\] Ban ([\d.a-fA-F:]+)')
 
 
-def _f2b_jail_stats(jail: str) -> dict:
-    """fail2ban-client status <jail> çıktısını parse eder."""
-    stats = {"available": False, "currently_banned": 0, "total_banned": 0, "total_failed": 0}
-    try:
-        out = subprocess.check_output(
-            ["sudo", "fail2ban-client", "status", jail],
-            text=True, stderr=subprocess.DEVNULL, timeout=5,
-        )
-        stats["available"] = True
-        for line in out.splitlines():
-            line = line.strip()
-            if "Currently banned:" in line:
-                stats["currently_banned"] = int(line.rsplit(":", 1)[-1].strip())
-            elif "Total banned:" in line:
-                stats["total_banned"] = int(line.rsplit(":", 1)[-1].strip())
-            elif "Total failed:" in line:
-                stats["total_failed"] = int(line.rsplit(":", 1)[-1].strip())
-    except Exception:
-        pass
-    return stats
+def _parse_ban_line(line: str):
+    if " Ban " not in line:
+        return None
+    m = _F2B_BAN_RE.search(line)
+    if not m:
+        return None
+    return {"timestamp": m.group(1), "jail": m.group(2), "ip": m.group(3)}
+
+
+# Only bytes appended since the previous refresh are parsed (rotation-aware).
+_ban_tailer = LogTailer(F2B_LOG_PATH, _parse_ban_line, maxlen=200)
 
 
 def get_fail2ban_status() -> dict:
+    """
+    Jail totals from the fail2ban socket plus the last 5 bans from the log.
+    Runs in the collector; requests read the cached snapshot.
+    """
     result = {
         "available":       False,
         "currently_banned": 0,
@@ -445,8 +431,9 @@ def get_fail2ban_status() -> dict:
         "recent_bans":     [],
     }
 
+    sshd, recidive = (fail2ban.jail_stats(jail) for jail in F2B_JAILS)
+
     # Birincil jail: sshd
-    sshd = _f2b_jail_stats("sshd")
     if sshd["available"]:
         result["available"]        = True
         result["currently_banned"] += sshd["currently_banned"]
@@ -454,34 +441,21 @@ def get_fail2ban_status() -> dict:
         result["total_failed"]     += sshd["total_failed"]
 
     # Recidive jail (varsa eklenir, yoksa sessizce atlanır)
-    recidive = _f2b_jail_stats("recidive")
     if recidive["available"]:
         result["available"]        = True
         result["currently_banned"] += recidive["currently_banned"]
         result["total_banned"]     += recidive["total_banned"]
 
-    # Son banları logdan oku (tail sudoers'da mevcut)
-    try:
-        raw = subprocess.check_output(
-            ["sudo", "tail", "-n", "2000", "/var/log/fail2ban.log"],
-            text=True, stderr=subprocess.DEVNULL, timeout=5,
-        )
-        bans = []
-        for line in raw.splitlines():
-            if " Ban " not in line or "Unban" in line:
-                continue
-            m = _F2B_BAN_RE.search(line)
-            if m:
-                bans.append({
-                    "timestamp": m.group(1),
-                    "jail":      m.group(2),
-                    "ip":        m.group(3),
-                    "geo":       get_geo_info(m.group(3)),
-                })
-        result["recent_bans"] = bans[-5:][::-1]   # son 5, en yeni başta
-        if bans:
-            result["available"] = True
-    except Exception:
-        pass
+    bans = _ban_tailer.snapshot()
+    recent = bans[-5:][::-1]   # son 5, en yeni başta
+    with timed("geoip.lookup", detail="fail2ban"):
+        geo = lookup_many(b["ip"] for b in recent)
+    result["recent_bans"] = [{**b, "geo": geo[b["ip"]]} for b in recent]
+    if bans:
+        result["available"] = True
 
+    result["transport"] = sshd["transport"]
     return result
+
+
+collector.register("fail2ban", get_fail2ban_status, interval=F2B_REFRESH_SECONDS)
@@ -1,16 +1,17 @@
 import json
 import subprocess
 
+from app.services.runner import runner
+
 
 HELPER = "/usr/local/sbin/aegis-node-ops"
 
 
-def _run_helper(action: str, *args: str) -> dict:
+async def _run_helper(action: str, *args: str) -> dict:
     try:
-        result = subprocess.run(
+        result = await runner.run(
             ["sudo", HELPER, action, *args],
-            capture_output=True,
-            text=True,
+            cls="helper_status" if action == "status" else "helper",
             timeout=20,
             check=True,
         )
@@ -30,34 +31,34 @@ def _run_helper(action: str, *args: str) -> dict:
         return {"status": "ok", "message": output}
 
 
-def get_operations_status() -> dict:
-    return _run_helper("status")
+async def get_operations_status() -> dict:
+    return await _run_helper("status")
 
 
-def run_operations_action(action: str) -> dict:
-    return _run_helper(action)
+async def run_operations_action(action: str) -> dict:
+    return await _run_helper(action)
 
 
-def set_logging_profile(profile: str) -> dict:
+async def set_logging_profile(profile: str) -> dict:
     action = f"logging-{profile}"
-    return _run_helper(action)
+    return await _run_helper(action)
 
 
-def fail2ban_unban(ip: str) -> dict:
-    return _run_helper("fail2ban-unban", ip)
+async def fail2ban_unban(ip: str) -> dict:
+    return await _run_helper("fail2ban-unban", ip)
 
 
-def fail2ban_restart() -> dict:
-    return _run_helper("restart-fail2ban")
+async def fail2ban_restart() -> dict:
+    return await _run_helper("restart-fail2ban")
 
 
-def fail2ban_policy_set(
+async def fail2ban_policy_set(
     sshd_maxretry: int,
     sshd_findtime: int,
     sshd_bantime: int,
     recidive_bantime: int,
 ) -> dict:
-    return _run_helper(
+    return await _run_helper(
         "fail2ban-policy-set",
         str(sshd_maxretry),
         str(sshd_findtime),
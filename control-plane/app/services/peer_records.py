@@ -0,0 +1,134 @@
+# control-plane/app/services/peer_records.py
+# Compact peer/interface records shared by every view of the live VPN state.
+# One dump (or netlink read) is parsed once into a PeerTable; peers, health,
+# traffic and performance all derive from the same table, which carries a
+# generation number that changes only when the backend state actually changed.
+
+from app.services.constants import HANDSHAKE_ACTIVE_THRESHOLD
+
+
+class InterfaceRecord:
+    __slots__ = ("name", "public_key", "listen_port", "fwmark")
+
+    def __init__(self, name: str, public_key: str = "(none)", listen_port: int = 0, fwmark: str = "off"):
+        self.name = name
+        self.public_key = public_key
+        self.listen_port = listen_port
+        self.fwmark = fwmark
+
+    def to_dict(self) -> dict:
+        return {
+            "name":        self.name,
+            "public_key":  self.public_key,
+            "listen_port": self.listen_port,
+            "fwmark":      self.fwmark,
+        }
+
+
+class PeerRecord:
+    __slots__ = (
+        "interface", "public_key", "has_preshared_key", "endpoint", "allowed_ips",
+        "latest_handshake", "rx_bytes", "tx_bytes", "persistent_keepalive",
+    )
+
+    def __init__(self, interface: str, public_key: str, endpoint: str = "(none)",
+                 allowed_ips: str = "(none)", latest_handshake: int = 0,
+                 rx_bytes: int = 0, tx_bytes: int = 0,
+                 persistent_keepalive: int | None = None,
+                 has_preshared_key: bool = False):
+        self.interface = interface
+        self.public_key = public_key
+        self.has_preshared_key = has_preshared_key
+        self.endpoint = endpoint
+        self.allowed_ips = allowed_ips
+        self.latest_handshake = latest_handshake
+        self.rx_bytes = rx_bytes
+        self.tx_bytes = tx_bytes
+        self.persistent_keepalive = persistent_keepalive
+
+    def handshake_age(self, now: int) -> int | None:
+        return now - self.latest_handshake if self.latest_handshake else None
+
+    def is_active(self, now: int) -> bool:
+        age = self.handshake_age(now)
+        return age is not None and age < HANDSHAKE_ACTIVE_THRESHOLD
+
+    def addresses(self) -> list:
+        return [] if self.allowed_ips == "(none)" else self.allowed_ips.split(",")
+
+
+class PeerTable:
+    """One parsed read of the backend. Treat as immutable."""
+
+    __slots__ = ("generation", "timestamp", "source", "interfaces", "peers", "by_key")
+
+    def __init__(self, generation: int, timestamp: float, source: str,
+                 interfaces: list, peers: list):
+        self.generation = generation
+        self.timestamp = timestamp
+        self.source = source
+        self.interfaces = interfaces
+        self.peers = peers
+        self.by_key = {p.public_key: p for p in peers}
+
+    def counts(self, now: int) -> tuple:
+        """(total, active) peers."""
+        return len(self.peers), sum(1 for p in self.peers if p.is_active(now))
+
+    def next_active_change(self, now: int) -> int | None:
+        """Epoch at which the next active peer turns idle without a new handshake."""
+        return min(
+            (p.latest_handshake + HANDSHAKE_ACTIVE_THRESHOLD for p in self.peers
+             if p.latest_handshake and p.latest_handshake + HANDSHAKE_ACTIVE_THRESHOLD > now),
+            default=None,
+        )
+
+
+def _int(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def parse_dump(output: str) -> tuple:
+    """
+    Single pass over `wg/awg show all dump`. The first line of each interface
+    describes the interface (awg appends its obfuscation params), every
+    following line is a peer:
+    <iface> <private-key> <public-key> <listen-port> <fwmark> [...]
+    <iface> <pubkey> <psk> <endpoint> <allowed-ips> <handshake> <rx> <tx> <keepalive>
+    Returns (interfaces, peers). Private and preshared keys are never kept.
+    """
+    interfaces, peers = [], []
+    seen = set()
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 5:
+            continue
+        if parts[0] not in seen:
+            seen.add(parts[0])
+            interfaces.append(InterfaceRecord(
+                name=parts[0],
+                public_key=parts[2],
+                listen_port=_int(parts[3]),
+                fwmark=parts[4],
+            ))
+            continue
+        # Only the exact peer shape: an interface line (awg has 13+ columns,
+        # private key in column 2) must never be read as a peer.
+        if len(parts) != 9:
+            continue
+        keepalive = parts[8]
+        peers.append(PeerRecord(
+            interface=parts[0],
+            public_key=parts[1],
+            has_preshared_key=parts[2] != "(none)",
+            endpoint=parts[3],
+            allowed_ips=parts[4],
+            latest_handshake=_int(parts[5]),
+            rx_bytes=_int(parts[6]),
+            tx_bytes=_int(parts[7]),
+            persistent_keepalive=int(keepalive) if keepalive.isdigit() else None,
+        ))
+    return interfaces, peers
@@ -0,0 +1,103 @@
+# control-plane/app/services/peer_sync.py
+# Change log behind `/api/peers?since=<cursor>`.
+# Every peer is reduced to a signature of what the dashboard shows (endpoint,
+# addresses, handshake, counters, active flag, label); a request diffs the
+# current signatures against the previous ones and appends the changed and
+# removed keys under a new sequence number. The diff only runs when the peer
+# table generation or the labels file changed, or an active peer's handshake
+# has since crossed the threshold. The log is bounded: a cursor older than
+# its first entry, or from a previous process, gets a full resync.
+
+import collections
+import os
+import threading
+import time
+
+from app.services.labels import get_labels, get_labels_version
+from app.services.peer_records import PeerTable
+
+PEER_SYNC_LOG_SIZE = int(os.getenv("PEER_SYNC_LOG_SIZE", "128"))
+
+_BOOT = f"{int(time.time()):x}"
+
+
+class PeerSync:
+    def __init__(self, log_size: int = PEER_SYNC_LOG_SIZE):
+        self._lock = threading.Lock()
+        self._log = collections.deque(maxlen=log_size)   # (seq, changed keys, removed keys)
+        self._rows: dict[str, tuple] = {}
+        self._seq = 0
+        self._source = None        # (table generation, labels version) last diffed
+        self._recheck_at = 0       # next handshake threshold crossing
+
+    def cursor(self) -> str:
+        return f"{_BOOT}.{self._seq}"
+
+    def _diff(self, table: PeerTable, now: int) -> None:
+        """Caller holds _lock."""
+        labels = get_labels()
+        rows = {}
+        for p in table.peers:
+            meta = labels.get(p.public_key) or {}
+            rows[p.public_key] = (
+                p.interface, p.endpoint, p.allowed_ips, p.latest_handshake,
+                p.rx_bytes, p.tx_bytes, p.persistent_keepalive, p.is_active(now),
+                meta.get("label", ""), meta.get("created_at"),
+            )
+
+        previous = self._rows
+        changed = frozenset(k for k, row in rows.items() if previous.get(k) != row)
+        removed = frozenset(k for k in previous if k not in rows)
+        if changed or removed:
+            self._seq += 1
+            self._log.append((self._seq, changed, removed))
+        self._rows = rows
+        recheck_at = table.next_active_change(now)
+        self._recheck_at = recheck_at if recheck_at is not None else float("inf")
+
+    def sync(self, table: PeerTable, since: str | None = None) -> dict:
+        """
+        Brings the log up to date with `table` and returns {"cursor", "full",
+        "changed", "removed"}. `full` is True (and the key sets empty) when
+        `since` is missing, malformed, from another process or too old.
+        """
+        now = int(time.time())
+        source = (table.generation, get_labels_version())
+        with self._lock:
+            if source != self._source or now >= self._recheck_at:
+                self._diff(table, now)
+                self._source = source
+            result = {"cursor": self.cursor(), "full": True, "changed": frozenset(), "removed": frozenset()}
+
+            boot, _, seq = (since or "").partition(".")
+            if boot != _BOOT or not seq.isdigit() or int(seq) > self._seq:
+                return result
+            seq = int(seq)
+            first = self._log[0][0] if self._log else self._seq + 1
+            if seq < first - 1:
+                return result
+
+            changed, removed = set(), set()
+            for entry_seq, entry_changed, entry_removed in self._log:
+                if entry_seq > seq:
+                    changed |= entry_changed
+                    removed |= entry_removed
+            rows = self._rows
+            result.update({
+                "full":    False,
+                # A key removed and added again since the cursor is a change.
+                "changed": frozenset(k for k in changed if k in rows),
+                "removed": frozenset(k for k in removed if k not in rows),
+            })
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "cursor":      self.cursor(),
+            "log_entries": len(self._log),
+            "log_size":    self._log.maxlen,
+            "peers":       len(self._rows),
+        }
+
+
+peer_sync = PeerSync()
@@ -0,0 +1,64 @@
+# control-plane/app/services/profiler.py
+# Opt-in sampling profiler (AEGIS_PROFILER_ENABLED=true).
+# For a bounded window, a thread snapshots every other thread's stack via
+# sys._current_frames() at a fixed interval and aggregates them into
+# collapsed stacks ("thread;mod:func;mod:func count"), the input format of
+# flamegraph.pl / speedscope; nothing but `stack count` lines, so the sample
+# count travels separately. Only one capture runs at a time.
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILER_ENABLED = os.getenv("AEGIS_PROFILER_ENABLED", "false").lower() == "true"
+PROFILE_MAX_SECONDS = 60
+
+_MAX_DEPTH = 128
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}"
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    def collect(self, seconds: float, interval: float) -> tuple:
+        """Blocks for `seconds` and returns (collapsed stacks heaviest first, samples taken)."""
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already being captured")
+        try:
+            me = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    parts = []
+                    while frame is not None and len(parts) < _MAX_DEPTH:
+                        parts.append(_frame_label(frame))
+                        frame = frame.f_back
+                    parts.append(names.get(ident, str(ident)))
+                    stacks[";".join(reversed(parts))] += 1
+                samples += 1
+                time.sleep(interval)
+        finally:
+            self._busy.release()
+
+        text = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        return text, samples
+
+
+profiler = SamplingProfiler()
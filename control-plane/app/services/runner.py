@@ -0,0 +1,146 @@
+# control-plane/app/services/runner.py
+# Async command runner for request handlers.
+# Commands run via asyncio.create_subprocess_exec, so a slow helper never
+# holds a threadpool worker. Each command class has its own concurrency
+# limit; the deadline covers queueing plus execution, and a timed-out or
+# cancelled command has its process killed. Failures raise the standard
+# subprocess exceptions (CalledProcessError / TimeoutExpired) so callers keep
+# their existing error handling.
+
+import asyncio
+import os
+import subprocess
+import time
+from typing import NamedTuple
+
+from app.services.timings import timings
+
+# Per-class concurrency; override with AEGIS_RUNNER_LIMITS="helper=2,fail2ban=1".
+# Helper status polls (every open tab, every 10-15 s) and helper actions have
+# separate classes, so an action never queues behind polls.
+DEFAULT_LIMITS = {
+    "helper_status": 2,   # aegis-node-ops / aegis-dns-* status
+    "helper":        2,   # aegis-node-ops / aegis-dns-* actions (up to 20 s each)
+    "fail2ban":      2,
+    "system":        1,   # shutdown and similar one-off actions
+}
+DEFAULT_CLASS_LIMIT = 4
+
+
+def _parse_limits(raw: str) -> dict:
+    limits = dict(DEFAULT_LIMITS)
+    for item in raw.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip().isdigit() and int(value) > 0:
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class CommandResult(NamedTuple):
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+
+
+class CommandRunner:
+    def __init__(self, limits: dict, default_limit: int):
+        self.limits = limits
+        self.default_limit = default_limit
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._stats: dict[str, dict] = {}
+
+    def _class(self, name: str) -> tuple:
+        sem = self._semaphores.get(name)
+        if sem is None:
+            sem = asyncio.Semaphore(self.limits.get(name, self.default_limit))
+            self._semaphores[name] = sem
+            self._stats[name] = {
+                "running": 0, "waiting": 0, "completed": 0,
+                "failed": 0, "timeouts": 0, "cancelled": 0,
+            }
+        return sem, self._stats[name]
+
+    async def _exec(self, cmd: list, cls: str, data: bytes | None) -> CommandResult:
+        sem, stats = self._class(cls)
+        stats["waiting"] += 1
+        try:
+            await sem.acquire()
+        finally:
+            stats["waiting"] -= 1
+
+        stats["running"] += 1
+        started = time.monotonic()
+        proc = None
+        timings.enter(f"runner.{cls}")
+        error = True
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=subprocess.PIPE if data is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            out, err = await proc.communicate(data)
+            error = proc.returncode != 0
+            return CommandResult(
+                proc.returncode,
+                out.decode("utf-8", "replace"),
+                err.decode("utf-8", "replace"),
+                round(time.monotonic() - started, 4),
+            )
+        except asyncio.CancelledError:
+            # Deadline hit or caller went away: do not leave the child running.
+            if proc is not None and proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+            raise
+        finally:
+            stats["running"] -= 1
+            sem.release()
+            timings.leave(f"runner.{cls}")
+            timings.record(f"runner.{cls}", time.monotonic() - started, error, " ".join(cmd[:3]))
+
+    async def run(self, cmd: list, cls: str = "default", timeout: float = 10,
+                  input: str = None, check: bool = False) -> CommandResult:
+        """
+        Runs `cmd` within the concurrency limit of `cls`. `timeout` is the
+        overall deadline, including time spent waiting for a slot.
+        """
+        _, stats = self._class(cls)
+        data = input.encode() if input is not None else None
+        try:
+            result = await asyncio.wait_for(self._exec(cmd, cls, data), timeout)
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            raise
+        except OSError:
+            stats["failed"] += 1
+            raise
+
+        stats["completed"] += 1
+        if result.returncode != 0:
+            stats["failed"] += 1
+            if check:
+                raise subprocess.CalledProcessError(
+                    result.returncode, cmd, result.stdout, result.stderr,
+                )
+        return result
+
+    def stats(self) -> dict:
+        return {
+            name: {"limit": self.limits.get(name, self.default_limit), **stats}
+            for name, stats in self._stats.items()
+        }
+
+
+runner = CommandRunner(
+    _parse_limits(os.getenv("AEGIS_RUNNER_LIMITS", "")),
+    DEFAULT_CLASS_LIMIT,
+)
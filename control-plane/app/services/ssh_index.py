@@ -0,0 +1,189 @@
+# control-plane/app/services/ssh_index.py
+# Persistent SSH event index (SQLite).
+# Every parsed auth.log event is stored once (deduplicated by timestamp +
+# line digest) and counted into per-hour buckets in the same transaction,
+# so timelines over 7/30/90 days read at most days*24 aggregate rows.
+# Raw rows are pruned by retention; hourly buckets outlive them.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+SSH_INDEX_PATH = os.getenv("SSH_INDEX_PATH", "/opt/aegis/ssh_events.sqlite3")
+
+# Successful logins are kept long enough to draw the 90-day timeline dots;
+# failures are mostly noise under brute force and only feed the aggregates.
+LOGIN_RETENTION_DAYS  = int(os.getenv("SSH_INDEX_LOGIN_RETENTION_DAYS", "90"))
+EVENT_RETENTION_DAYS  = int(os.getenv("SSH_INDEX_EVENT_RETENTION_DAYS", "7"))
+HOURLY_RETENTION_DAYS = int(os.getenv("SSH_INDEX_HOURLY_RETENTION_DAYS", "365"))
+
+COMPACT_INTERVAL = 3600   # collector cadence for compact()
+
+_MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4,
+    "May": 5, "Jun": 6, "Jul": 7, "Aug": 8,
+    "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts     INTEGER NOT NULL,
+    digest INTEGER NOT NULL,
+    level  TEXT    NOT NULL,
+    label  TEXT    NOT NULL,
+    user   TEXT,
+    ip     TEXT,
+    port   INTEGER,
+    PRIMARY KEY (ts, digest)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_label_ts ON events (label, ts);
+CREATE TABLE IF NOT EXISTS hourly (
+    hour  INTEGER NOT NULL,
+    label TEXT    NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour, label)
+) WITHOUT ROWID;
+"""
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _connect():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(SSH_INDEX_PATH, check_same_thread=False, isolation_level=None)
+        # auto_vacuum only takes effect before the first table (and before
+        # WAL) on a new file; an existing file needs one VACUUM to switch.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0:
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _conn = conn
+    return _conn
+
+
+def syslog_epoch(timestamp: str, now: float = None) -> int | None:
+    """
+    "Feb 21 20:01:49" (UTC, no year) -> epoch seconds.
+    A date that would lie in the future belongs to the previous year.
+    """
+    parts = timestamp.split()
+    if len(parts) != 3 or parts[0] not in _MONTHS:
+        return None
+    try:
+        h, mi, s = (int(x) for x in parts[2].split(":"))
+        now_dt = datetime.fromtimestamp(now if now is not None else time.time(), timezone.utc)
+        dt = datetime(now_dt.year, _MONTHS[parts[0]], int(parts[1]), h, mi, s, tzinfo=timezone.utc)
+        if (dt - now_dt).total_seconds() > 86400:
+            dt = dt.replace(year=dt.year - 1)
+    except ValueError:
+        return None
+    return int(dt.timestamp())
+
+
+def _digest(raw: str) -> int:
+    return int.from_bytes(hashlib.blake2b(raw.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def record_events(events) -> int:
+    """
+    Stores parsed SSH events ({timestamp, level, label, user, ip, port, raw}).
+    Already-indexed lines (e.g. re-read after a restart) are ignored, as are
+    events older than their raw retention, so hourly counts never double.
+    Returns the number of new events.
+    """
+    now = time.time()
+    cutoff = {
+        "login": now - LOGIN_RETENTION_DAYS * 86400,
+        None:    now - EVENT_RETENTION_DAYS * 86400,
+    }
+    inserted = 0
+    with _lock:
+        try:
+            conn = _connect()
+            conn.execute("BEGIN")
+            for e in events:
+                ts = syslog_epoch(e.get("timestamp", ""), now)
+                if ts is None or ts < cutoff.get(e["label"], cutoff[None]):
+                    continue
+                try:
+                    port = int(e.get("port") or 0)
+                except ValueError:
+                    port = 0
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO events (ts, digest, level, label, user, ip, port) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (ts, _digest(e.get("raw", "")), e["level"], e["label"], e.get("user"), e.get("ip"), port),
+                )
+                if cur.rowcount != 1:
+                    continue
+                conn.execute(
+                    "INSERT INTO hourly (hour, label, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT (hour, label) DO UPDATE SET count = count + 1",
+                    (ts - ts % 3600, e["label"]),
+                )
+                inserted += 1
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if _conn is not None and _conn.in_transaction:
+                _conn.execute("ROLLBACK")
+            return 0
+    return inserted
+
+
+def compact(now: float = None) -> dict:
+    """Applies retention and returns freed pages to the filesystem."""
+    now = now if now is not None else time.time()
+    with _lock:
+        try:
+            conn = _connect()
+            conn.execute("BEGIN")
+            logins = conn.execute(
+                "DELETE FROM events WHERE label = 'login' AND ts < ?",
+                (now - LOGIN_RETENTION_DAYS * 86400,),
+            ).rowcount
+            others = conn.execute(
+                "DELETE FROM events WHERE label != 'login' AND ts < ?",
+                (now - EVENT_RETENTION_DAYS * 86400,),
+            ).rowcount
+            hours = conn.execute(
+                "DELETE FROM hourly WHERE hour < ?",
+                (now - HOURLY_RETENTION_DAYS * 86400,),
+            ).rowcount
+            conn.execute("COMMIT")
+            conn.execute("PRAGMA incremental_vacuum")
+        except sqlite3.Error:
+            if _conn is not None and _conn.in_transaction:
+                _conn.execute("ROLLBACK")
+            return {"status": "error"}
+    return {"status": "ok", "events_removed": logins + others, "hours_removed": hours}
+
+
+def hourly_counts(since: int, until: int) -> list:
+    """Returns [(hour_epoch, label, count)] for since <= hour < until."""
+    with _lock:
+        try:
+            return _connect().execute(
+                "SELECT hour, label, count FROM hourly WHERE hour >= ? AND hour < ? ORDER BY hour",
+                (since, until),
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+
+
+def logins_between(since: int, until: int) -> list:
+    """Returns [(ts, user, ip)] of successful logins, oldest first."""
+    with _lock:
+        try:
+            return _connect().execute(
+                "SELECT ts, user, ip FROM events WHERE label = 'login' AND ts >= ? AND ts < ? ORDER BY ts",
+                (since, until),
+            ).fetchall()
+        except sqlite3.Error:
+            return []
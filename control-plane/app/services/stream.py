@@ -0,0 +1,68 @@
+# control-plane/app/services/stream.py
+# Server-Sent Events fan-out for live performance metrics.
+# A single producer task per process reads the collector snapshot once per
+# interval and pushes the same frame to every subscribed dashboard.
+
+import asyncio
+import json
+import os
+
+from app.services.collector import collector
+
+STREAM_INTERVAL   = float(os.getenv("AEGIS_STREAM_INTERVAL", "2"))
+KEEPALIVE_SECONDS = 15
+
+
+class Broadcaster:
+    def __init__(self, source: str, interval: float):
+        self.source = source
+        self.interval = interval
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def _frame(self) -> str:
+        snap = collector.get(self.source)
+        payload = {**(snap.value or {}), "snapshot_age_seconds": snap.age()}
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def _produce(self) -> None:
+        while self._subscribers:
+            # collector.get may refresh inline when the thread is not running.
+            frame = await asyncio.to_thread(self._frame)
+            for queue in list(self._subscribers):
+                # Slow clients only ever see the newest frame.
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(frame)
+            await asyncio.sleep(self.interval)
+        self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._produce())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    async def events(self, is_disconnected):
+        """Yields SSE chunks until the client goes away."""
+        queue = self.subscribe()
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            while not await is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+
+performance_stream = Broadcaster("performance", STREAM_INTERVAL)
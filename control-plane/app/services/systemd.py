@@ -0,0 +1,101 @@
+# control-plane/app/services/systemd.py
+# Batched systemd unit state.
+# One `systemctl show -p … unit1 unit2 …` returns every unit's properties
+# (blank-line separated, in argument order) instead of one `is-active`
+# process per unit. Results are cached for a couple of seconds.
+
+import subprocess
+import threading
+import time
+
+from app.services.timings import timed
+
+_PROPERTIES = (
+    "Id", "LoadState", "ActiveState", "SubState", "UnitFileState",
+    "NRestarts", "ActiveEnterTimestampMonotonic", "InactiveEnterTimestampMonotonic",
+)
+
+CACHE_TTL = 2
+
+_cache = {"key": None, "states": None, "timestamp": 0.0}
+_lock = threading.Lock()
+
+
+def _boot_epoch() -> float:
+    try:
+        with open("/proc/uptime") as f:
+            return time.time() - float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _parse_show(output: str, names: list) -> dict:
+    blocks, current = [], {}
+    for line in output.splitlines():
+        if not line.strip():
+            if current:
+                blocks.append(current)
+                current = {}
+            continue
+        key, _, value = line.partition("=")
+        current[key] = value
+    if current:
+        blocks.append(current)
+
+    boot = _boot_epoch()
+
+    def _since(props: dict) -> int | None:
+        # Monotonic µs since boot is available on every systemd version,
+        # unlike `--timestamp=unix`.
+        field = "ActiveEnterTimestampMonotonic" if props.get("ActiveState") == "active" \
+            else "InactiveEnterTimestampMonotonic"
+        try:
+            mono = int(props.get(field) or 0)
+        except ValueError:
+            return None
+        return int(boot + mono / 1_000_000) if mono and boot else None
+
+    states = {}
+    for name, props in zip(names, blocks):
+        try:
+            restarts = int(props.get("NRestarts", ""))
+        except ValueError:
+            restarts = None
+        active = props.get("ActiveState") or "unknown"
+        states[name] = {
+            "load_state":  props.get("LoadState") or "unknown",
+            "active":      active,
+            "sub_state":   props.get("SubState") or "unknown",
+            "enabled":     props.get("UnitFileState") or "unknown",
+            "restarts":    restarts,
+            "since":       _since(props),
+        }
+    return states
+
+
+def _unknown() -> dict:
+    return {
+        "load_state": "unknown", "active": "unknown", "sub_state": "unknown",
+        "enabled": "unknown", "restarts": None, "since": None,
+    }
+
+
+def unit_states(names: list, ttl: float = CACHE_TTL) -> dict:
+    """Returns {unit: {load_state, active, sub_state, enabled, restarts, since}}."""
+    key = tuple(names)
+    now = time.time()
+    with _lock:
+        if _cache["key"] == key and now - _cache["timestamp"] < ttl:
+            return _cache["states"]
+        try:
+            with timed("systemctl.show"):
+                output = subprocess.check_output(
+                    ["systemctl", "show", "-p", ",".join(_PROPERTIES), "--", *names],
+                    text=True, stderr=subprocess.DEVNULL, timeout=5,
+                )
+            states = _parse_show(output, names)
+        except Exception:
+            states = {}
+        states = {name: states.get(name) or _unknown() for name in names}
+        _cache.update({"key": key, "states": states, "timestamp": now})
+        return states
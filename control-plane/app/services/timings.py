@@ -0,0 +1,107 @@
+# control-plane/app/services/timings.py
+# Lightweight operation timings for /api/debug/timings.
+# Subprocesses, file reads, socket calls and request handling are wrapped
+# with `timed(op)`; each op keeps counters plus a short ring of recent
+# durations for percentiles, and a shared ring of recent events feeds the
+# top-N slowest list. Recording is a lock + a few appends, cheap enough to
+# leave on permanently.
+
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TIMINGS_TOP_N = int(os.getenv("AEGIS_TIMINGS_TOP_N", "20"))
+
+_RECENT_PER_OP = 256     # durations kept per op for percentiles
+_RECENT_EVENTS = 2000    # events considered for the slowest list
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))]
+
+
+class _OpStats:
+    __slots__ = ("count", "errors", "total", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=_RECENT_PER_OP)
+
+
+class Timings:
+    def __init__(self, top_n: int):
+        self.top_n = top_n
+        self._ops: dict[str, _OpStats] = {}
+        self._events = deque(maxlen=_RECENT_EVENTS)
+        self._in_flight: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, op: str, seconds: float, error: bool = False, detail: str = None) -> None:
+        with self._lock:
+            stats = self._ops.get(op)
+            if stats is None:
+                stats = self._ops[op] = _OpStats()
+            stats.count += 1
+            stats.errors += error
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.recent.append(seconds)
+            self._events.append((seconds, time.time(), op, detail, error))
+
+    def enter(self, op: str) -> None:
+        with self._lock:
+            self._in_flight[op] = self._in_flight.get(op, 0) + 1
+
+    def leave(self, op: str) -> None:
+        with self._lock:
+            count = self._in_flight.get(op, 0) - 1
+            if count > 0:
+                self._in_flight[op] = count
+            else:
+                self._in_flight.pop(op, None)
+
+    @contextmanager
+    def timed(self, op: str, detail: str = None):
+        self.enter(op)
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.leave(op)
+            self.record(op, time.perf_counter() - started, error, detail)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ops = {op: (s.count, s.errors, s.total, s.max, sorted(s.recent)) for op, s in self._ops.items()}
+            events = list(self._events)
+            in_flight = dict(self._in_flight)
+
+        operations = {}
+        for op, (count, errors, total, longest, recent) in sorted(ops.items()):
+            operations[op] = {
+                "count":   count,
+                "errors":  errors,
+                "avg_ms":  round(total / count * 1000, 2) if count else None,
+                "p50_ms":  round(_percentile(recent, 50) * 1000, 2) if recent else None,
+                "p95_ms":  round(_percentile(recent, 95) * 1000, 2) if recent else None,
+                "max_ms":  round(longest * 1000, 2),
+            }
+        slowest = [
+            {"op": op, "ms": round(seconds * 1000, 2), "at": int(ts), "detail": detail, "error": error}
+            for seconds, ts, op, detail, error in heapq.nlargest(self.top_n, events, key=lambda e: e[0])
+        ]
+        return {"operations": operations, "slowest": slowest, "in_flight": in_flight}
+
+
+timings = Timings(TIMINGS_TOP_N)
+timed = timings.timed
@@ -0,0 +1,136 @@
+# control-plane/app/services/traffic_history.py
+# Per-peer rx/tx history in fixed-size ring buffers.
+# Each peer owns two uint32 arrays of byte deltas (one slot per RESOLUTION
+# seconds); slot timestamps are implicit, so memory per peer is constant:
+# 2 * (HISTORY_SECONDS / RESOLUTION) * 4 bytes, ~2.9 KB for 1 h at 10 s.
+
+import os
+import threading
+import time
+from array import array
+
+HISTORY_SECONDS = int(os.getenv("TRAFFIC_HISTORY_SECONDS", "3600"))
+RESOLUTION      = int(os.getenv("TRAFFIC_HISTORY_RESOLUTION", "10"))
+MAX_PEERS       = int(os.getenv("TRAFFIC_HISTORY_MAX_PEERS", "10000"))
+
+SLOTS = max(1, HISTORY_SECONDS // RESOLUTION)
+
+_UINT32_MAX = 0xFFFFFFFF
+
+
+class _PeerHistory:
+    __slots__ = ("rx", "tx", "last_rx", "last_tx", "head", "last_seen")
+
+    def __init__(self, slot: int, rx_total: int, tx_total: int):
+        self.rx = array("I", bytes(4 * SLOTS))
+        self.tx = array("I", bytes(4 * SLOTS))
+        self.last_rx = rx_total
+        self.last_tx = tx_total
+        self.head = slot          # absolute slot number of the newest sample
+        self.last_seen = slot
+
+    def _advance(self, slot: int) -> None:
+        # Clear every slot between the previous head and the new one.
+        gap = min(slot - self.head, SLOTS)
+        for i in range(1, gap + 1):
+            idx = (self.head + i) % SLOTS
+            self.rx[idx] = 0
+            self.tx[idx] = 0
+        self.head = slot
+
+    def add(self, slot: int, rx_total: int, tx_total: int) -> None:
+        # Counters go backwards when the peer is re-added or the interface
+        # restarts; the new counter value is then the traffic since the reset.
+        d_rx = rx_total - self.last_rx if rx_total >= self.last_rx else rx_total
+        d_tx = tx_total - self.last_tx if tx_total >= self.last_tx else tx_total
+        self.last_rx, self.last_tx = rx_total, tx_total
+        self.last_seen = slot
+
+        if slot < self.head:
+            return
+        span = slot - self.head
+        if span > 0:
+            self._advance(slot)
+
+        # Spread a delta that covers several missed slots evenly across them.
+        spread = max(1, min(span, SLOTS))
+        for i in range(spread):
+            idx = (slot - i) % SLOTS
+            self.rx[idx] = min(_UINT32_MAX, self.rx[idx] + d_rx // spread)
+            self.tx[idx] = min(_UINT32_MAX, self.tx[idx] + d_tx // spread)
+
+    def series(self, slots: int, current_slot: int) -> tuple:
+        slots = max(1, min(slots, SLOTS))
+        timestamps, rx_rates, tx_rates = [], [], []
+        for slot in range(current_slot - slots + 1, current_slot + 1):
+            timestamps.append(slot * RESOLUTION)
+            if slot > self.head or slot <= self.head - SLOTS:
+                rx_rates.append(0.0)
+                tx_rates.append(0.0)
+                continue
+            idx = slot % SLOTS
+            rx_rates.append(round(self.rx[idx] / RESOLUTION, 1))
+            tx_rates.append(round(self.tx[idx] / RESOLUTION, 1))
+        return timestamps, rx_rates, tx_rates
+
+
+_peers: dict[str, _PeerHistory] = {}
+_lock = threading.Lock()
+
+
+def _current_slot(now: float = None) -> int:
+    return int((now if now is not None else time.time()) // RESOLUTION)
+
+
+def record_samples(samples, now: float = None) -> None:
+    """
+    samples: iterable of (public_key, rx_bytes_total, tx_bytes_total).
+    Peers absent for longer than the history window are dropped, and the
+    store never holds more than MAX_PEERS entries.
+    """
+    slot = _current_slot(now)
+    with _lock:
+        for public_key, rx_total, tx_total in samples:
+            history = _peers.get(public_key)
+            if history is None:
+                if len(_peers) >= MAX_PEERS:
+                    continue
+                _peers[public_key] = _PeerHistory(slot, rx_total, tx_total)
+            else:
+                history.add(slot, rx_total, tx_total)
+
+        expired = [k for k, h in _peers.items() if slot - h.last_seen >= SLOTS]
+        for key in expired:
+            del _peers[key]
+
+
+def get_history(public_key: str, window: int = HISTORY_SECONDS) -> dict | None:
+    """Returns the bytes/s series for one peer, oldest first, or None if unknown."""
+    window = max(RESOLUTION, min(int(window), SLOTS * RESOLUTION))
+    slot = _current_slot()
+    with _lock:
+        history = _peers.get(public_key)
+        if history is None:
+            return None
+        timestamps, rx_rates, tx_rates = history.series(window // RESOLUTION, slot)
+
+    return {
+        "public_key":         public_key,
+        "resolution_seconds": RESOLUTION,
+        "window_seconds":     window,
+        "timestamps":         timestamps,
+        "rx_bytes_per_sec":   rx_rates,
+        "tx_bytes_per_sec":   tx_rates,
+    }
+
+
+def get_history_stats() -> dict:
+    with _lock:
+        peers = len(_peers)
+    return {
+        "peers":              peers,
+        "max_peers":          MAX_PEERS,
+        "slots_per_peer":     SLOTS,
+        "resolution_seconds": RESOLUTION,
+        "approx_bytes":       peers * SLOTS * 8,
+    }
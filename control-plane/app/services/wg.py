@@ -3,14 +3,18 @@
 import subprocess
 import time
 import base64
-import re
 import qrcode
 from io import BytesIO
 import os
+import threading
 
 
-from app.services.constants import HANDSHAKE_ACTIVE_THRESHOLD
 from app.services.settings import get_provisioning_defaults
+from app.services.timings import timed
+from app.services import wg_keys, wg_netlink
+from app.services.ip_alloc import AddressPool, Allocator
+from app.services.peer_records import PeerTable, parse_dump
+from app.services.wg_config import ConfigStore
 
 VPN_TRANSPORT = os.getenv("VPN_TRANSPORT", "wireguard").strip().lower()
 VPN_TRANSPORT_LABEL = os.getenv(
@@ -47,6 +51,17 @@ ADMIN_PEER_IP = os.getenv("ADMIN_PEER_IP") or (
     (VPN_SUBNET_BASE + "2") if VPN_SUBNET_BASE else "10.66.66.2"
 )
 
+# Peer address pools. VPN_SUBNET_CIDR may be wider than the legacy /24
+# (e.g. 10.66.0.0/16); VPN_SUBNET6_CIDR (e.g. fd66:66::/64) enables dual-stack.
+# Host offsets below VPN_POOL_START stay reserved for static assignments.
+VPN_SUBNET_CIDR = os.getenv("VPN_SUBNET_CIDR") or (
+    f"{VPN_SUBNET_BASE}0/24" if VPN_SUBNET_BASE else None
+)
+VPN_SUBNET6_CIDR = os.getenv("VPN_SUBNET6_CIDR") or None
+VPN_POOL_START = int(os.getenv("VPN_POOL_START", "10"))
+VPN_IP_ALLOC_PATH = os.getenv("VPN_IP_ALLOC_PATH", "/opt/aegis/ip_alloc.json")
+VPN_IP_ALLOC_RESYNC_SECONDS = float(os.getenv("VPN_IP_ALLOC_RESYNC_SECONDS", "300"))
+
 # Backward-compatible names imported by older modules/tests.
 WG_INTERFACE = VPN_INTERFACE
 WG_SUBNET_BASE = VPN_SUBNET_BASE
@@ -54,30 +69,136 @@ WG_ENDPOINT = VPN_ENDPOINT
 WG_SERVER_PUBLIC_KEY_PATH = VPN_SERVER_PUBLIC_KEY_PATH
 WG_CONFIG_PATH = VPN_CONFIG_PATH
 
+# Peer reader backend: "cli" forks `sudo wg show all dump`, "netlink" talks
+# WG_CMD_GET_DEVICE in-process (needs CAP_NET_ADMIN) and falls back to "cli".
+VPN_PEER_READER = os.getenv("VPN_PEER_READER", "cli").strip().lower()
+VPN_NETLINK_FAMILY = os.getenv(
+    "VPN_NETLINK_FAMILY",
+    "amneziawg" if VPN_TRANSPORT == "amneziawg" else "wireguard",
+)
+
+# Key generation: "native" derives keypairs in-process (checked against
+# known-answer vectors first), "cli" forks `genkey`/`pubkey` per peer.
+VPN_KEYGEN = os.getenv("VPN_KEYGEN", "native").strip().lower()
+VPN_KEYPOOL_SIZE = int(os.getenv("VPN_KEYPOOL_SIZE", "256"))
+
 AMNEZIAWG_KEYS = ("Jc", "Jmin", "Jmax", "S1", "S2", "H1", "H2", "H3", "H4")
 
 
 # ── Helpers ────────────────────────────────────────────────
 
-_dump_cache = {"output": None, "timestamp": 0}
+vpn_config = ConfigStore(VPN_CONFIG_PATH)
 
-def get_wg_dump_cached(ttl=2) -> str:
-    global _dump_cache
-    now = time.time()
-    if _dump_cache["output"] and (now - _dump_cache["timestamp"]) < ttl:
-        return _dump_cache["output"]
+_table_state = {"table": None, "generation": 0, "fingerprint": None}
+_table_lock = threading.Lock()
+_netlink_state = {"disabled": VPN_PEER_READER != "netlink", "error": None}
 
+
+def _read_dump():
     try:
-        output = subprocess.check_output(
-            ["sudo", VPN_CLI, "show", "all", "dump"],
-            text=True
-        )
-        _dump_cache = {"output": output, "timestamp": now}
-        return output
+        with timed("wg.dump"):
+            return subprocess.check_output(
+                ["sudo", VPN_CLI, "show", "all", "dump"],
+                text=True
+            )
     except Exception:
         return None
 
 
+def _wg_set(args: list) -> None:
+    """`wg/awg set <iface> peer ... [peer ...]`; raises CalledProcessError."""
+    with timed("wg.set", detail=f"{args.count('peer')} peer(s)"):
+        subprocess.check_call(["sudo", VPN_CLI, "set", VPN_INTERFACE, *args])
+
+
+def _read_netlink():
+    if _netlink_state["disabled"]:
+        return None
+    try:
+        with timed("wg.netlink"):
+            interfaces, peers = wg_netlink.read_devices(VPN_NETLINK_FAMILY)
+        # No interface of the family: leave it to the CLI path, which reads
+        # nothing either and reports the backend as unreadable.
+        return (interfaces, peers) if interfaces else None
+    except wg_netlink.NetlinkUnavailable as e:
+        # Family missing or no netlink at all: stop trying, use the CLI path.
+        _netlink_state.update({"disabled": True, "error": str(e)})
+    except OSError as e:
+        _netlink_state["error"] = str(e)
+    return None
+
+
+def get_peer_table(ttl=2) -> PeerTable | None:
+    """
+    Returns the current PeerTable (one parsed backend read shared by every
+    view), or None if the VPN backend could not be read. Concurrent callers
+    with an expired table wait for a single refresh instead of each forking.
+    Uses netlink when VPN_PEER_READER=netlink, otherwise parses the CLI dump.
+    """
+    table = _table_state["table"]
+    if table is not None and time.time() - table.timestamp < ttl:
+        return table
+
+    with _table_lock:
+        table = _table_state["table"]
+        now = time.time()
+        if table is not None and now - table.timestamp < ttl:
+            return table
+
+        source = "netlink"
+        parsed = _read_netlink()
+        if parsed is None:
+            source = "cli"
+            output = _read_dump()
+            if not output:
+                return None
+            fingerprint = output
+        else:
+            fingerprint = _records_fingerprint(*parsed)
+
+        # Unchanged backend state keeps its generation (and, for the CLI, skips
+        # the parse), so the generation doubles as a content version.
+        previous = _table_state["table"]
+        if previous is not None and fingerprint == _table_state["fingerprint"]:
+            table = PeerTable(previous.generation, now, source, previous.interfaces, previous.peers)
+        else:
+            if source == "cli":
+                parsed = parse_dump(output)
+            _table_state["generation"] += 1
+            table = PeerTable(_table_state["generation"], now, source, *parsed)
+        _table_state.update({"table": table, "fingerprint": fingerprint})
+        return table
+
+
+def _records_fingerprint(interfaces: list, peers: list) -> tuple:
+    return (
+        tuple((i.name, i.public_key, i.listen_port, i.fwmark) for i in interfaces),
+        tuple((p.public_key, p.endpoint, p.allowed_ips, p.latest_handshake,
+               p.rx_bytes, p.tx_bytes, p.persistent_keepalive) for p in peers),
+    )
+
+
+def get_peer_records_cached(ttl=2):
+    """Returns the live [PeerRecord] list, or None if the backend could not be read."""
+    table = get_peer_table(ttl)
+    return table.peers if table is not None else None
+
+
+def _invalidate_peer_records() -> None:
+    """Forces the next read to hit the backend (and bump the generation) after a mutation."""
+    _table_state.update({"table": None, "fingerprint": None})
+
+
+def get_peer_reader_info() -> dict:
+    return {
+        "requested": VPN_PEER_READER,
+        "active": "cli" if _netlink_state["disabled"] else "netlink",
+        "generation": _table_state["generation"],
+        "netlink_family": VPN_NETLINK_FAMILY,
+        "last_error": _netlink_state["error"],
+    }
+
+
 def _format_age(seconds):
     if seconds is None:
         return None
@@ -89,50 +210,18 @@ def _format_age(seconds):
 
 
 def _persist_peer(public_key: str, allowed_ip: str):
-    """Appends a [Peer] block to the active VPN backend config."""
-    entry = f"\n[Peer]\nPublicKey = {public_key}\nAllowedIPs = {allowed_ip}\n"
-
-    subprocess.run(
-        ["sudo", "tee", "-a", VPN_CONFIG_PATH],
-        input=entry,
-        text=True,
-        check=True,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
+    """Adds a [Peer] block to the active VPN backend config."""
+    _persist_peers([(public_key, allowed_ip)])
 
-def _remove_from_config(public_key: str):
-    """
-    Removes the matching [Peer] block from the active backend config.
-    Deletes from the [Peer] section header to the next section header
-    or EOF if the public_key matches.
-    """
-    try:
-        with open(VPN_CONFIG_PATH, "r") as f:
-            content = f.read()
-    except OSError:
-        return
-
-    pattern = re.compile(
-        r"\n?\[Peer\]\n(?:[^\[]*\n)*",  # Until the next section after the [Peer] start
-        re.MULTILINE
-    )
 
-    def keep_block(match):
-        block = match.group(0)
-        if f"PublicKey = {public_key}" in block:
-            return ""          # remove this block
-        return block           # keep others
+def _persist_peers(peers: list):
+    """Adds one [Peer] block per (public_key, allowed_ip) with a single write."""
+    vpn_config.apply(add=peers)
 
-    new_content = pattern.sub(keep_block, content)
 
-    # write with sudo tee (file owned by root)
-    subprocess.check_call(
-        ["sudo", "tee", VPN_CONFIG_PATH],
-        input=new_content,
-        text=True,
-        stdout=subprocess.DEVNULL,
-    )
+def _remove_from_config(public_keys: list) -> dict:
+    """Removes the matching [Peer] blocks from the active backend config in one write."""
+    return vpn_config.apply(remove=public_keys)
 
 
 # ── Public API ─────────────────────────────────────────────
@@ -147,105 +236,190 @@ def get_transport_info():
         "config_path": VPN_CONFIG_PATH,
         "service_name": VPN_SERVICE_NAME,
         "server_ip": VPN_SERVER_IP,
+        "peer_reader": get_peer_reader_info(),
+        "keygen": get_keygen_info(),
+        "config": vpn_config.stats(),
     }
 
-def get_peers():
-    output = get_wg_dump_cached()
-    if not output:
-        return {"peers": []}
-
-    lines = output.strip().split("\n")
-    if len(lines) <= 1:
+def get_peers(table: PeerTable | None = None, keys=None):
+    """
+    Peer list for the API; pass `table` to render a table the caller already
+    holds and `keys` (a set of public keys) to render only those peers.
+    """
+    table = table or get_peer_table()
+    if not table:
         return {"peers": []}
 
     now = int(time.time())
     peers = []
 
-    for line in lines[1:]:
-        parts = line.split()
-        if len(parts) < 6:
+    for record in table.peers:
+        if keys is not None and record.public_key not in keys:
             continue
-
-        public_key  = parts[1]
-        allowed_ips = parts[4]
-
-        try:
-            last_handshake = int(parts[5])
-        except (ValueError, IndexError):
-            last_handshake = 0
-
-        if last_handshake == 0:
-            handshake_age = None
-            is_active     = False
-        else:
-            handshake_age = now - last_handshake
-            is_active     = handshake_age < HANDSHAKE_ACTIVE_THRESHOLD
-
+        handshake_age = record.handshake_age(now)
         peers.append({
-            "public_key":            public_key,
-            "allowed_ips":           allowed_ips,
-            "last_handshake_epoch":  last_handshake,
+            "public_key":            record.public_key,
+            "allowed_ips":           record.allowed_ips,
+            "interface":             record.interface,
+            "endpoint":              record.endpoint,
+            "rx_bytes":              record.rx_bytes,
+            "tx_bytes":              record.tx_bytes,
+            "persistent_keepalive":  record.persistent_keepalive,
+            "last_handshake_epoch":  record.latest_handshake,
             "handshake_age_seconds": handshake_age,
             "handshake_age_human":   _format_age(handshake_age),
-            "is_active":             is_active,
+            "is_active":             record.is_active(now),
         })
 
-    return {"peers": peers}
+    return {"peers": peers, "generation": table.generation}
 
 
 def add_peer(public_key: str, allowed_ip: str):
     try:
-        subprocess.check_call([
-            "sudo", VPN_CLI, "set", VPN_INTERFACE,
-            "peer", public_key,
-            "allowed-ips", allowed_ip,
-        ])
+        _wg_set(["peer", public_key, "allowed-ips", allowed_ip])
         _persist_peer(public_key, allowed_ip)
+        if VPN_SUBNET_CIDR:
+            _allocator().claim(allowed_ip)
         return {"status": "ok", "message": "peer added"}
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        _invalidate_peer_records()
 
 
 def remove_peer(public_key: str):
+    allowed_ips = _peer_allowed_ips(public_key)
     try:
-        subprocess.check_call([
-            "sudo", VPN_CLI, "set", VPN_INTERFACE,
-            "peer", public_key,
-            "remove",
-        ])
-        _remove_from_config(public_key)
+        _wg_set(["peer", public_key, "remove"])
+        _remove_from_config([public_key])
+        if allowed_ips and VPN_SUBNET_CIDR:
+            _allocator().reclaim(allowed_ips)
         return {"status": "ok", "message": "peer removed"}
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        _invalidate_peer_records()
+
 
+def _add_peers_committed(entries: list, allocator, reservations: list) -> None:
+    """
+    Adds (public_key, allowed_ip) entries to the live interface and the config
+    and commits their reservations. Addresses are released on failure only
+    once the peers are known not to be live: if the config write fails, the
+    peers are removed from the interface first, and if that fails too the
+    addresses stay committed so they are never handed out twice.
+    """
+    args = []
+    for public_key, allowed_ip in entries:
+        args += ["peer", public_key, "allowed-ips", allowed_ip]
+    try:
+        try:
+            _wg_set(args)
+        except Exception:
+            allocator.release(*reservations)
+            raise
+        try:
+            _persist_peers(entries)
+        except Exception:
+            try:
+                _wg_set([arg for public_key, _ in entries for arg in ("peer", public_key, "remove")])
+            except Exception:
+                allocator.commit_many(reservations)
+            else:
+                allocator.release(*reservations)
+            raise
+        allocator.commit_many(reservations)
+    finally:
+        _invalidate_peer_records()
 
-def _allocate_ip() -> str:
-    if not VPN_SUBNET_BASE:
-        raise RuntimeError("VPN_SUBNET_BASE environment variable not set")
 
-    peers = get_peers()["peers"]
-    used  = {p["allowed_ips"].split("/")[0] for p in peers}
+PEER_BULK_MAX = 5000
 
-    for i in range(10, 200):
-        candidate = f"{VPN_SUBNET_BASE}{i}"
-        if candidate not in used:
-            return f"{candidate}/32"
 
-    raise RuntimeError("No available IP in subnet range (.10–.199)")
+def remove_peers(public_keys: list) -> dict:
+    """
+    Removes many peers with one `set` invocation (peer A remove peer B remove ...),
+    one config write and one allocator update.
+    Returns per-key outcomes: "removed", "not_found" or "error".
+    """
+    keys = list(dict.fromkeys(public_keys))
+    if not keys:
+        return {"status": "ok", "results": {}}
 
+    live = {r.public_key: r.allowed_ips for r in get_peer_records_cached() or []}
+    live_keys = [k for k in keys if k in live]
 
-def _read_amneziawg_params_from_config() -> dict:
-    params = {}
     try:
-        with open(VPN_CONFIG_PATH, "r") as f:
-            for line in f:
-                key, _, value = line.partition("=")
-                key = key.strip()
-                if key in AMNEZIAWG_KEYS:
-                    params[key] = value.strip()
-    except OSError:
-        pass
-    return params
+        if live_keys:
+            args = []
+            for key in live_keys:
+                args += ["peer", key, "remove"]
+            _wg_set(args)
+        config_result = _remove_from_config(keys)
+    except (subprocess.CalledProcessError, OSError) as e:
+        return {
+            "status": "error",
+            "message": str(e),
+            "results": {k: "error" for k in keys},
+        }
+    finally:
+        _invalidate_peer_records()
+
+    in_config = set(config_result["removed"])
+    results = {
+        k: "removed" if k in live or k in in_config else "not_found"
+        for k in keys
+    }
+    freed = [live[k] for k in live_keys if live[k] != "(none)"]
+    if freed and VPN_SUBNET_CIDR:
+        _allocator().reclaim(",".join(freed))
+    return {"status": "ok", "results": results}
+
+
+_allocator_instance = None
+_allocator_lock = threading.Lock()
+
+
+def _used_addresses():
+    # Fresh read: runs under the allocator lock, after every committed peer
+    # was added to the interface.
+    table = get_peer_table(ttl=0)
+    if table is None:
+        return None
+    return [ip for r in table.peers for ip in r.addresses()]
+
+
+def _allocator() -> Allocator:
+    global _allocator_instance
+    if _allocator_instance is None:
+        with _allocator_lock:
+            if _allocator_instance is None:
+                if not VPN_SUBNET_CIDR:
+                    raise RuntimeError("VPN_SUBNET_CIDR (or VPN_SUBNET_BASE) environment variable not set")
+                exclude = (VPN_SERVER_IP, ADMIN_PEER_IP)
+                pools = [AddressPool(VPN_SUBNET_CIDR, VPN_POOL_START, exclude=exclude)]
+                if VPN_SUBNET6_CIDR:
+                    pools.append(AddressPool(VPN_SUBNET6_CIDR, VPN_POOL_START, max_size=1 << 16))
+                _allocator_instance = Allocator(pools, VPN_IP_ALLOC_PATH, seed=_used_addresses,
+                                                 resync_interval=VPN_IP_ALLOC_RESYNC_SECONDS)
+    return _allocator_instance
+
+
+def _peer_allowed_ips(public_key: str) -> str | None:
+    table = get_peer_table()
+    record = table.by_key.get(public_key) if table else None
+    return record.allowed_ips if record else None
+
+
+def get_allocation_stats() -> dict:
+    return _allocator().stats()
+
+
+def _read_amneziawg_params_from_config() -> dict:
+    model = vpn_config.get()
+    if model is None:
+        return {}
+    return {k: v for k, v in model.interface_values().items() if k in AMNEZIAWG_KEYS}
 
 
 def _amneziawg_params() -> dict:
@@ -268,7 +442,7 @@ def _client_config(private_key: str, allowed_ip: str, server_pub: str, defaults:
     interface_lines = [
         "[Interface]",
         f"PrivateKey = {private_key}",
-        f"Address = {allowed_ip}",
+        f"Address = {allowed_ip.replace(',', ', ')}",
     ]
     if defaults.get("dns_enabled", True):
         interface_lines.append(f"DNS = {dns_ip}")
@@ -286,7 +460,7 @@ def _client_config(private_key: str, allowed_ip: str, server_pub: str, defaults:
         "[Peer]",
         f"PublicKey = {server_pub}",
         f"Endpoint = {VPN_ENDPOINT}",
-        "AllowedIPs = 0.0.0.0/0",
+        "AllowedIPs = 0.0.0.0/0, ::/0" if VPN_SUBNET6_CIDR else "AllowedIPs = 0.0.0.0/0",
     ]
     keepalive = defaults.get("persistent_keepalive")
     if keepalive is not None:
@@ -319,50 +493,152 @@ def _linux_install_command(config: str) -> str:
     )
 
 
+_keypool_state = {"pool": None, "checked": False}
+_keypool_lock = threading.Lock()
+
+
+def _keypool():
+    """Returns the keypair pool, or None when keys must come from the CLI."""
+    with _keypool_lock:
+        if not _keypool_state["checked"]:
+            _keypool_state["checked"] = True
+            if VPN_KEYGEN == "native" and wg_keys.self_check():
+                _keypool_state["pool"] = wg_keys.KeyPool(VPN_KEYPOOL_SIZE)
+    return _keypool_state["pool"]
+
+
+def start_keypool() -> None:
+    pool = _keypool()
+    if pool is not None:
+        pool.start()
+
+
+def get_keygen_info() -> dict:
+    pool = _keypool()
+    return {
+        "requested": VPN_KEYGEN,
+        "active": "native" if pool else "cli",
+        "pool": pool.stats() if pool else None,
+    }
+
+
+def _cli_keypair() -> tuple:
+    with timed("wg.genkey"):
+        private_key = subprocess.check_output([VPN_CLI, "genkey"], text=True).strip()
+        public_key  = subprocess.check_output(
+            [VPN_CLI, "pubkey"], input=private_key, text=True
+        ).strip()
+    return private_key, public_key
+
+
+def _generate_keypairs(count: int) -> list:
+    pool = _keypool()
+    if pool is not None:
+        return pool.take_many(count)
+    return [_cli_keypair() for _ in range(count)]
+
+
+def _generate_keypair() -> tuple:
+    return _generate_keypairs(1)[0]
+
+
+def _read_server_public_key() -> str:
+    with timed("wg.server_key_read"), open(VPN_SERVER_PUBLIC_KEY_PATH) as f:
+        return f.read().strip()
+
+
+def _qr_base64(config: str) -> str:
+    img = qrcode.make(config)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def _transport_fields() -> dict:
+    return {
+        "transport":  VPN_TRANSPORT,
+        "transport_label": VPN_TRANSPORT_LABEL,
+        "interface":  VPN_INTERFACE,
+        "endpoint":   VPN_ENDPOINT,
+        "client_app": "AmneziaWG / Amnezia VPN" if VPN_TRANSPORT == "amneziawg" else "WireGuard",
+    }
+
+
 def provision_peer():
     defaults = get_provisioning_defaults()
     # 1. Generate keypair
-    private_key = subprocess.check_output([VPN_CLI, "genkey"], text=True).strip()
-    public_key  = subprocess.check_output(
-        [VPN_CLI, "pubkey"], input=private_key, text=True
-    ).strip()
-
-    # 2. Allocate IP
-    allowed_ip = _allocate_ip()
+    private_key, public_key = _generate_keypair()
 
-    # 3. Add to live interface
-    subprocess.check_call([
-        "sudo", VPN_CLI, "set", VPN_INTERFACE,
-        "peer", public_key,
-        "allowed-ips", allowed_ip,
-    ])
+    # 2. Reserve IP(s); held until the peer is committed or released
+    allocator = _allocator()
+    reservation = allocator.reserve()
+    allowed_ip = reservation.allowed_ips
 
-    # 4. Persist to config
-    _persist_peer(public_key, allowed_ip)
+    # 3. Add to live interface, 4. persist to config
+    _add_peers_committed([(public_key, allowed_ip)], allocator, [reservation])
 
     # 5. Read server public key
-    with open(VPN_SERVER_PUBLIC_KEY_PATH) as f:
-        server_pub = f.read().strip()
+    server_pub = _read_server_public_key()
 
     # 6. Build client config
     config = _client_config(private_key, allowed_ip, server_pub, defaults)
 
     # 7. Generate QR code
-    img = qrcode.make(config)
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+    qr_base64 = _qr_base64(config)
 
     return {
         "public_key": public_key,
         "allowed_ip": allowed_ip,
         "config":     config,
         "qr":         qr_base64,
-        "transport":  VPN_TRANSPORT,
-        "transport_label": VPN_TRANSPORT_LABEL,
-        "interface":  VPN_INTERFACE,
-        "endpoint":   VPN_ENDPOINT,
-        "client_app": "AmneziaWG / Amnezia VPN" if VPN_TRANSPORT == "amneziawg" else "WireGuard",
+        **_transport_fields(),
         "install_command": _linux_install_command(config),
         "provisioning_defaults": defaults,
     }
+
+
+PROVISION_BATCH_MAX = 1000
+
+
+def provision_peers(count: int, with_qr: bool = False):
+    """
+    Provisions `count` peers in one pass: addresses are reserved up front,
+    all peers go to the live interface in a single `set` invocation and to
+    the config file in a single append. QR rendering is opt-in (it dominates
+    the cost for large batches).
+    """
+    if count < 1 or count > PROVISION_BATCH_MAX:
+        return {"status": "error", "message": f"count must be between 1 and {PROVISION_BATCH_MAX}"}
+
+    defaults = get_provisioning_defaults()
+    server_pub = _read_server_public_key()
+    keypairs = _generate_keypairs(count)
+
+    allocator = _allocator()
+    reservations = allocator.reserve_many(count)
+    entries = [
+        (public_key, res.allowed_ips)
+        for (_, public_key), res in zip(keypairs, reservations)
+    ]
+
+    _add_peers_committed(entries, allocator, reservations)
+
+    peers = []
+    for (private_key, public_key), (_, allowed_ip) in zip(keypairs, entries):
+        config = _client_config(private_key, allowed_ip, server_pub, defaults)
+        peer = {
+            "public_key": public_key,
+            "allowed_ip": allowed_ip,
+            "config":     config,
+        }
+        if with_qr:
+            peer["qr"] = _qr_base64(config)
+        peers.append(peer)
+
+    return {
+        "status": "ok",
+        "count":  len(peers),
+        "peers":  peers,
+        **_transport_fields(),
+        "provisioning_defaults": defaults,
+    }
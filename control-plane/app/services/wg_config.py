@@ -0,0 +1,222 @@
+# control-plane/app/services/wg_config.py
+# Parsed model of the VPN interface config (wg0.conf / awg0.conf).
+# The file is parsed once into the [Interface] head plus [Peer] blocks keyed
+# by public key; the model is reused until the file changes (mtime/size/inode,
+# or a short revalidation interval when the config directory is not
+# stat-able by the API user). Mutations are applied in batches and written
+# once, atomically (temp file + rename), either directly or through the
+# root helper when the file is root-owned.
+
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+
+from app.services.timings import timed
+
+HELPER = "/usr/local/sbin/aegis-node-ops"
+
+REVALIDATE_SECONDS = 30   # re-read cadence when os.stat is not permitted
+
+_SECTION_RE = re.compile(r"^\s*\[([A-Za-z]+)\]\s*$")
+_KEY_RE = re.compile(r"^\s*([A-Za-z0-9]+)\s*=\s*(.*?)\s*$")
+
+
+class VpnConfig:
+    """
+    head:  lines up to the first non-[Interface] section (interface + comments)
+    peers: {public_key: [lines]} in file order; blocks without a PublicKey
+           (or unknown sections) are kept under a synthetic "#n" key.
+    """
+
+    __slots__ = ("head", "peers")
+
+    def __init__(self, head: list, peers: dict):
+        self.head = head
+        self.peers = peers
+
+    @classmethod
+    def parse(cls, text: str) -> "VpnConfig":
+        head, peers = [], {}
+        block = None
+
+        def close(lines):
+            while lines and not lines[-1].strip():
+                lines.pop()
+            if not lines:
+                return
+            key = None
+            for line in lines:
+                m = _KEY_RE.match(line)
+                if m and m.group(1) == "PublicKey":
+                    key = m.group(2)
+                    break
+            if key is None or key in peers:
+                key = f"#{len(peers)}"
+            peers[key] = lines
+
+        for line in text.splitlines():
+            m = _SECTION_RE.match(line)
+            if m and m.group(1) != "Interface":
+                if block is not None:
+                    close(block)
+                block = [line]
+            elif block is not None:
+                block.append(line)
+            else:
+                head.append(line)
+        if block is not None:
+            close(block)
+        while head and not head[-1].strip():
+            head.pop()
+        return cls(head, peers)
+
+    def render(self) -> str:
+        parts = ["\n".join(self.head)] if self.head else []
+        parts += ["\n".join(lines) for lines in self.peers.values()]
+        return "\n\n".join(parts) + "\n"
+
+    def interface_values(self) -> dict:
+        values = {}
+        for line in self.head:
+            m = _KEY_RE.match(line)
+            if m:
+                values[m.group(1)] = m.group(2)
+        return values
+
+    def public_keys(self) -> list:
+        return [k for k in self.peers if not k.startswith("#")]
+
+
+class ConfigStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._model: VpnConfig | None = None
+        self._file_id = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+
+    def _stat_id(self):
+        """(inode, size, mtime_ns), or None when the file cannot be stat'ed."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _read_text(self) -> str:
+        try:
+            with timed("vpn_config.read"), open(self.path) as f:
+                return f.read()
+        except PermissionError:
+            with timed("vpn_config.read_sudo"):
+                return subprocess.check_output(
+                    ["sudo", "cat", self.path], text=True, stderr=subprocess.DEVNULL, timeout=10,
+                )
+
+    def _load(self, force: bool = False) -> VpnConfig:
+        """
+        Returns the cached model, re-parsing if the file changed. Caller holds
+        the lock. Read errors propagate so a mutation never starts from an
+        empty model.
+        """
+        file_id = self._stat_id()
+        fresh = (
+            self._model is not None and not force
+            and (file_id == self._file_id if file_id is not None
+                 else time.time() - self._loaded_at < REVALIDATE_SECONDS)
+        )
+        if fresh:
+            return self._model
+        try:
+            text = self._read_text()
+        except FileNotFoundError:
+            text = ""
+        self._model = VpnConfig.parse(text)
+        self._file_id = file_id
+        self._loaded_at = time.time()
+        self.reads += 1
+        return self._model
+
+    def _write(self, text: str) -> None:
+        with timed("vpn_config.write"):
+            self._write_file(text)
+        self.writes += 1
+
+    def _write_file(self, text: str) -> None:
+        directory = os.path.dirname(self.path) or "."
+        if os.access(directory, os.W_OK) and (
+            not os.path.exists(self.path) or os.access(self.path, os.W_OK)
+        ):
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+        else:
+            # Root-owned config: the helper does the same temp + rename as root.
+            subprocess.run(
+                ["sudo", HELPER, "vpn-config-write", self.path],
+                input=text, capture_output=True, text=True, timeout=20, check=True,
+            )
+
+    def get(self) -> VpnConfig | None:
+        """Current model (treat as read-only), or None if the file is unreadable."""
+        with self._lock:
+            try:
+                return self._load()
+            except (OSError, subprocess.SubprocessError):
+                return None
+
+    def apply(self, add=(), remove=()) -> dict:
+        """
+        Adds [(public_key, allowed_ips)] and removes [public_key] in one write.
+        Returns {"added": [...], "removed": [...], "missing": [...]}.
+        """
+        with self._lock:
+            # Without a usable mtime, never mutate a possibly stale model.
+            current = self._load(force=self._stat_id() is None)
+            peers = dict(current.peers)
+            removed, missing = [], []
+            for public_key in remove:
+                if peers.pop(public_key, None) is None:
+                    missing.append(public_key)
+                else:
+                    removed.append(public_key)
+            added = []
+            for public_key, allowed_ips in add:
+                peers[public_key] = [
+                    "[Peer]",
+                    f"PublicKey = {public_key}",
+                    f"AllowedIPs = {allowed_ips}",
+                ]
+                added.append(public_key)
+
+            if added or removed:
+                model = VpnConfig(current.head, peers)
+                self._write(model.render())
+                self._model = model
+                self._file_id = self._stat_id()
+                self._loaded_at = time.time()
+            return {"added": added, "removed": removed, "missing": missing}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "peers": len(self._model.public_keys()) if self._model else None,
+                "reads": self.reads,
+                "writes": self.writes,
+            }
@@ -0,0 +1,169 @@
+# control-plane/app/services/wg_keys.py
+# In-process Curve25519 keypairs, byte-for-byte what `wg genkey | wg pubkey`
+# produces: 32 random bytes clamped per RFC 7748, public key = X25519(k, 9),
+# both base64-encoded. Uses `cryptography` when installed (constant-time),
+# otherwise a pure-Python Montgomery ladder. A small pool is refilled by a
+# background thread so provisioning never waits on crypto or a fork.
+
+import base64
+import os
+import threading
+from collections import deque
+from typing import Callable
+
+try:
+    from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+except ImportError:
+    X25519PrivateKey = None
+
+_P   = 2 ** 255 - 19
+_A24 = 121665
+_BASE_POINT = (9).to_bytes(32, "little")
+
+# RFC 7748 §6.1 test vectors (private scalar, public key). `wg pubkey` is the
+# same X25519 base-point multiplication, so these double as wg vectors.
+KNOWN_ANSWERS = (
+    ("77076d0a7318a57d3c16c17251b26645df4c2f87ebc0992ab177fba51db92c2a",
+     "8520f0098930a754748b7ddcb43ef75a0dbf3a0d26381af4eba4a98eaa9b4e6a"),
+    ("5dab087e624a8a4b79e17f8b83800ee66f3bb1292618b6fd1c2f8b27ff88e0eb",
+     "de9edb7d7b7dc1b4d35b61c2ece435373f8343c85b78674dadfc7e146f882b4f"),
+)
+
+
+def clamp(key: bytes) -> bytes:
+    k = bytearray(key)
+    k[0] &= 248
+    k[31] &= 127
+    k[31] |= 64
+    return bytes(k)
+
+
+def _x25519(scalar: bytes, u: bytes) -> bytes:
+    """RFC 7748 §5 Montgomery ladder (not constant-time)."""
+    k = int.from_bytes(clamp(scalar), "little")
+    x1 = int.from_bytes(u, "little") & ((1 << 255) - 1)
+    x2, z2, x3, z3 = 1, 0, x1, 1
+    swap = 0
+    for t in range(254, -1, -1):
+        bit = (k >> t) & 1
+        swap ^= bit
+        if swap:
+            x2, x3, z2, z3 = x3, x2, z3, z2
+        swap = bit
+
+        a  = x2 + z2
+        aa = a * a % _P
+        b  = x2 - z2
+        bb = b * b % _P
+        e  = aa - bb
+        c  = x3 + z3
+        d  = x3 - z3
+        da = d * a % _P
+        cb = c * b % _P
+        x3 = (da + cb) ** 2 % _P
+        z3 = x1 * (da - cb) ** 2 % _P
+        x2 = aa * bb % _P
+        z2 = e * (aa + _A24 * e) % _P
+    if swap:
+        x2, z2 = x3, z3
+    return (x2 * pow(z2, _P - 2, _P) % _P).to_bytes(32, "little")
+
+
+def _public_bytes(private: bytes) -> bytes:
+    if X25519PrivateKey is not None:
+        return X25519PrivateKey.from_private_bytes(private).public_key().public_bytes(
+            Encoding.Raw, PublicFormat.Raw
+        )
+    return _x25519(private, _BASE_POINT)
+
+
+def public_key(private_key: str) -> str:
+    """`wg pubkey` equivalent for a base64 private key."""
+    raw = base64.b64decode(private_key)
+    if len(raw) != 32:
+        raise ValueError("private key must be 32 bytes")
+    return base64.b64encode(_public_bytes(clamp(raw))).decode()
+
+
+def generate_keypair() -> tuple:
+    """`wg genkey | wg pubkey` equivalent: returns (private_b64, public_b64)."""
+    private = clamp(os.urandom(32))
+    return (
+        base64.b64encode(private).decode(),
+        base64.b64encode(_public_bytes(private)).decode(),
+    )
+
+
+def self_check() -> bool:
+    """Verifies the active backend against the known-answer vectors."""
+    try:
+        for private_hex, public_hex in KNOWN_ANSWERS:
+            private = base64.b64encode(bytes.fromhex(private_hex)).decode()
+            if base64.b64decode(public_key(private)).hex() != public_hex:
+                return False
+    except Exception:
+        return False
+    return True
+
+
+class KeyPool:
+    """
+    Pre-generated keypairs. take()/take_many() pop from the pool and fall back
+    to generating inline when it runs dry; a daemon thread tops it back up to
+    `size` once it drops below half.
+    """
+
+    def __init__(self, size: int, generate: Callable[[], tuple] = generate_keypair):
+        self.size = size
+        self.generate = generate
+        self._keys: deque = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.generated = 0
+        self.served_inline = 0
+
+    def _fill(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while len(self._keys) < self.size:
+                pair = self.generate()
+                with self._lock:
+                    self._keys.append(pair)
+                    self.generated += 1
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._fill, name="aegis-keypool", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def take_many(self, count: int) -> list:
+        with self._lock:
+            n = min(count, len(self._keys))
+            pairs = [self._keys.popleft() for _ in range(n)]
+            low = len(self._keys) < self.size // 2
+        missing = count - len(pairs)
+        if missing:
+            pairs += [self.generate() for _ in range(missing)]
+            with self._lock:
+                self.served_inline += missing
+        if low:
+            self.start()
+        return pairs
+
+    def take(self) -> tuple:
+        return self.take_many(1)[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "available": len(self._keys),
+                "size": self.size,
+                "generated": self.generated,
+                "served_inline": self.served_inline,
+                "backend": "cryptography" if X25519PrivateKey is not None else "python",
+            }
@@ -0,0 +1,260 @@
+# control-plane/app/services/wg_netlink.py
+# In-process WireGuard / AmneziaWG peer reader over generic netlink.
+# Issues WG_CMD_GET_DEVICE directly instead of forking `sudo wg show all dump`,
+# for every interface of the family, so it returns the same interfaces and
+# peers as the CLI reader.
+# Requires CAP_NET_ADMIN on the API process; callers fall back to the CLI path
+# when the family is missing or the kernel refuses the request.
+
+import base64
+import errno
+import ipaddress
+import os
+import socket
+import struct
+
+from app.services.peer_records import InterfaceRecord, PeerRecord
+
+NETLINK_GENERIC = 16
+
+NLM_F_REQUEST = 0x01
+NLM_F_ACK     = 0x04
+NLM_F_DUMP    = 0x300
+
+NLMSG_ERROR = 2
+NLMSG_DONE  = 3
+
+NLA_F_NESTED   = 0x8000
+NLA_TYPE_MASK  = 0x3FFF
+
+GENL_ID_CTRL          = 0x10
+CTRL_CMD_GETFAMILY    = 3
+CTRL_ATTR_FAMILY_ID   = 1
+CTRL_ATTR_FAMILY_NAME = 2
+
+WG_CMD_GET_DEVICE = 0
+WG_GENL_VERSION   = 1
+
+WGDEVICE_A_IFNAME       = 2
+WGDEVICE_A_PUBLIC_KEY   = 4
+WGDEVICE_A_LISTEN_PORT  = 6
+WGDEVICE_A_FWMARK       = 7
+WGDEVICE_A_PEERS        = 8
+
+WGPEER_A_PUBLIC_KEY                    = 1
+WGPEER_A_PRESHARED_KEY                 = 2
+WGPEER_A_ENDPOINT                      = 4
+WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL = 5
+WGPEER_A_LAST_HANDSHAKE_TIME           = 6
+WGPEER_A_RX_BYTES                      = 7
+WGPEER_A_TX_BYTES                      = 8
+WGPEER_A_ALLOWEDIPS                    = 9
+
+WGALLOWEDIP_A_FAMILY    = 1
+WGALLOWEDIP_A_IPADDR    = 2
+WGALLOWEDIP_A_CIDR_MASK = 3
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_GENLHDR  = struct.Struct("=BBH")
+_NLATTR   = struct.Struct("=HH")
+
+_RECV_BUFSIZE = 1 << 20
+
+
+class NetlinkUnavailable(RuntimeError):
+    """Raised when the generic netlink family cannot be used at all."""
+
+
+def _align(n: int) -> int:
+    return (n + 3) & ~3
+
+
+def _attr(attr_type: int, payload: bytes) -> bytes:
+    length = _NLATTR.size + len(payload)
+    return _NLATTR.pack(length, attr_type) + payload + b"\0" * (_align(length) - length)
+
+
+def _iter_attrs(data: bytes, offset: int = 0, end: int = None):
+    end = len(data) if end is None else end
+    while offset + _NLATTR.size <= end:
+        length, attr_type = _NLATTR.unpack_from(data, offset)
+        if length < _NLATTR.size:
+            break
+        yield attr_type & NLA_TYPE_MASK, data[offset + _NLATTR.size:offset + length]
+        offset += _align(length)
+
+
+def _decode_endpoint(raw: bytes) -> str:
+    if len(raw) < 4:
+        return "(none)"
+    family = struct.unpack_from("=H", raw, 0)[0]
+    port = struct.unpack_from("!H", raw, 2)[0]
+    if family == socket.AF_INET and len(raw) >= 8:
+        return f"{ipaddress.IPv4Address(raw[4:8])}:{port}"
+    if family == socket.AF_INET6 and len(raw) >= 24:
+        return f"[{ipaddress.IPv6Address(raw[8:24])}]:{port}"
+    return "(none)"
+
+
+def _decode_allowed_ip(raw: bytes) -> str | None:
+    family, addr, cidr = None, None, None
+    for t, v in _iter_attrs(raw):
+        if t == WGALLOWEDIP_A_FAMILY:
+            family = struct.unpack("=H", v[:2])[0]
+        elif t == WGALLOWEDIP_A_IPADDR:
+            addr = v
+        elif t == WGALLOWEDIP_A_CIDR_MASK:
+            cidr = v[0]
+    if addr is None or cidr is None:
+        return None
+    if family == socket.AF_INET6:
+        return f"{ipaddress.IPv6Address(addr[:16])}/{cidr}"
+    return f"{ipaddress.IPv4Address(addr[:4])}/{cidr}"
+
+
+class _Socket:
+    def __init__(self):
+        try:
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        except (AttributeError, OSError) as e:
+            raise NetlinkUnavailable(f"netlink socket unavailable: {e}")
+        self.sock.bind((0, 0))
+        self.seq = 0
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, family_id: int, cmd: int, version: int, flags: int, attrs: bytes):
+        """Sends one request and yields the genl payload of every reply message."""
+        self.seq += 1
+        payload = _GENLHDR.pack(cmd, version, 0) + attrs
+        header = _NLMSGHDR.pack(_NLMSGHDR.size + len(payload), family_id, flags, self.seq, 0)
+        self.sock.send(header + payload)
+
+        while True:
+            data = self.sock.recv(_RECV_BUFSIZE)
+            offset = 0
+            while offset + _NLMSGHDR.size <= len(data):
+                length, msg_type, _, seq, _ = _NLMSGHDR.unpack_from(data, offset)
+                if length < _NLMSGHDR.size:
+                    return
+                body = data[offset + _NLMSGHDR.size:offset + length]
+                offset += _align(length)
+                if seq != self.seq:
+                    continue
+                if msg_type == NLMSG_DONE:
+                    return
+                if msg_type == NLMSG_ERROR:
+                    errno = -struct.unpack_from("=i", body, 0)[0]
+                    if errno == 0:
+                        return
+                    raise OSError(errno, os.strerror(errno))
+                yield body[_GENLHDR.size:]
+            if not flags & NLM_F_DUMP:
+                return
+
+
+def _resolve_family(nl: _Socket, name: str) -> int:
+    attrs = _attr(CTRL_ATTR_FAMILY_NAME, name.encode() + b"\0")
+    try:
+        for body in nl.request(GENL_ID_CTRL, CTRL_CMD_GETFAMILY, 1, NLM_F_REQUEST | NLM_F_ACK, attrs):
+            for t, v in _iter_attrs(body):
+                if t == CTRL_ATTR_FAMILY_ID:
+                    return struct.unpack("=H", v[:2])[0]
+    except OSError as e:
+        raise NetlinkUnavailable(f"genl family {name!r} not registered: {e}")
+    raise NetlinkUnavailable(f"genl family {name!r} not registered")
+
+
+def _merge_peer(peers: dict, order: list, raw: bytes) -> None:
+    fields = {}
+    allowed = []
+    for t, v in _iter_attrs(raw):
+        if t == WGPEER_A_PUBLIC_KEY:
+            fields["public_key"] = base64.b64encode(v).decode()
+        elif t == WGPEER_A_PRESHARED_KEY:
+            fields["has_preshared_key"] = any(v)
+        elif t == WGPEER_A_ENDPOINT:
+            fields["endpoint"] = _decode_endpoint(v)
+        elif t == WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL:
+            interval = struct.unpack("=H", v[:2])[0]
+            fields["persistent_keepalive"] = interval or None
+        elif t == WGPEER_A_LAST_HANDSHAKE_TIME:
+            fields["latest_handshake"] = struct.unpack("=q", v[:8])[0]
+        elif t == WGPEER_A_RX_BYTES:
+            fields["rx_bytes"] = struct.unpack("=Q", v[:8])[0]
+        elif t == WGPEER_A_TX_BYTES:
+            fields["tx_bytes"] = struct.unpack("=Q", v[:8])[0]
+        elif t == WGPEER_A_ALLOWEDIPS:
+            for _, entry in _iter_attrs(v):
+                cidr = _decode_allowed_ip(entry)
+                if cidr:
+                    allowed.append(cidr)
+
+    key = fields.get("public_key")
+    if not key:
+        return
+
+    # Large peers are split across dump messages; continuation parts repeat
+    # the public key and carry only the remaining allowed IPs.
+    record = peers.get(key)
+    if record is None:
+        record = {"allowed_ips": []}
+        peers[key] = record
+        order.append(key)
+    record.update({k: v for k, v in fields.items() if k != "public_key"})
+    record["allowed_ips"].extend(allowed)
+
+
+def _read_device(nl: _Socket, family_id: int, interface: str) -> tuple:
+    iface = InterfaceRecord(interface)
+    attrs = _attr(WGDEVICE_A_IFNAME, interface.encode() + b"\0")
+    peers, order = {}, []
+    for body in nl.request(family_id, WG_CMD_GET_DEVICE, WG_GENL_VERSION,
+                           NLM_F_REQUEST | NLM_F_ACK | NLM_F_DUMP, attrs):
+        for t, v in _iter_attrs(body):
+            if t == WGDEVICE_A_PUBLIC_KEY:
+                iface.public_key = base64.b64encode(v).decode()
+            elif t == WGDEVICE_A_LISTEN_PORT:
+                iface.listen_port = struct.unpack("=H", v[:2])[0]
+            elif t == WGDEVICE_A_FWMARK:
+                mark = struct.unpack("=I", v[:4])[0]
+                iface.fwmark = hex(mark) if mark else "off"
+            elif t == WGDEVICE_A_PEERS:
+                for _, peer_raw in _iter_attrs(v):
+                    _merge_peer(peers, order, peer_raw)
+
+    records = []
+    for key in order:
+        fields = peers[key]
+        fields["allowed_ips"] = ",".join(fields["allowed_ips"]) or "(none)"
+        records.append(PeerRecord(interface, key, **fields))
+    return iface, records
+
+
+def read_devices(family: str) -> tuple:
+    """
+    Returns ([InterfaceRecord], [PeerRecord]) for every interface of the
+    family, like `wg show all dump`. Other links answer EOPNOTSUPP (or ENODEV
+    if they vanished meanwhile) and are skipped. allowed_ips is joined with
+    "," (or "(none)") to match the dump.
+    """
+    interfaces, records = [], []
+    with _Socket() as nl:
+        family_id = _resolve_family(nl, family)
+        for _, name in sorted(socket.if_nameindex(), key=lambda item: item[1]):
+            try:
+                iface, peers = _read_device(nl, family_id, name)
+            except OSError as e:
+                if e.errno in (errno.EOPNOTSUPP, errno.ENODEV):
+                    continue
+                raise
+            interfaces.append(iface)
+            records += peers
+    return interfaces, records
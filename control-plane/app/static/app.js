@@ -10,11 +10,23 @@ const API = {
     };
   },
 
+  // path -> { etag, body } for endpoints that send an ETag. The browser cache
+  // is bypassed so a 304 reaches us and the last body is reused as-is.
+  etags: new Map(),
+
   async get(path) {
-    const res = await fetch(path, { headers: this.headers() });
+    const headers = this.headers();
+    const cached = this.etags.get(path);
+    if (cached) headers["If-None-Match"] = cached.etag;
+    const res = await fetch(path, { headers, cache: "no-store" });
     if (res.status === 401 || res.status === 403) { logout(); throw new Error("unauthorized"); }
+    if (res.status === 304 && cached) return cached.body;
     if (!res.ok) throw await apiError(res);
-    return res.json();
+    const body = await res.json();
+    const etag = res.headers.get("ETag");
+    if (etag) this.etags.set(path, { etag, body });
+    else this.etags.delete(path);
+    return body;
   },
 
   async post(path, body) {
@@ -81,8 +93,11 @@ loginForm.addEventListener("submit", async (e) => {
 document.getElementById("logout-btn").addEventListener("click", logout);
 
 function logout() {
+  stopPerformanceStream();
   sessionStorage.removeItem("aegis_token");
   API.token = null;
+  API.etags.clear();
+  resetPeerState();
   appEl.classList.add("hidden");
   loginScreen.classList.remove("hidden");
   tokenInput.value = "";
@@ -207,84 +222,175 @@ function renderTransportBadge(d) {
 
 // ── Peers ─────────────────────────────────────────────────
 
+// Peer table state for delta sync (`/api/peers?since=<cursor>`): peers and
+// their row elements keyed by public key, in server order.
+const peerState = { cursor: null, peers: new Map(), rows: new Map(), clockSkew: 0 };
+
+function resetPeerState() {
+  peerState.cursor = null;
+  peerState.peers = new Map();
+  peerState.rows = new Map();
+}
+
 async function loadPeers() {
   const list = document.getElementById("peers-list");
-  list.innerHTML = `<p class="empty-state">loading…</p>`;
+  const delta = peerState.cursor !== null;
+  if (!delta) list.innerHTML = `<p class="empty-state">loading…</p>`;
 
   try {
-    const data = await API.get("/api/peers");
-    renderPeers(data.peers ?? []);
+    const data = await API.get(delta ? `/api/peers?since=${encodeURIComponent(peerState.cursor)}` : "/api/peers");
+    peerState.cursor = data.cursor ?? null;
+    if (data.now) peerState.clockSkew = data.now - Math.floor(Date.now() / 1000);
+    if (delta && data.full === false) {
+      applyPeerDelta(data.peers ?? [], data.removed ?? []);
+    } else {
+      peerState.peers = new Map((data.peers ?? []).map((p) => [p.public_key, p]));
+      renderPeers();
+    }
   } catch (e) {
+    resetPeerState();
     if (e.message !== "unauthorized") {
       list.innerHTML = `<p class="empty-state" style="color:var(--red)">failed to load peers</p>`;
     }
   }
 }
 
-function renderPeers(peers) {
+// 7 days without a handshake.
+const PEER_STALE_SECONDS = 604800;
+const PEER_STALE_BADGE = '<span class="badge badge-stale" title="No handshake in 7+ days">⚠ stale</span>';
+
+function _handshakeAgeSeconds(p) {
+  // Against the current (server-corrected) time rather than the age the
+  // server sent, so rows that a delta did not touch stay accurate.
+  if (!p.last_handshake_epoch) return null;
+  return Math.max(0, Math.floor(Date.now() / 1000) + peerState.clockSkew - p.last_handshake_epoch);
+}
+
+function _isStale(p) {
+  // Consider stale if no handshake occurred (null).
+  const seconds = _handshakeAgeSeconds(p);
+  return !p.is_active && (seconds === null || seconds > PEER_STALE_SECONDS);
+}
+
+function _handshakeAgeHuman(p) {
+  // Same format as the API's handshake_age_human.
+  const seconds = _handshakeAgeSeconds(p);
+  if (seconds === null) return "never";
+  if (seconds < 60) return `${seconds}s`;
+  if (seconds < 3600) return `${Math.floor(seconds / 60)}m`;
+  return `${Math.floor(seconds / 3600)}h`;
+}
+
+function peerRowHtml(p) {
+  const shortKey = p.public_key.slice(0, 20) + "…";
+  const age      = _handshakeAgeHuman(p);
+  const badge    = p.is_active
+    ? `<span class="badge badge-active">● active</span>`
+    : `<span class="badge badge-idle">○ idle</span>`;
+  const label    = p.label || "";
+  const isAdmin   = p.is_admin || false;
+  const createdAt = p.created_at
+    ? new Date(p.created_at * 1000).toLocaleString([], {
+        month: "short", day: "numeric",
+        hour: "2-digit", minute: "2-digit",
+      })
+    : null;
+
+  const adminBadge = isAdmin
+    ? '<span class="peer-admin-badge">admin</span>'
+    : '';
+  const staleBadge = _isStale(p) ? PEER_STALE_BADGE : '';
+  const labelHtml   = label
+    ? '<span class="peer-label-display">' + label + '</span>'
+    : '';
+  const createdHtml = createdAt
+    ? '<span class="peer-created">created ' + createdAt + '</span>'
+    : '';
+
+  return `
+    <div class="peer-row${isAdmin ? ' admin-row' : ''}">
+      <div class="peer-key-wrap">
+        <div class="peer-key-line">
+          <span class="peer-key" title="${p.public_key}">${shortKey}</span>
+          ${adminBadge}
+        </div>
+        ${labelHtml}${createdHtml}
+      </div>
+      <span class="peer-ip mono">${p.allowed_ips}</span>
+      <span class="peer-age">${age} ago</span>
+      ${badge} ${staleBadge}
+      <div class="peer-actions">
+        <button class="btn btn-ghost btn-small label-edit-btn" data-key="${p.public_key}" data-label="${label}" title="edit label">✎</button>
+        <button class="btn btn-danger remove-btn" data-key="${p.public_key}">remove</button>
+      </div>
+    </div>`;
+}
+
+function bindPeerRow(row) {
+  const removeBtn = row.querySelector(".remove-btn");
+  const labelBtn  = row.querySelector(".label-edit-btn");
+  removeBtn.addEventListener("click", () => removePeer(removeBtn.dataset.key));
+  labelBtn.addEventListener("click", () => openLabelEdit(labelBtn));
+}
+
+function renderPeers() {
   const list = document.getElementById("peers-list");
+  const peers = [...peerState.peers.values()];
+  peerState.rows = new Map();
 
   if (!peers.length) {
     list.innerHTML = `<p class="empty-state">no peers configured</p>`;
     return;
   }
 
-  list.innerHTML = peers.map((p) => {
-    const shortKey = p.public_key.slice(0, 20) + "…";
-    const age      = p.handshake_age_human ?? "never";
-    const badge    = p.is_active
-      ? `<span class="badge badge-active">● active</span>`
-      : `<span class="badge badge-idle">○ idle</span>`;
-    const label    = p.label || "";
-    const isAdmin   = p.is_admin || false;
-    const ageSec    = p.handshake_age_seconds;
-    // 7 days = 604800s. Consider stale if no handshake occurred (null).
-    const isStale   = ageSec === null || ageSec === undefined || ageSec > 604800;
-    const createdAt = p.created_at
-      ? new Date(p.created_at * 1000).toLocaleString([], {
-          month: "short", day: "numeric",
-          hour: "2-digit", minute: "2-digit",
-        })
-      : null;
-
-    const adminBadge = isAdmin
-      ? '<span class="peer-admin-badge">admin</span>'
-      : '';
-    const staleBadge = isStale && !p.is_active
-      ? '<span class="badge badge-stale" title="No handshake in 7+ days">⚠ stale</span>'
-      : '';
-    const labelHtml   = label
-      ? '<span class="peer-label-display">' + label + '</span>'
-      : '';
-    const createdHtml = createdAt
-      ? '<span class="peer-created">created ' + createdAt + '</span>'
-      : '';
+  list.innerHTML = peers.map(peerRowHtml).join("");
+  [...list.children].forEach((row, i) => {
+    peerState.rows.set(peers[i].public_key, row);
+    bindPeerRow(row);
+  });
+}
 
-    return `
-      <div class="peer-row${isAdmin ? ' admin-row' : ''}">
-        <div class="peer-key-wrap">
-          <div class="peer-key-line">
-            <span class="peer-key" title="${p.public_key}">${shortKey}</span>
-            ${adminBadge}
-          </div>
-          ${labelHtml}${createdHtml}
-        </div>
-        <span class="peer-ip mono">${p.allowed_ips}</span>
-        <span class="peer-age">${age} ago</span>
-        ${badge} ${staleBadge}
-        <div class="peer-actions">
-          <button class="btn btn-ghost btn-small label-edit-btn" data-key="${p.public_key}" data-label="${label}" title="edit label">✎</button>
-          <button class="btn btn-danger remove-btn" data-key="${p.public_key}">remove</button>
-        </div>
-      </div>`;
-  }).join("");
+function applyPeerDelta(changed, removed) {
+  const list = document.getElementById("peers-list");
+  if (!peerState.rows.size && changed.length) list.innerHTML = "";
 
-  list.querySelectorAll(".remove-btn").forEach((btn) => {
-    btn.addEventListener("click", () => removePeer(btn.dataset.key));
-  });
-  list.querySelectorAll(".label-edit-btn").forEach((btn) => {
-    btn.addEventListener("click", () => openLabelEdit(btn));
-  });
+  for (const key of removed) {
+    peerState.peers.delete(key);
+    peerState.rows.get(key)?.remove();
+    peerState.rows.delete(key);
+  }
+
+  const tpl = document.createElement("template");
+  for (const p of changed) {
+    tpl.innerHTML = peerRowHtml(p).trim();
+    const row = tpl.content.firstElementChild;
+    bindPeerRow(row);
+    const existing = peerState.rows.get(p.public_key);
+    if (existing) existing.replaceWith(row);
+    else list.appendChild(row);
+    peerState.peers.set(p.public_key, p);
+    peerState.rows.set(p.public_key, row);
+  }
+
+  if (!peerState.peers.size) {
+    list.innerHTML = `<p class="empty-state">no peers configured</p>`;
+    return;
+  }
+
+  // Untouched rows only need their handshake age moved forward, and the
+  // stale badge once an idle peer crosses 7 days.
+  for (const [key, row] of peerState.rows) {
+    const p = peerState.peers.get(key);
+    const ageEl = row.querySelector(".peer-age");
+    const text = `${_handshakeAgeHuman(p)} ago`;
+    if (ageEl.textContent !== text) ageEl.textContent = text;
+    const staleEl = row.querySelector(".badge-stale");
+    if (_isStale(p) && !staleEl) {
+      row.querySelector(".badge-active, .badge-idle").insertAdjacentHTML("afterend", " " + PEER_STALE_BADGE);
+    } else if (!_isStale(p) && staleEl) {
+      staleEl.remove();
+    }
+  }
 }
 
 function openLabelEdit(btn) {
@@ -488,7 +594,7 @@ async function loadMonitor() {
       API.get("/api/monitor/services"),
       API.get("/api/monitor/traffic"),
       API.get("/api/monitor/ssh"),
-      API.get("/api/monitor/ssh/timeline?tz_offset=" + (-new Date().getTimezoneOffset())),
+      API.get("/api/monitor/ssh/timeline?tz_offset=" + (-new Date().getTimezoneOffset()) + "&days=" + timelineDays()),
       API.get("/api/monitor/fail2ban"),
     ]);
     renderSystem(sys);
@@ -572,11 +678,17 @@ function renderServices(services) {
     el.innerHTML = `<p class="empty-state">no data</p>`;
     return;
   }
+  const now = Date.now() / 1000;
   el.innerHTML = services.map((s) => {
     const dotCls   = `svc-dot svc-${s.status}`;
     const badgeCls = `svc-badge svc-badge-${s.status}`;
+    const details  = [
+      s.sub_state && s.sub_state !== "unknown" ? s.sub_state : "",
+      s.since ? `since ${_formatAgeBrief(Math.max(0, Math.round(now - s.since)))}` : "",
+      s.restarts ? `${s.restarts} restart${s.restarts === 1 ? "" : "s"}` : "",
+    ].filter(Boolean).join(" · ");
     return `
-      <div class="service-row">
+      <div class="service-row"${details ? ` title="${details}"` : ""}>
         <span class="${dotCls}"></span>
         <span class="svc-label">${s.label}</span>
         <span class="${badgeCls}">${s.status}</span>
@@ -610,8 +722,23 @@ function renderTraffic(peers) {
     </table>`;
 }
 
+function timelineDays() {
+  return document.getElementById("mon-timeline-days").value || "7";
+}
+
+async function loadTimeline() {
+  try {
+    const d = await API.get("/api/monitor/ssh/timeline?tz_offset=" + (-new Date().getTimezoneOffset()) + "&days=" + timelineDays());
+    renderTimeline(d.timeline ?? []);
+  } catch (e) {
+    if (e.message !== "unauthorized") console.error("timeline error", e);
+  }
+}
+
 function renderTimeline(data) {
   const wrap = document.getElementById("mon-timeline").parentElement;
+  const dense = data.length > 7;
+  document.getElementById("mon-timeline-days-label").textContent = String(data.length || timelineDays());
 
   let detailEl = document.getElementById("mon-timeline-detail");
   if (!detailEl) {
@@ -622,6 +749,7 @@ function renderTimeline(data) {
   }
 
   const el = document.getElementById("mon-timeline");
+  el.classList.toggle("dense", dense);
   if (!data.length) { el.innerHTML = '<p class="empty-state">no data</p>'; return; }
 
   const maxCount = Math.max(...data.map((d) => d.count), 1);
@@ -630,8 +758,10 @@ function renderTimeline(data) {
   el.innerHTML = data.map((d, idx) => {
     const isEmpty   = d.count === 0;
     const todayCls  = d.date === todayStr ? "today" : "";
+    const tickCls   = dense && (data.length - 1 - idx) % 7 === 0 ? " tick" : "";
     const trackCls  = "timeline-track" + (isEmpty ? " empty" : "");
     const countStr  = d.count > 0 ? String(d.count) : "";
+    const failedTip = d.failed ? ' title="' + d.failed + ' failed attempt(s)"' : "";
 
     // Calculate dots (00:00 = 0% left, 23:59 = 100% right)
     const clusters  = _clusterLogins(d.logins || []);
@@ -645,14 +775,14 @@ function renderTimeline(data) {
     }).join("");
 
     return [
-      '<div class="timeline-col" data-idx="' + idx + '">',
+      '<div class="timeline-col" data-idx="' + idx + '"' + failedTip + '>',
         '<span class="timeline-count">' + countStr + '</span>',
         '<div class="timeline-track-wrap">',
           '<div class="' + trackCls + '">',
             dotsHtml,
           '</div>',
         '</div>',
-        '<span class="timeline-date ' + todayCls + '">' + d.date + '</span>',
+        '<span class="timeline-date ' + todayCls + tickCls + '">' + d.date + '</span>',
       '</div>',
     ].join("");
   }).join("");
@@ -786,6 +916,7 @@ function renderFail2ban(data) {
 }
 
 document.getElementById("monitor-refresh-btn").addEventListener("click", loadMonitor);
+document.getElementById("mon-timeline-days").addEventListener("change", loadTimeline);
 
 // 30s auto-refresh - only when monitor tab is open
 function startMonitorAutoRefresh() {
@@ -809,6 +940,7 @@ document.querySelectorAll(".nav-item").forEach((btn) => {
     _monitorInterval = null;
     clearInterval(_performanceInterval);
     _performanceInterval = null;
+    stopPerformanceStream();
 
     if (btn.dataset.tab === "monitor") {
       startMonitorAutoRefresh();
@@ -824,6 +956,7 @@ let _perfRxBytes = 0;
 let _perfTxBytes = 0;
 let _perfTimestamp = 0;
 let _performanceInterval = null;
+let _performanceStream = null;
 let _dnsPrivacyLastLoad = 0;
 let _dnsPrivacyBusy = false;
 let _operationsLastLoad = 0;
@@ -846,81 +979,92 @@ function setPerfIndicator(id, txt, cls) {
 async function loadPerformance() {
   try {
     const d = await API.get("/api/monitor/performance");
-    
-    // Active users: Green if > 0, else Neutral
-    const uCls = d.active_peers > 0 ? "perf-good" : "perf-neutral";
-    setPerfIndicator("perf-users-val", `${d.active_peers} / ${d.total_peers}`, uCls);
-    
-    // Load average (1m): compared to cores
-    let lCls = "perf-good";
-    if (d.load_1m >= d.cpu_cores) lCls = "perf-fail";
-    else if (d.load_1m >= d.cpu_cores * 0.7) lCls = "perf-warn";
-    setPerfIndicator("perf-load-val", `${d.load_1m} / ${d.load_5m} / ${d.load_15m}`, lCls);
-    
-    // Ping: < 50ms=Good, < 150ms=Warn, > 150ms=Fail
-    let pCls = "perf-neutral";
-    let pTxt = "—";
-    if (d.ping_ms) {
-      if (d.ping_ms < 50) pCls = "perf-good";
-      else if (d.ping_ms < 150) pCls = "perf-warn";
-      else pCls = "perf-fail";
-      pTxt = `${d.ping_ms} ms`;
-    }
-    setPerfIndicator("perf-ping-val", pTxt, pCls);
-    
-    // Drops: 0=Good, > 0=Fail
-    const dDrop = d.wg_rx_dropped + d.wg_tx_dropped;
-    const dCls = dDrop === 0 ? "perf-good" : "perf-warn";
-    setPerfIndicator("perf-drops-val", `${d.wg_rx_dropped} / ${d.wg_tx_dropped}`, dCls);
-
-    
-    // Bandwidth Mbps Calculation
-    if (_perfTimestamp > 0) {
-      const timeDiff = d.timestamp - _perfTimestamp;
-      if (timeDiff > 0) {
-        const rxDiff = Math.max(0, d.wg_rx_bytes - _perfRxBytes);
-        const txDiff = Math.max(0, d.wg_tx_bytes - _perfTxBytes);
-        
-        // (bytes * 8) / 1000000 = Mbps
-        const rxMbps = ((rxDiff * 8) / 1_000_000 / timeDiff).toFixed(2);
-        const txMbps = ((txDiff * 8) / 1_000_000 / timeDiff).toFixed(2);
-        
-        document.getElementById("perf-rx-speed").textContent = `${rxMbps} Mbps`;
-        document.getElementById("perf-tx-speed").textContent = `${txMbps} Mbps`;
-      }
-    }
-    
-    _perfRxBytes = d.wg_rx_bytes;
-    _perfTxBytes = d.wg_tx_bytes;
-    _perfTimestamp = d.timestamp;
-
-    const now = Date.now();
-    if (now - _dnsPrivacyLastLoad > 10_000) {
-      _dnsPrivacyLastLoad = now;
-      loadDnsPrivacyStatus();
-    }
-    if (now - _operationsLastLoad > 10_000) {
-      _operationsLastLoad = now;
-      loadOperationsStatus();
-    }
-    if (now - _dnsModeLastLoad > 15_000) {
-      _dnsModeLastLoad = now;
-      loadDnsModeStatus();
-    }
-    if (now - _provisionDefaultsLastLoad > 15_000) {
-      _provisionDefaultsLastLoad = now;
-      loadProvisioningDefaults();
-    }
-    if (now - _accessControlLastLoad > 15_000) {
-      _accessControlLastLoad = now;
-      loadAccessControlStatus();
-    }
-    
+    renderPerformance(d);
   } catch (e) {
     if (e.message !== "unauthorized") console.error("Perf poll err:", e);
   }
 }
 
+function renderPerformance(d) {
+  // Active users: Green if > 0, else Neutral
+  const uCls = d.active_peers > 0 ? "perf-good" : "perf-neutral";
+  setPerfIndicator("perf-users-val", `${d.active_peers} / ${d.total_peers}`, uCls);
+  
+  // Load average (1m): compared to cores
+  let lCls = "perf-good";
+  if (d.load_1m >= d.cpu_cores) lCls = "perf-fail";
+  else if (d.load_1m >= d.cpu_cores * 0.7) lCls = "perf-warn";
+  setPerfIndicator("perf-load-val", `${d.load_1m} / ${d.load_5m} / ${d.load_15m}`, lCls);
+  
+  // Ping: < 50ms=Good, < 150ms=Warn, > 150ms=Fail
+  let pCls = "perf-neutral";
+  let pTxt = "—";
+  if (d.ping_ms) {
+    if (d.ping_ms < 50) pCls = "perf-good";
+    else if (d.ping_ms < 150) pCls = "perf-warn";
+    else pCls = "perf-fail";
+    pTxt = `${d.ping_ms} ms`;
+  }
+  if (d.ping_loss_pct) pCls = d.ping_loss_pct >= 20 ? "perf-fail" : "perf-warn";
+  setPerfIndicator("perf-ping-val", pTxt, pCls);
+  const pingEl = document.getElementById("perf-ping-val");
+  if (pingEl && d.ping_target) {
+    pingEl.title = `${d.ping_target} · p50 ${d.ping_ms ?? "—"} ms · p95 ${d.ping_p95_ms ?? "—"} ms · loss ${d.ping_loss_pct ?? "—"}%`;
+  }
+  
+  // Drops: 0=Good, > 0=Fail
+  const dDrop = d.wg_rx_dropped + d.wg_tx_dropped;
+  const dCls = dDrop === 0 ? "perf-good" : "perf-warn";
+  setPerfIndicator("perf-drops-val", `${d.wg_rx_dropped} / ${d.wg_tx_dropped}`, dCls);
+
+  
+  // Bandwidth Mbps Calculation
+  if (_perfTimestamp > 0) {
+    const timeDiff = d.timestamp - _perfTimestamp;
+    if (timeDiff > 0) {
+      const rxDiff = Math.max(0, d.wg_rx_bytes - _perfRxBytes);
+      const txDiff = Math.max(0, d.wg_tx_bytes - _perfTxBytes);
+      
+      // (bytes * 8) / 1000000 = Mbps
+      const rxMbps = ((rxDiff * 8) / 1_000_000 / timeDiff).toFixed(2);
+      const txMbps = ((txDiff * 8) / 1_000_000 / timeDiff).toFixed(2);
+      
+      document.getElementById("perf-rx-speed").textContent = `${rxMbps} Mbps`;
+      document.getElementById("perf-tx-speed").textContent = `${txMbps} Mbps`;
+    }
+  }
+  
+  _perfRxBytes = d.wg_rx_bytes;
+  _perfTxBytes = d.wg_tx_bytes;
+  _perfTimestamp = d.timestamp;
+
+  refreshPerformanceSideCards();
+}
+
+function refreshPerformanceSideCards() {
+  const now = Date.now();
+  if (now - _dnsPrivacyLastLoad > 10_000) {
+    _dnsPrivacyLastLoad = now;
+    loadDnsPrivacyStatus();
+  }
+  if (now - _operationsLastLoad > 10_000) {
+    _operationsLastLoad = now;
+    loadOperationsStatus();
+  }
+  if (now - _dnsModeLastLoad > 15_000) {
+    _dnsModeLastLoad = now;
+    loadDnsModeStatus();
+  }
+  if (now - _provisionDefaultsLastLoad > 15_000) {
+    _provisionDefaultsLastLoad = now;
+    loadProvisioningDefaults();
+  }
+  if (now - _accessControlLastLoad > 15_000) {
+    _accessControlLastLoad = now;
+    loadAccessControlStatus();
+  }
+}
+
 async function loadOperationsStatus() {
   try {
     const d = await API.get("/api/system/operations");
@@ -1189,7 +1333,11 @@ function renderAccessControl(d) {
   }
   if (status) {
     const tokenState = d.token_configured ? "token configured" : "token missing";
-    status.textContent = `${tokenState} · ${d.token_file_exists ? "file-backed" : "env-backed"}`;
+    const extra = [
+      d.token_count > 1 ? `${d.token_count} tokens` : "",
+      d.grace_tokens ? `${d.grace_tokens} in grace period` : "",
+    ].filter(Boolean).join(" · ");
+    status.textContent = `${tokenState} · ${d.token_file_exists ? "file-backed" : "env-backed"}${extra ? ` · ${extra}` : ""}`;
   }
   if (bind) bind.textContent = `${d.bind_host || "—"}${d.bind_port ? `:${d.bind_port}` : ""}`;
   if (age) age.textContent = d.token_age_seconds == null ? "—" : _formatAgeBrief(d.token_age_seconds);
@@ -1203,7 +1351,7 @@ async function rotateAccessToken() {
   const btn = document.getElementById("access-rotate-token");
   const output = document.getElementById("access-token-output");
   if (!confirmRisk("Rotate dashboard token?", [
-    "The old token stops working immediately.",
+    "The old token keeps working only for a short grace period.",
     "The new token is shown once in this browser tab.",
   ])) return;
   if (btn) {
@@ -1487,8 +1635,12 @@ async function removeSelectedStalePeers() {
   ])) return;
   if (status) status.textContent = "removing selected peers…";
   try {
-    await API.post("/api/peers/stale/remove", { public_keys: keys, days });
-    loadStalePeers();
+    const r = await API.post("/api/peers/stale/remove", { public_keys: keys, days });
+    await loadStalePeers();
+    if (status && r) {
+      const skipped = (r.skipped || []).length;
+      status.textContent = `removed ${(r.removed || []).length}` + (skipped ? `, skipped ${skipped}` : "");
+    }
     loadPeers();
     loadOverview();
   } catch (e) {
@@ -1703,6 +1855,14 @@ document.getElementById("maint-restart-dns").addEventListener("click", () => run
 document.getElementById("maint-restart-api").addEventListener("click", () => runMaintenanceAction("restart-api"));
 
 function startPerformanceAutoRefresh() {
+  clearInterval(_performanceInterval);
+  _performanceInterval = null;
+  // live frames are pushed over SSE; polling is only the fallback
+  if (window.ReadableStream && window.TextDecoder) startPerformanceStream();
+  else startPerformancePolling();
+}
+
+function startPerformancePolling() {
   clearInterval(_performanceInterval);
   // fast 2s polling for live bandwith feeling
   _performanceInterval = setInterval(() => {
@@ -1711,3 +1871,49 @@ function startPerformanceAutoRefresh() {
     else { clearInterval(_performanceInterval); _performanceInterval = null; }
   }, 2000);
 }
+
+function stopPerformanceStream() {
+  if (_performanceStream) _performanceStream.abort();
+  _performanceStream = null;
+}
+
+// fetch-based SSE reader: EventSource cannot send the X-Aegis-Token header
+async function startPerformanceStream() {
+  stopPerformanceStream();
+  const ctrl = new AbortController();
+  _performanceStream = ctrl;
+
+  try {
+    const res = await fetch("/api/monitor/stream", { headers: API.headers(), signal: ctrl.signal });
+    if (res.status === 401 || res.status === 403) { logout(); return; }
+    if (!res.ok || !res.body) throw new Error(res.statusText || `HTTP ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let idx;
+      while ((idx = buffer.indexOf("\n\n")) >= 0) {
+        const event = buffer.slice(0, idx);
+        buffer = buffer.slice(idx + 2);
+        const data = event.split("\n")
+          .filter((line) => line.startsWith("data:"))
+          .map((line) => line.slice(5).trim())
+          .join("\n");
+        if (data) renderPerformance(JSON.parse(data));
+      }
+    }
+  } catch (e) {
+    if (ctrl.signal.aborted) return;
+    console.error("Perf stream err:", e);
+  }
+
+  // stream unavailable or dropped: keep the view live by polling
+  if (_performanceStream !== ctrl) return;
+  _performanceStream = null;
+  const t = document.getElementById("tab-performance");
+  if (!t.classList.contains("hidden")) startPerformancePolling();
+}
@@ -0,0 +1,127 @@
+# control-plane/benchmarks/fixtures.py
+# Synthetic, deterministic inputs for the benchmark suite: `wg show all dump`
+# output, the matching wg0.conf, peer labels, auth.log, fail2ban.log and a
+# fail2ban jail status reply. Same seed, same bytes, so runs are comparable.
+
+import base64
+import hashlib
+import random
+import time
+from datetime import datetime, timezone
+
+INTERFACE = "wg0"
+SERVER_PUBLIC_KEY = base64.b64encode(b"\x01" * 32).decode()
+
+
+def public_key(i: int) -> str:
+    return base64.b64encode(hashlib.sha256(f"peer-{i}".encode()).digest()).decode()
+
+
+def peer_ip(i: int) -> str:
+    """10.66.66.2 + i, so peer 0 is the admin peer."""
+    n = 0x0A424202 + i
+    return f"{n >> 24 & 255}.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def wg_dump(peers: int, seed: int = 1) -> str:
+    """One interface line + `peers` peer lines; ~40% active, ~20% never connected."""
+    rng = random.Random(seed)
+    now = int(time.time())
+    lines = [f"{INTERFACE}\t{'P' * 43}=\t{SERVER_PUBLIC_KEY}\t51820\toff"]
+    for i in range(peers):
+        roll = rng.random()
+        if roll < 0.2:
+            handshake, endpoint = 0, "(none)"
+        else:
+            age = rng.randint(5, 170) if roll < 0.6 else rng.randint(600, 90 * 86400)
+            handshake = now - age
+            endpoint = f"198.51.{rng.randint(0, 255)}.{rng.randint(1, 254)}:{rng.randint(1024, 65535)}"
+        lines.append("\t".join([
+            INTERFACE, public_key(i), "(none)", endpoint, f"{peer_ip(i)}/32",
+            str(handshake), str(rng.randint(0, 10**10)), str(rng.randint(0, 10**10)),
+            "25" if i % 3 == 0 else "off",
+        ]))
+    return "\n".join(lines) + "\n"
+
+
+def vpn_config(peers: int) -> str:
+    head = [
+        "[Interface]",
+        "Address = 10.66.66.1/24",
+        "ListenPort = 51820",
+        f"PrivateKey = {'P' * 43}=",
+    ]
+    blocks = ["\n".join(head)]
+    for i in range(peers):
+        blocks.append(f"[Peer]\nPublicKey = {public_key(i)}\nAllowedIPs = {peer_ip(i)}/32")
+    return "\n\n".join(blocks) + "\n"
+
+
+def labels(peers: int) -> dict:
+    now = int(time.time())
+    return {
+        public_key(i): {"label": f"device-{i:05d}", "created_at": now - (i % 120) * 86400}
+        for i in range(peers) if i % 10
+    }
+
+
+_SSH_TEMPLATES = (
+    (70, "Failed password for root from {ip} port {port} ssh2"),
+    (10, "Invalid user {user} from {ip} port {port}"),
+    (8,  "Disconnected from authenticating user root {ip} port {port} [preauth]"),
+    (7,  "Connection closed by authenticating user {user} {ip} port {port} [preauth]"),
+    (3,  "Accepted publickey for {user} from {ip} port {port} ssh2: ED25519 SHA256:abc"),
+    (2,  "pam_unix(sshd:session): session opened for user {user}(uid=1000) by (uid=0)"),
+)
+
+
+def _ip(rng) -> str:
+    return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def auth_log(lines: int, days: int = 30, seed: int = 2) -> str:
+    """Syslog-format sshd lines spread evenly over the last `days` days."""
+    rng = random.Random(seed)
+    weights = [w for w, _ in _SSH_TEMPLATES]
+    templates = [t for _, t in _SSH_TEMPLATES]
+    start = int(time.time()) - days * 86400
+    step = days * 86400 / max(lines, 1)
+    out = []
+    for i in range(lines):
+        dt = datetime.fromtimestamp(start + i * step, timezone.utc)
+        ts = f"{dt:%b} {dt.day:2d} {dt:%H:%M:%S}"
+        message = rng.choices(templates, weights)[0].format(
+            ip=_ip(rng), port=rng.randint(1024, 65535), user=rng.choice(("root", "admin", "ubuntu", "oracle")),
+        )
+        out.append(f"{ts} node sshd[{rng.randint(1000, 99999)}]: {message}")
+    return "\n".join(out) + "\n"
+
+
+def fail2ban_log(lines: int, days: int = 7, seed: int = 3) -> str:
+    """fail2ban.log with ~10% Ban, ~8% Unban, the rest filter/Found noise."""
+    rng = random.Random(seed)
+    start = time.time() - days * 86400
+    step = days * 86400 / max(lines, 1)
+    out = []
+    for i in range(lines):
+        dt = datetime.fromtimestamp(start + i * step, timezone.utc)
+        ts = dt.strftime("%Y-%m-%d %H:%M:%S") + f",{rng.randint(0, 999):03d}"
+        jail = "recidive" if rng.random() < 0.1 else "sshd"
+        roll = rng.random()
+        if roll < 0.10:
+            out.append(f"{ts} fail2ban.actions        [812]: NOTICE  [{jail}] Ban {_ip(rng)}")
+        elif roll < 0.18:
+            out.append(f"{ts} fail2ban.actions        [812]: NOTICE  [{jail}] Unban {_ip(rng)}")
+        else:
+            out.append(f"{ts} fail2ban.filter         [812]: INFO    [{jail}] Found {_ip(rng)} - {dt:%Y-%m-%d %H:%M:%S}")
+    return "\n".join(out) + "\n"
+
+
+def fail2ban_status(jail: str) -> list:
+    """The `status <jail>` result as the fail2ban server returns it (socket protocol)."""
+    return [
+        ("Filter", [("Currently failed", 12), ("Total failed", 48211),
+                    ("Journal matches", ["_SYSTEMD_UNIT=sshd.service + _COMM=sshd"])]),
+        ("Actions", [("Currently banned", 37), ("Total banned", 5120),
+                     ("Banned IP list", [f"203.0.113.{i}" for i in range(37)])]),
+    ]
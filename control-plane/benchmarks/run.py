@@ -0,0 +1,213 @@
+# control-plane/benchmarks/run.py
+# Micro-benchmarks for the control plane's parsers and collectors.
+#
+#   cd control-plane
+#   python -m benchmarks.run --output bench.json
+#   python -m benchmarks.run --baseline bench.json        # exit 1 on regression
+#   python -m benchmarks.run --sizes 1000 --only get_peers,_enrich_peers
+#
+# Every input is a synthetic fixture (benchmarks/fixtures.py) in a scratch
+# directory; the wg dump and the fail2ban socket are replaced by fixture
+# readers, so nothing touches the host. Needs the API's own dependencies
+# (fastapi etc.), since handlers from app.main are timed directly.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks import fixtures
+
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+LOG_LINES = 100_000
+
+
+def _configure_env(workdir: str) -> None:
+    """Module-level config is read at import time, so this runs before any app import."""
+    paths = {
+        "VPN_CONFIG_PATH":            "wg0.conf",
+        "PEER_LABELS_PATH":           "peer_labels.json",
+        "AUTH_LOG_PATH":              "auth.log",
+        "FAIL2BAN_LOG_PATH":          "fail2ban.log",
+        "SSH_INDEX_PATH":             "ssh_events.sqlite3",
+        "VPN_IP_ALLOC_PATH":          "ip_alloc.json",
+        "VPN_SERVER_PUBLIC_KEY_PATH": "server_public.key",
+        "GEO_DB_PATH":                "missing.mmdb",
+        "FAIL2BAN_SOCKET":            "missing.sock",
+    }
+    for name, filename in paths.items():
+        os.environ[name] = os.path.join(workdir, filename)
+    os.environ.update({
+        "AEGIS_COLLECTOR_ENABLED": "false",
+        "VPN_PEER_READER":         "cli",
+        "VPN_KEYGEN":              "cli",
+        "LATENCY_TARGETS":         "",
+    })
+
+
+def _write(path: str, text: str) -> None:
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class Bench:
+    def __init__(self, repeat: int, only: set | None):
+        self.repeat = repeat
+        self.only = only
+        self.results = {}
+
+    def case(self, name: str, size, fn, setup=None) -> None:
+        """Times fn() `repeat` times after one warm-up; setup() runs untimed before each call."""
+        if self.only and name not in self.only:
+            return
+        key = f"{name}[n={size}]" if size is not None else name
+        runs = []
+        for i in range(self.repeat + 1):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            if i:
+                runs.append(elapsed * 1000)
+        self.results[key] = {
+            "min_ms":    round(min(runs), 3),
+            "median_ms": round(statistics.median(runs), 3),
+            "max_ms":    round(max(runs), 3),
+            "runs":      len(runs),
+        }
+        print(f"  {key:<40} median {self.results[key]['median_ms']:>10.3f} ms", file=sys.stderr)
+
+
+def run(sizes: list, repeat: int, only: set | None) -> dict:
+    workdir = tempfile.mkdtemp(prefix="aegis-bench-")
+    _configure_env(workdir)
+    _write(os.environ["VPN_SERVER_PUBLIC_KEY_PATH"], fixtures.SERVER_PUBLIC_KEY + "\n")
+
+    from app import main
+    from app.services import fail2ban, labels, monitor, wg
+    from app.services.log_tailer import LogTailer
+
+    bench = Bench(repeat, only)
+    dump = {"text": ""}
+    wg._read_dump = lambda: dump["text"]
+
+    class FixtureFail2ban:
+        def command(self, *args):
+            return fixtures.fail2ban_status(args[-1])
+
+    fail2ban.client = FixtureFail2ban()
+
+    # ── Peer views, per peer count ──
+    for size in sizes:
+        print(f"peers={size}", file=sys.stderr)
+        dump["text"] = fixtures.wg_dump(size)
+        labels_data = fixtures.labels(size)
+        _write(os.environ["PEER_LABELS_PATH"], json.dumps(labels_data))
+        labels.get_labels()   # warm the label cache; its cold load is a separate case
+
+        bench.case("get_peers", size, wg.get_peers, setup=wg._invalidate_peer_records)
+        bench.case("get_health", size, main.get_health,
+                   setup=wg._invalidate_peer_records)
+        peers = wg.get_peers()["peers"]
+        bench.case("_enrich_peers", size, lambda: main._enrich_peers([dict(p) for p in peers]))
+        bench.case("_stale_peers", size, lambda: main._stale_peers(30),
+                   setup=wg._invalidate_peer_records)
+
+        def reset_labels():
+            labels._cache["file_id"] = False
+        bench.case("labels_load", size, labels.get_labels, setup=reset_labels)
+
+        config_text = fixtures.vpn_config(size)
+        doomed = [fixtures.public_key(i) for i in range(1, size, 10)]
+        bench.case("_remove_from_config", size, lambda: wg._remove_from_config(doomed),
+                   setup=lambda: _write(os.environ["VPN_CONFIG_PATH"], config_text))
+
+    # ── Log readers ──
+    print(f"log lines={LOG_LINES}", file=sys.stderr)
+    _write(os.environ["AUTH_LOG_PATH"], fixtures.auth_log(LOG_LINES))
+    _write(os.environ["FAIL2BAN_LOG_PATH"], fixtures.fail2ban_log(LOG_LINES))
+
+    def fresh_auth_tailer():
+        monitor._auth_tailer = LogTailer(
+            os.environ["AUTH_LOG_PATH"], monitor._parse_ssh_line,
+            maxlen=monitor.AUTH_LOG_MAX_EVENTS, on_events=monitor.ssh_index.record_events,
+        )
+
+    def fresh_ban_tailer():
+        monitor._ban_tailer = LogTailer(os.environ["FAIL2BAN_LOG_PATH"], monitor._parse_ban_line, maxlen=200)
+
+    bench.case("get_ssh_events_cold", LOG_LINES, monitor.get_ssh_events, setup=fresh_auth_tailer)
+    bench.case("get_ssh_events", LOG_LINES, monitor.get_ssh_events)
+    for days in monitor.TIMELINE_DAYS:
+        bench.case(f"get_ssh_timeline_{days}d", LOG_LINES, lambda: monitor.get_ssh_timeline(0, days))
+    bench.case("get_fail2ban_status_cold", LOG_LINES, monitor.get_fail2ban_status, setup=fresh_ban_tailer)
+    bench.case("get_fail2ban_status", LOG_LINES, monitor.get_fail2ban_status)
+
+    return bench.results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose median grew by more than `threshold` (0.2 = 20%) over the baseline."""
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        current = results.get(key)
+        if not current or not base.get("median_ms"):
+            continue
+        ratio = current["median_ms"] / base["median_ms"]
+        if ratio > 1 + threshold:
+            regressions.append({
+                "case":        key,
+                "baseline_ms": base["median_ms"],
+                "current_ms":  current["median_ms"],
+                "ratio":       round(ratio, 2),
+            })
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Aegis control plane micro-benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated peer counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="comma-separated case names")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed median slowdown vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = {s.strip() for s in args.only.split(",") if s.strip()} or None
+    results = run(sizes, max(1, args.repeat), only)
+
+    report = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat":    args.repeat,
+        },
+        "results": results,
+    }
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        _write(args.output, text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+# control-plane/loadtest/run.py
+# End-to-end load generator against a simulated VPN backend.
+#
+#   cd control-plane
+#   python -m loadtest.run --spawn --peers 5000 --dashboards 50 --duration 60
+#   python -m loadtest.run --url http://10.66.66.1:8000 --token ... --dashboards 10
+#
+# --spawn starts uvicorn with loadtest/shims first on PATH (fake wg/awg, sudo,
+# systemctl, fail2ban-client) and every state file in a scratch directory,
+# so it runs on a laptop. Each emulated dashboard behaves like static/app.js
+# with one tab open: health + peers on load, then either the monitor tab (the
+# six monitor calls in parallel, every 30 s) or the performance tab (one GET,
+# then frames over the /api/monitor/stream SSE, with 2 s polling only if the
+# stream fails). Provisioning workers POST /api/vpn/provision concurrently.
+# The report (JSON) has p50/p99 per route, SSE frame gaps, and threadpool
+# saturation sampled from /api/debug/timings.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from benchmarks import fixtures
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHIMS = os.path.join(ROOT, "loadtest", "shims")
+
+PERFORMANCE_INTERVAL = 2
+MONITOR_INTERVAL = 30
+# Recorded like a route; the values are gaps between SSE frames, not latencies.
+STREAM_ROUTE = "SSE /api/monitor/stream (frame gap)"
+MONITOR_BATCH = (
+    "/api/monitor/system",
+    "/api/monitor/services",
+    "/api/monitor/traffic",
+    "/api/monitor/ssh",
+    "/api/monitor/ssh/timeline?tz_offset=0&days=7",
+    "/api/monitor/fail2ban",
+)
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 client (Content-Length and chunked bodies)."""
+
+    def __init__(self, base_url: str, token: str):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.token = token
+        self._idle: list = []
+
+    async def _connection(self):
+        if self._idle:
+            return self._idle.pop()
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body: dict = None) -> tuple:
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"X-Aegis-Token: {self.token}\r\nContent-Length: {len(payload)}\r\n"
+            + ("Content-Type: application/json\r\n" if body is not None else "")
+            + "\r\n"
+        )
+        reader, writer = await self._connection()
+        try:
+            writer.write(head.encode() + payload)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if headers.get("transfer-encoding") == "chunked":
+                data = b""
+                while True:
+                    size = int((await reader.readline()).strip(), 16)
+                    if size == 0:
+                        await reader.readline()
+                        break
+                    data += await reader.readexactly(size)
+                    await reader.readline()
+            else:
+                data = await reader.readexactly(int(headers.get("content-length", 0)))
+        except Exception:
+            writer.close()
+            raise
+        if headers.get("connection") == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, data
+
+    async def stream(self, path: str, deadline: float, on_event) -> None:
+        """
+        Reads an SSE response on its own connection until `deadline`, calling
+        on_event(data) per `data:` event. Raises on connect/HTTP errors.
+        """
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write((
+                f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"X-Aegis-Token: {self.token}\r\nAccept: text/event-stream\r\n\r\n"
+            ).encode())
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if status != 200:
+                raise ValueError(f"stream answered HTTP {status}")
+            chunked = headers.get("transfer-encoding") == "chunked"
+            buffer = ""
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    if chunked:
+                        size = int((await asyncio.wait_for(reader.readline(), remaining)).strip(), 16)
+                        if size == 0:
+                            return
+                        data = await reader.readexactly(size + 2)
+                        data = data[:-2]
+                    else:
+                        data = await asyncio.wait_for(reader.read(65536), remaining)
+                        if not data:
+                            return
+                except asyncio.TimeoutError:
+                    return
+                buffer += data.decode()
+                while "\n\n" in buffer:
+                    event, buffer = buffer.split("\n\n", 1)
+                    payload = "\n".join(line[5:].strip() for line in event.split("\n")
+                                        if line.startswith("data:"))
+                    if payload:
+                        on_event(payload)
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list] = {}
+        self.errors: dict[str, int] = {}
+
+    async def call(self, client: Client, method: str, path: str, body: dict = None):
+        route = f"{method} {path.split('?')[0]}"
+        started = time.perf_counter()
+        try:
+            status, data = await client.request(method, path, body)
+            ok = status < 400
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            status, data, ok = None, b"", False
+        self.samples.setdefault(route, []).append((time.perf_counter() - started) * 1000)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return status, data
+
+    def report(self) -> dict:
+        routes = {}
+        for route in sorted(set(self.samples) | set(self.errors)):
+            values = sorted(self.samples.get(route) or [0.0])
+            routes[route] = {
+                "count":  len(values),
+                "errors": self.errors.get(route, 0),
+                "p50_ms": round(statistics.median(values), 2),
+                "p99_ms": round(values[min(len(values) - 1, int(len(values) * 0.99))], 2),
+                "max_ms": round(values[-1], 2),
+            }
+        return routes
+
+
+async def _every(interval: float, deadline: float, fn) -> None:
+    while time.monotonic() < deadline:
+        tick = time.monotonic()
+        await fn()
+        await asyncio.sleep(max(0.0, min(interval - (time.monotonic() - tick), deadline - time.monotonic())))
+
+
+async def monitor_tab(client: Client, rec: Recorder, deadline: float) -> None:
+    """app.js loadMonitor(): the six calls in parallel, then every 30 s."""
+    await _every(MONITOR_INTERVAL, deadline, lambda: asyncio.gather(
+        *(rec.call(client, "GET", path) for path in MONITOR_BATCH)))
+
+
+async def performance_tab(client: Client, rec: Recorder, deadline: float) -> None:
+    """app.js: one loadPerformance(), then the SSE stream; polling only as fallback."""
+    await rec.call(client, "GET", "/api/monitor/performance")
+    last = [time.perf_counter()]
+
+    def on_frame(_payload: str) -> None:
+        now = time.perf_counter()
+        rec.samples.setdefault(STREAM_ROUTE, []).append((now - last[0]) * 1000)
+        last[0] = now
+
+    try:
+        await client.stream("/api/monitor/stream", deadline, on_frame)
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+        rec.errors[STREAM_ROUTE] = rec.errors.get(STREAM_ROUTE, 0) + 1
+    await _every(PERFORMANCE_INTERVAL, deadline,
+                 lambda: rec.call(client, "GET", "/api/monitor/performance"))
+
+
+async def dashboard(url: str, token: str, rec: Recorder, deadline: float, tab: str) -> None:
+    client = Client(url, token)
+    await asyncio.sleep(random.uniform(0, PERFORMANCE_INTERVAL))
+    await rec.call(client, "GET", "/api/health")
+    await rec.call(client, "GET", "/api/peers")
+    try:
+        if tab == "performance":
+            await performance_tab(client, rec, deadline)
+        else:
+            await monitor_tab(client, rec, deadline)
+    finally:
+        client.close()
+
+
+async def provisioner(url: str, token: str, rec: Recorder, deadline: float, interval: float) -> None:
+    client = Client(url, token)
+    try:
+        while time.monotonic() < deadline:
+            tick = time.monotonic()
+            await rec.call(client, "POST", "/api/vpn/provision")
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - tick)))
+    finally:
+        client.close()
+
+
+async def sample_server(url: str, token: str, deadline: float, samples: list) -> None:
+    """Polls /api/debug/timings once per second for threadpool/in-flight gauges."""
+    client = Client(url, token)
+    try:
+        while time.monotonic() < deadline:
+            try:
+                status, data = await client.request("GET", "/api/debug/timings")
+                if status == 200:
+                    samples.append(json.loads(data))
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                pass
+            await asyncio.sleep(1)
+    finally:
+        client.close()
+
+
+def _saturation(samples: list) -> dict:
+    if not samples:
+        return {}
+    busy = [s["threadpool"]["busy"] for s in samples]
+    waiting = [s["threadpool"]["waiting"] for s in samples]
+    in_flight = [s["in_flight"].get("http", 0) for s in samples]
+    return {
+        "size":           samples[-1]["threadpool"]["size"],
+        "busy_avg":       round(statistics.mean(busy), 2),
+        "busy_max":       max(busy),
+        "waiting_max":    max(waiting),
+        "in_flight_max":  max(in_flight),
+        "samples":        len(samples),
+    }
+
+
+async def run_load(args) -> dict:
+    rec = Recorder()
+    server_samples: list = []
+    deadline = time.monotonic() + args.duration
+    on_performance = round(args.dashboards * args.performance_share)
+    tasks = [
+        dashboard(args.url, args.token, rec, deadline, "performance" if i < on_performance else "monitor")
+        for i in range(args.dashboards)
+    ]
+    tasks += [provisioner(args.url, args.token, rec, deadline, args.provision_interval)
+              for _ in range(args.provisioners)]
+    tasks.append(sample_server(args.url, args.token, deadline, server_samples))
+    started = time.monotonic()
+    await asyncio.gather(*tasks)
+    report = {
+        "config": {
+            "dashboards":         args.dashboards,
+            "performance_tabs":   on_performance,
+            "provisioners":       args.provisioners,
+            "provision_interval": args.provision_interval,
+            "duration":           round(time.monotonic() - started, 1),
+            "peers":              args.peers if args.spawn else None,
+        },
+        "routes": rec.report(),
+        "threadpool": _saturation(server_samples),
+    }
+    if server_samples:
+        report["server_slowest"] = server_samples[-1].get("slowest", [])[:10]
+    return report
+
+
+def spawn_server(args) -> subprocess.Popen:
+    workdir = tempfile.mkdtemp(prefix="aegis-load-")
+    path = lambda name: os.path.join(workdir, name)   # noqa: E731
+    with open(path("wg0.conf"), "w") as f:
+        f.write("[Interface]\nAddress = 10.66.66.1/16\nListenPort = 51820\nPrivateKey = fake\n")
+    with open(path("server_public.key"), "w") as f:
+        f.write(fixtures.SERVER_PUBLIC_KEY + "\n")
+    with open(path("auth.log"), "w") as f:
+        f.write(fixtures.auth_log(args.log_lines))
+    with open(path("fail2ban.log"), "w") as f:
+        f.write(fixtures.fail2ban_log(args.log_lines))
+
+    env = {
+        **os.environ,
+        "PATH":                       f"{SHIMS}{os.pathsep}{os.environ.get('PATH', '')}",
+        "VPN_CLI":                    "wg",
+        "AEGIS_FAKE_STATE":           path("wg-state.json"),
+        "AEGIS_FAKE_PEERS":           str(args.peers),
+        "AEGIS_AUTH_TOKEN":           args.token,
+        "VPN_CONFIG_PATH":            path("wg0.conf"),
+        "VPN_SERVER_PUBLIC_KEY_PATH": path("server_public.key"),
+        "VPN_SUBNET_CIDR":            "10.66.0.0/16",
+        "VPN_SERVER_IP":              "10.66.66.1",
+        "VPN_IP_ALLOC_PATH":          path("ip_alloc.json"),
+        "PEER_LABELS_PATH":           path("peer_labels.json"),
+        "SSH_INDEX_PATH":             path("ssh_events.sqlite3"),
+        "AUTH_LOG_PATH":              path("auth.log"),
+        "FAIL2BAN_LOG_PATH":          path("fail2ban.log"),
+        "FAIL2BAN_SOCKET":            path("fail2ban.sock"),
+        "GEO_DB_PATH":                path("missing.mmdb"),
+        "WG_ENDPOINT":                "203.0.113.1:51820",
+        "LATENCY_TARGETS":            "",
+    }
+    port = urlsplit(args.url).port or 8000
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    print(f"server pid {proc.pid}, state in {workdir}", file=sys.stderr)
+    return proc
+
+
+async def wait_ready(url: str, token: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _ = await Client(url, token).request("GET", "/api/health")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.3)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Aegis control plane load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--token", default=None, help="dashboard token (generated with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="start the API against the shims")
+    parser.add_argument("--peers", type=int, default=1000, help="simulated peers (--spawn)")
+    parser.add_argument("--log-lines", type=int, default=20000, help="auth/fail2ban log size (--spawn)")
+    parser.add_argument("--dashboards", type=int, default=10)
+    parser.add_argument("--performance-share", type=float, default=0.5,
+                        help="fraction of dashboards on the performance tab (the rest on monitor)")
+    parser.add_argument("--provisioners", type=int, default=1)
+    parser.add_argument("--provision-interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    if args.token is None:
+        if not args.spawn:
+            parser.error("--token is required without --spawn")
+        args.token = secrets.token_urlsafe(24)
+
+    proc = spawn_server(args) if args.spawn else None
+    try:
+        asyncio.run(wait_ready(args.url, args.token))
+        report = asyncio.run(run_load(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    errors = sum(r["errors"] for r in report["routes"].values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# control-plane/tests/test_fail2ban.py
+# fail2ban socket client: the restricted reply unpickler (a security
+# boundary) and the wire framing, against a fake server on a Unix socket.
+
+import io
+import os
+import pickle
+import socket
+import threading
+
+import pytest
+
+from app.services import fail2ban
+from app.services.fail2ban import Fail2banClient, Fail2banError, _Opaque, _ReplyUnpickler
+
+
+class _Exploit:
+    def __reduce__(self):
+        return os.system, ("echo pwned",)
+
+
+def _load(data: bytes):
+    return _ReplyUnpickler(io.BytesIO(data)).load()
+
+
+def test_non_allowlisted_global_becomes_opaque(monkeypatch):
+    data = pickle.dumps((0, [("Filter", _Exploit())]), protocol=2)
+    calls = []
+    monkeypatch.setattr(os, "system", calls.append)
+    reply = _load(data)
+    code, [(section, value)] = reply
+    assert (code, section) == (0, "Filter")
+    assert isinstance(value, _Opaque)
+    assert value.args == ("echo pwned",)
+    assert calls == []
+
+
+@pytest.mark.parametrize("module, name", [("os", "system"), ("builtins", "eval"), ("subprocess", "Popen")])
+def test_find_class_never_resolves_outside_allowlist(module, name):
+    assert _ReplyUnpickler(io.BytesIO()).find_class(module, name) is _Opaque
+
+
+@pytest.mark.parametrize("protocol", [2, pickle.HIGHEST_PROTOCOL])
+def test_allowlisted_builtins_round_trip(protocol):
+    value = (0, [("Filter", [("Currently failed", 2), ("Banned IP list", {"1.2.3.4"})])])
+    assert _load(pickle.dumps(value, protocol=protocol)) == value
+
+
+class _FakeServer:
+    """Answers each END-terminated command with the next queued reply."""
+
+    def __init__(self, path: str, replies: list):
+        self.replies = [pickle.dumps(reply, protocol=2) for reply in replies]
+        self.received = []
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(1)
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        conn, _ = self.listener.accept()
+        buffer = b""
+        with conn:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    return
+                buffer += chunk
+                while fail2ban._END in buffer:
+                    message, buffer = buffer.split(fail2ban._END, 1)
+                    self.received.append(message)
+                    if message == fail2ban._CLOSE:
+                        return
+                    conn.sendall(self.replies.pop(0) + fail2ban._END)
+
+
+@pytest.fixture
+def sock_path(tmp_path):
+    return str(tmp_path / "fail2ban.sock")
+
+
+def test_command_round_trip_and_close(sock_path):
+    server = _FakeServer(sock_path, [(0, ["sshd"]), (1, "Unknown jail")])
+    client = Fail2banClient(sock_path, timeout=2)
+    assert client.command("status") == ["sshd"]
+    with pytest.raises(Fail2banError):
+        client.command("status", "nope")
+    client.close()
+    server.thread.join(timeout=2)
+    assert pickle.loads(server.received[0]) == ["status"]
+    # The close marker is END-terminated, so the server actually processes it.
+    assert server.received[-1] == fail2ban._CLOSE
+    assert not server.thread.is_alive()
+
+
+def test_exploit_in_reply_is_never_resolved(sock_path, monkeypatch):
+    _FakeServer(sock_path, [(0, [("Banned IP list", [_Exploit()])])])
+    client = Fail2banClient(sock_path, timeout=2)
+    calls = []
+    monkeypatch.setattr(os, "system", calls.append)
+    [(_, [banned])] = client.command("status", "sshd")
+    client.close()
+    assert isinstance(banned, _Opaque)
+    assert calls == []
@@ -0,0 +1,180 @@
+# control-plane/tests/test_ip_alloc.py
+# Address allocator: reserve/commit/release, all-or-nothing batches, the
+# state file round-trip and seeding from the live peers.
+
+import json
+import subprocess
+
+import pytest
+
+from app.services import wg
+from app.services.ip_alloc import AddressPool, Allocator, AllocatorUnavailable, PoolExhausted
+
+
+def _pool(**kwargs):
+    # 10.66.66.10 - 10.66.66.14: five addresses.
+    return AddressPool("10.66.66.0/24", 10, end=14, **kwargs)
+
+
+def _used(allocator):
+    return [p["used"] for p in allocator.stats()["pools"]]
+
+
+def test_reserve_commit_release():
+    allocator = Allocator([_pool()])
+    first, second = allocator.reserve_many(2)
+    assert (first.allowed_ips, second.allowed_ips) == ("10.66.66.10/32", "10.66.66.11/32")
+    assert allocator.stats()["pending_reservations"] == 2
+
+    allocator.commit(first)
+    allocator.release(second)
+    allocator.release(second)          # a second release is a no-op
+    assert allocator.stats()["pending_reservations"] == 0
+    assert _used(allocator) == [1]
+    assert allocator.reserve().allowed_ips == "10.66.66.11/32"
+
+
+def test_reserve_many_rolls_back_on_exhaustion():
+    allocator = Allocator([_pool()])
+    held = allocator.reserve_many(3)
+    with pytest.raises(PoolExhausted):
+        allocator.reserve_many(3)
+    assert _used(allocator) == [3]
+    assert allocator.stats()["pending_reservations"] == 3
+    assert len(allocator.reserve_many(2)) == 2
+    allocator.release(*held)
+
+
+def test_exclude_is_never_handed_out():
+    allocator = Allocator([_pool(exclude=("10.66.66.10",))])
+    assert [r.allowed_ips for r in allocator.reserve_many(4)] == [
+        "10.66.66.11/32", "10.66.66.12/32", "10.66.66.13/32", "10.66.66.14/32",
+    ]
+    with pytest.raises(PoolExhausted):
+        allocator.reserve()
+
+
+def test_dual_stack_ipv6_pool_is_capped():
+    v6 = AddressPool("fd66:66::/64", 10, max_size=4)
+    assert v6.size == 4
+    allocator = Allocator([_pool(), v6])
+    res = allocator.reserve()
+    assert res.allowed_ips == "10.66.66.10/32,fd66:66::a/128"
+    allocator.reserve_many(3)
+    with pytest.raises(PoolExhausted):
+        allocator.reserve()            # v6 runs out first; v4 is rolled back too
+    assert _used(allocator) == [4, 4]
+
+
+def test_state_file_round_trip(tmp_path):
+    path = str(tmp_path / "ip_alloc.json")
+    allocator = Allocator([_pool()], path)
+    committed, pending = allocator.reserve_many(2)
+    allocator.commit(committed)
+
+    # Pending reservations are not persisted.
+    reloaded = Allocator([_pool()], path)
+    assert _used(reloaded) == [1]
+    assert reloaded.reserve().allowed_ips == "10.66.66.11/32"
+
+    with open(path) as f:
+        state = json.load(f)
+    assert state["pools"][0]["cidr"] == "10.66.66.0/24"
+
+
+def test_state_file_for_another_pool_is_ignored(tmp_path):
+    path = str(tmp_path / "ip_alloc.json")
+    allocator = Allocator([_pool()], path)
+    allocator.commit(allocator.reserve())
+    other = Allocator([AddressPool("10.77.0.0/24", 10, end=14)], path)
+    assert _used(other) == [0]
+
+
+def test_unseeded_allocator_refuses_to_reserve():
+    live = {"value": None}
+    allocator = Allocator([_pool()], seed=lambda: live["value"])
+    with pytest.raises(AllocatorUnavailable):
+        allocator.reserve()
+    live["value"] = ["10.66.66.10/32"]
+    assert allocator.reserve().allowed_ips == "10.66.66.11/32"
+
+
+def test_seed_replaces_stale_file_state(tmp_path):
+    path = str(tmp_path / "ip_alloc.json")
+    old = Allocator([_pool()], path)
+    old.commit_many(old.reserve_many(3))
+
+    # Only .11 is still live; .10 and .12 were removed outside the API.
+    allocator = Allocator([_pool()], path, seed=lambda: ["10.66.66.11/32"])
+    assert allocator.reserve().allowed_ips == "10.66.66.10/32"
+    assert _used(allocator) == [2]
+
+
+def test_exhaustion_resyncs_from_live_peers():
+    live = ["10.66.66.10/32", "10.66.66.11/32", "10.66.66.12/32", "10.66.66.13/32", "10.66.66.14/32"]
+    allocator = Allocator([_pool()], seed=lambda: list(live), resync_interval=3600)
+    with pytest.raises(PoolExhausted):
+        allocator.reserve()
+    live.remove("10.66.66.12/32")      # removed with `wg set ... remove`
+    assert allocator.reserve().allowed_ips == "10.66.66.12/32"
+
+
+def test_resync_keeps_pending_reservations():
+    live = []
+    allocator = Allocator([_pool()], seed=lambda: list(live), resync_interval=0)
+    first = allocator.reserve()
+    second = allocator.reserve()       # resyncs; `first` is not live yet
+    assert first.allowed_ips != second.allowed_ips
+
+
+def test_failed_provision_releases_addresses(monkeypatch):
+    allocator = Allocator([_pool()])
+    reservations = allocator.reserve_many(2)
+
+    def wg_set(args):
+        if "allowed-ips" in args:
+            raise subprocess.CalledProcessError(1, "wg")
+
+    monkeypatch.setattr(wg, "_wg_set", wg_set)
+    entries = [("key%d" % i, r.allowed_ips) for i, r in enumerate(reservations)]
+    with pytest.raises(subprocess.CalledProcessError):
+        wg._add_peers_committed(entries, allocator, reservations)
+    assert _used(allocator) == [0]
+    assert allocator.stats()["pending_reservations"] == 0
+
+
+def test_config_write_failure_removes_peers_then_releases(monkeypatch):
+    allocator = Allocator([_pool()])
+    reservations = allocator.reserve_many(2)
+    calls = []
+
+    def persist(entries):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(wg, "_wg_set", calls.append)
+    monkeypatch.setattr(wg, "_persist_peers", persist)
+    entries = [("key%d" % i, r.allowed_ips) for i, r in enumerate(reservations)]
+    with pytest.raises(OSError):
+        wg._add_peers_committed(entries, allocator, reservations)
+    assert calls[-1] == ["peer", "key0", "remove", "peer", "key1", "remove"]
+    assert _used(allocator) == [0]
+
+
+def test_peers_left_live_keep_their_addresses(monkeypatch):
+    allocator = Allocator([_pool()])
+    reservations = allocator.reserve_many(2)
+
+    def wg_set(args):
+        if "remove" in args:
+            raise subprocess.CalledProcessError(1, "wg")
+
+    def persist(entries):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(wg, "_wg_set", wg_set)
+    monkeypatch.setattr(wg, "_persist_peers", persist)
+    entries = [("key%d" % i, r.allowed_ips) for i, r in enumerate(reservations)]
+    with pytest.raises(OSError):
+        wg._add_peers_committed(entries, allocator, reservations)
+    assert _used(allocator) == [2]
+    assert allocator.stats()["pending_reservations"] == 0
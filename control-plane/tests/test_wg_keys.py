@@ -0,0 +1,66 @@
+# control-plane/tests/test_wg_keys.py
+# wg_keys against fixed `wg pubkey` outputs. The startup self-check only
+# covers the active backend, so the pure-Python ladder is checked here too.
+
+import base64
+
+import pytest
+
+from app.services import wg_keys
+
+# (private key, `wg pubkey` output). The first three are not clamped as
+# given (low bits of byte 0 / top bits of byte 31 set or clear).
+WG_PUBKEY = (
+    ("dwdtCnMYpX08FsFyUbJmRd9ML4frwJkqsXf7pR25LCo=", "hSDwCYkwp1R0i33ctD73Wg2/Og0mOBr066SpjqqbTmo="),
+    ("//////////////////////////////////////////8=", "hHwNLDdSNPNl5mCVUYejc1oPdhPRYJ06ak2MU66qWiI="),
+    ("AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=", "L+V9o0fNYkMVKNqsX7spBzD/9oSvxM/C7ZCZX1jLO3Q="),
+    ("qKurq6urq6urq6urq6urq6urq6urq6urq6urq6urq2s=", "43EthRoOXXm4McXjSrIrQaGYFx3iCbi4+sojoRxiSFk="),
+)
+
+
+@pytest.fixture(params=["active", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(wg_keys, "X25519PrivateKey", None)
+    return request.param
+
+
+@pytest.mark.parametrize("private, public", WG_PUBKEY)
+def test_public_key_matches_wg_pubkey(backend, private, public):
+    assert wg_keys.public_key(private) == public
+
+
+@pytest.mark.parametrize("private, public", WG_PUBKEY)
+def test_x25519_ladder_matches_wg_pubkey(private, public):
+    raw = base64.b64decode(private)
+    assert base64.b64encode(wg_keys._x25519(raw, wg_keys._BASE_POINT)).decode() == public
+
+
+def test_x25519_ladder_rfc7748_scalar_mult():
+    # RFC 7748 §5.2, first vector: arbitrary u-coordinate, unclamped scalar.
+    scalar = bytes.fromhex("a546e36bf0527c9d3b16154b82465edd62144c0ac1fc5a18506a2244ba449ac4")
+    u = bytes.fromhex("e6db6867583030db3594c1a424b15f7c726624ec26b3353b10a903a6d0ab1c4c")
+    assert wg_keys._x25519(scalar, u).hex() == (
+        "c3da55379de9c6908e94ea4df28d084f32eccf03491c71f754b4075577a28552"
+    )
+
+
+def test_clamp():
+    assert wg_keys.clamp(b"\xff" * 32) == b"\xf8" + b"\xff" * 30 + b"\x7f"
+    assert wg_keys.clamp(bytes(32)) == bytes(31) + b"\x40"
+
+
+def test_generate_keypair_is_clamped_and_consistent(backend):
+    private, public = wg_keys.generate_keypair()
+    raw = base64.b64decode(private)
+    assert raw == wg_keys.clamp(raw)
+    assert wg_keys.public_key(private) == public
+
+
+def test_public_key_rejects_wrong_length():
+    with pytest.raises(ValueError):
+        wg_keys.public_key(base64.b64encode(bytes(31)).decode())
+
+
+def test_self_check(backend):
+    assert wg_keys.self_check()